@@ -6,7 +6,8 @@ from flask import Flask, request, jsonify, Response,send_from_directory
 from flask_cors import CORS
 from flask_mail import Mail, Message
 from bson import ObjectId
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, DeleteOne, ReplaceOne, UpdateOne, UpdateMany
+from pymongo.errors import OperationFailure, DuplicateKeyError
 import bcrypt
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -29,6 +30,21 @@ import traceback
 import jwt
 from functools import wraps
 from flask import request, jsonify
+import threading
+from bisect import bisect_left
+from collections import deque, OrderedDict
+from array import array
+import heapq
+import zlib
+import hashlib
+import json
+import mmap
+import sys
+import time
+import multiprocessing
+import unicodedata
+import queue
+import atexit
 
 
 # --- Flask App Initialization ---
@@ -53,7 +69,9 @@ mail = Mail(app)
 # --- Collections (Updated) ---
 users_collection = db["users"]
 sentences_collection = db["sentences"]
-user_activities_collection = db["user_activities"]
+user_activities_collection = db["user_activities"]  # Legacy: one document per user with every activity
+user_activity_buckets_collection = db["user_activity_buckets"]  # Activities per user per IST day, capped per document
+user_sessions_collection = db["user_sessions"]  # One document per listed session, for the paginated logbook
 user_session_history_collection = db["user_session_history"]
 tags_collection = db["tags"]             # FINAL/APPROVED tags
 projects_collection = db["projects"]
@@ -61,6 +79,57 @@ search_tags_collection = db["search_tags"]
 feedback_collection = db["feedback"] 
 org_admins_collection = db["org_admins"]
 staged_tags_collection = db["staged_tags"] # NEW: Temporary storage for unreviewed tags
+index_versions_collection = db["index_versions"]        # Write-version counters for derived indexes
+tag_index_journal_collection = db["tag_index_journal"]  # Versioned tag deltas replayed by every worker
+auto_annotation_jobs_collection = db["auto_annotation_jobs"]  # Progress of project auto-annotation runs
+analytics_rollups_collection = db["analytics_rollups"]  # Approved tag counts per day, tag, user, project and language
+
+
+def ensure_indexes():
+    """Creates the indexes the storage helpers below query by (idempotent)"""
+    try:
+        user_activity_buckets_collection.create_index([("username", 1), ("day", 1)])
+        user_sessions_collection.create_index([("loginTime", -1), ("_id", -1)])
+        user_sessions_collection.create_index([("username", 1), ("loginTime", -1), ("_id", -1)])
+        sentences_collection.create_index(REVIEW_STATS_INDEX)
+        for collection in (tags_collection, staged_tags_collection, search_tags_collection):
+            collection.create_index([("project_id", 1), ("annotation_date", 1)])
+            collection.create_index([("language", 1), ("annotation_date", 1)])
+        analytics_rollups_collection.create_index([(dimension, 1) for dimension in ROLLUP_DIMENSIONS], unique=True)
+        for dimension in ("username", "project_id", "language"):
+            analytics_rollups_collection.create_index([(dimension, 1), ("day", 1)])
+    except Exception as e:
+        print(f"Error creating indexes: {e}")
+
+
+# Lets reviewer stats be computed from the index alone, without reading sentence documents
+REVIEW_STATS_INDEX = [("review_status", 1), ("is_annotated", 1), ("reviewed_by", 1)]
+
+
+# None until the server has been seen to accept or refuse a transaction
+transactions_supported = None
+
+
+def run_in_transaction(callback):
+    """
+    Runs callback(session) inside a multi-document transaction and returns its result.
+    Standalone servers refuse transactions (IllegalOperation); there, and from then on,
+    callback(None) runs the same writes without one.
+    """
+    global transactions_supported
+    if transactions_supported is not False:
+        try:
+            with client.start_session() as session:
+                result = session.with_transaction(callback)
+            transactions_supported = True
+            return result
+        except OperationFailure as e:
+            if transactions_supported or e.code != 20:
+                raise
+            print("DEBUG: MongoDB server does not support transactions; writing without them")
+            transactions_supported = False
+    return callback(None)
+
 # --- Helper Functions (UNCHANGED) ---
 
 
@@ -71,11 +140,59 @@ UPLOAD_FOLDER = 'feedback_uploads'
 MAX_CONTENT_LENGTH = 5 * 1024 * 1024 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 PORT = 5001
+# Memory-mapped snapshot of the tag recommendation index, shared by all workers
+PHRASE_INDEX_SNAPSHOT = 'phrase_index.snapshot'
+PHRASE_INDEX_SYNC_SECONDS = 2
+# Work caps for /api/recommend-tags/batch
+RECOMMEND_BATCH_MAX_ITEMS = 500
+RECOMMEND_BATCH_MAX_CHARS = 500000
+# Streaming mode of /api/recommend-tags: sentences per pool task
+RECOMMEND_STREAM_CHUNK_SIZE = 1000
+# Processes matching chunks of sentences for streaming recommendations and auto-annotation jobs
+RECOMMEND_POOL_WORKERS = os.cpu_count() or 1
+# Project auto-annotation jobs: sentences per pool task / write batch
+AUTO_ANNOTATE_CHUNK_SIZE = 1000
+# Response cache of /api/recommend-tags/text
+RECOMMEND_CACHE_SIZE = 4096
+RECOMMEND_CACHE_TTL_SECONDS = 300
+# Background activity log writer: queue bound, events per bulk write, max wait before writing
+ACTIVITY_LOG_QUEUE_SIZE = 10000
+ACTIVITY_LOG_BATCH_SIZE = 500
+ACTIVITY_LOG_FLUSH_SECONDS = 1.0
+# Sessions per page of /api/activity-logs (default and upper bound for ?limit=)
+ACTIVITY_LOGS_PAGE_SIZE = 50
+ACTIVITY_LOGS_MAX_PAGE_SIZE = 500
+# Most sentences one /reviewer/sentences/bulk-review request may review
+REVIEW_BULK_MAX_ITEMS = 200
+# How long a reviewer's dashboard statistics are served from memory
+REVIEWER_STATS_CACHE_TTL_SECONDS = 30
+# How often analytics rollups are recounted from the tags
+ANALYTICS_ROLLUP_RECONCILE_SECONDS = 3600
+# Columnar tag snapshot behind the downloadable reports: max staleness before replaying the tag journal
+TAG_COLUMNS_SYNC_SECONDS = 2
 
 
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+app.config['PHRASE_INDEX_SNAPSHOT'] = PHRASE_INDEX_SNAPSHOT
+app.config['PHRASE_INDEX_SYNC_SECONDS'] = PHRASE_INDEX_SYNC_SECONDS
+app.config['RECOMMEND_BATCH_MAX_ITEMS'] = RECOMMEND_BATCH_MAX_ITEMS
+app.config['RECOMMEND_BATCH_MAX_CHARS'] = RECOMMEND_BATCH_MAX_CHARS
+app.config['RECOMMEND_STREAM_CHUNK_SIZE'] = RECOMMEND_STREAM_CHUNK_SIZE
+app.config['RECOMMEND_POOL_WORKERS'] = RECOMMEND_POOL_WORKERS
+app.config['AUTO_ANNOTATE_CHUNK_SIZE'] = AUTO_ANNOTATE_CHUNK_SIZE
+app.config['RECOMMEND_CACHE_SIZE'] = RECOMMEND_CACHE_SIZE
+app.config['RECOMMEND_CACHE_TTL_SECONDS'] = RECOMMEND_CACHE_TTL_SECONDS
+app.config['ACTIVITY_LOG_QUEUE_SIZE'] = ACTIVITY_LOG_QUEUE_SIZE
+app.config['ACTIVITY_LOG_BATCH_SIZE'] = ACTIVITY_LOG_BATCH_SIZE
+app.config['ACTIVITY_LOG_FLUSH_SECONDS'] = ACTIVITY_LOG_FLUSH_SECONDS
+app.config['ACTIVITY_LOGS_PAGE_SIZE'] = ACTIVITY_LOGS_PAGE_SIZE
+app.config['ACTIVITY_LOGS_MAX_PAGE_SIZE'] = ACTIVITY_LOGS_MAX_PAGE_SIZE
+app.config['REVIEW_BULK_MAX_ITEMS'] = REVIEW_BULK_MAX_ITEMS
+app.config['REVIEWER_STATS_CACHE_TTL_SECONDS'] = REVIEWER_STATS_CACHE_TTL_SECONDS
+app.config['ANALYTICS_ROLLUP_RECONCILE_SECONDS'] = ANALYTICS_ROLLUP_RECONCILE_SECONDS
+app.config['TAG_COLUMNS_SYNC_SECONDS'] = TAG_COLUMNS_SYNC_SECONDS
 
 # Create the upload folder if it doesn't exist
 if not os.path.exists(UPLOAD_FOLDER):
@@ -317,87 +434,495 @@ Sentence Annotation System Team
     except Exception as e:
         print(f"Failed to send admin welcome email: {e}")
         
+SESSION_TIME_FORMAT = '%d/%m/%Y, %H:%M:%S'
+# Tasks that do not make an unclosed session worth keeping
+SESSION_PLACEHOLDER_TASKS = ["Session ended with no tasks", "Active session - no tasks recorded"]
+# How often a session history rebuild restarts when incremental writes keep racing it
+SESSION_HISTORY_REBUILD_ATTEMPTS = 5
+
+
+def as_stored_utc(timestamp):
+    """A timestamp the way MongoDB hands it back: naive UTC with millisecond precision"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+    return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+def new_session_record(username, utc_ts):
+    """A session opened at utc_ts; login/logout times are stored as dates (stored UTC)"""
+    return {
+        "id": f"{username}_{utc_ts.timestamp()}",
+        "username": username,
+        "loginTime": utc_ts,
+        "logoutTime": None,
+        "tasksDone": []
+    }
+
+
+def format_ist(timestamp):
+    """A stored (UTC) date as the IST string the API has always returned; None stays None"""
+    if timestamp is None:
+        return None
+    return timestamp.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo("Asia/Kolkata")).strftime(SESSION_TIME_FORMAT)
+
+
+def parse_ist(value):
+    """Inverse of format_ist, for session records written with IST strings"""
+    if not value:
+        return None
+    return as_stored_utc(datetime.strptime(value, SESSION_TIME_FORMAT).replace(tzinfo=ZoneInfo("Asia/Kolkata")))
+
+
+def native_session(session, username=None):
+    """
+    A session record in the current format. Records written before sessions carried dates
+    have loginTimeIST/logoutTimeIST strings instead; those are converted and dropped.
+    """
+    session = dict(session)
+    login_ist = session.pop("loginTimeIST", None)
+    logout_ist = session.pop("logoutTimeIST", None)
+    if session.get("loginTime") is None:
+        session["loginTime"] = parse_ist(login_ist)
+    if session.get("logoutTime") is None:
+        session["logoutTime"] = parse_ist(logout_ist)
+    session.setdefault("username", username)
+    session.setdefault("id", f"{session['username']}_{login_ist}")
+    session.setdefault("tasksDone", [])
+    return session
+
+
+def serialize_session(session):
+    """A session record as the API returns it, with its times formatted in IST"""
+    return {
+        "id": session["id"],
+        "username": session["username"],
+        "loginTimeIST": format_ist(session["loginTime"]),
+        "logoutTimeIST": format_ist(session.get("logoutTime")),
+        "tasksDone": session.get("tasksDone", [])
+    }
+
+
+def user_session_document(session):
+    """
+    The user_sessions copy of a listed session, keyed by the session id; the logbook sorts,
+    filters and pages on its indexed loginTime.
+    """
+    return {
+        "_id": session["id"],
+        "username": session["username"],
+        "loginTime": session["loginTime"],
+        "logoutTime": session.get("logoutTime"),
+        "tasksDone": session.get("tasksDone", [])
+    }
+
+
+def sync_user_sessions(username, sessions):
+    """Makes user_sessions hold exactly the given listed sessions of a user"""
+    documents = [user_session_document(session) for session in sessions]
+    user_sessions_collection.delete_many({'username': username, '_id': {'$nin': [doc['_id'] for doc in documents]}})
+    if documents:
+        user_sessions_collection.bulk_write(
+            [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in documents], ordered=False
+        )
+
+
 def update_session_history_report(username_to_update):
-    """Recalculates and saves the session history for a specific user with proper logout handling"""
-    logs_list = []
-    UTC = ZoneInfo("UTC")
-    IST = ZoneInfo("Asia/Kolkata")
-    
-    user_activity_doc = user_activities_collection.find_one({'username': username_to_update})
-    if not user_activity_doc or not user_activity_doc.get('activities'): 
-        return
+    """
+    Recalculates and saves the session history for a specific user from their full activity log.
+    Also stores the open session as current_session, which session_history_operations
+    continues from, and folded_until, the newest event it covers. Used to migrate/repair a
+    user's history; logging itself is incremental. The write only lands if history_version is
+    still what was read before the log, so an incremental write racing the rebuild makes it
+    start over instead of being overwritten.
+    """
+    for _ in range(SESSION_HISTORY_REBUILD_ATTEMPTS):
+        history = user_session_history_collection.find_one({'username': username_to_update}, {'history_version': 1})
+        version = history.get('history_version') if history else None
+        logs_list = []
+        
+        activities = list(iter_user_activities(username_to_update))
+        if not activities: 
+            result = user_session_history_collection.update_one(
+                {'username': username_to_update, 'history_version': version},
+                {'$set': {'current_session': None, 'history_version': (version or 0) + 1}, '$setOnInsert': {'sessions': []}},
+                upsert=history is None
+            )
+            if history is None or result.matched_count:
+                sync_user_sessions(username_to_update, [])
+                return
+            continue
 
-    activities = sorted(user_activity_doc.get('activities', []), key=lambda x: x['timestamp'])
-    session = None
-    
-    for act in activities:
-        desc = act['description']
-        utc_ts = act['timestamp']
-        
-        if desc == "Login":
-            # Close previous session if exists
-            if session:
-                # Only add session if it has real tasks OR was properly closed
-                if session["tasksDone"] or session["logoutTimeIST"]:
-                    logs_list.append(session)
-                # Otherwise, discard empty active sessions that were never properly closed
-                elif not session["logoutTimeIST"]:
-                    print(f"DEBUG: Discarding unclosed session for {username_to_update} at login")
-            
-            login_ist = utc_ts.replace(tzinfo=UTC).astimezone(IST)
-            session = {
-                "id": f"{username_to_update}_{utc_ts.timestamp()}",
-                "username": username_to_update,
-                "loginTimeIST": login_ist.strftime('%d/%m/%Y, %H:%M:%S'),
-                "logoutTimeIST": None, 
-                "tasksDone": []
-            }
-            
-        elif desc == "Logout" and session:
-            logout_ist = utc_ts.replace(tzinfo=UTC).astimezone(IST)
-            session["logoutTimeIST"] = logout_ist.strftime('%d/%m/%Y, %H:%M:%S')
+        session = None
+        
+        for act in activities:
+            desc = act['description']
+            utc_ts = act['timestamp']
             
-            # Always add session when logout is recorded, even if no tasks
-            logs_list.append(session)
-            session = None  # Clear the session after logout
+            if desc == "Login":
+                # Close previous session if exists
+                if session:
+                    # Only add session if it has real tasks OR was properly closed
+                    if session["tasksDone"] or session["logoutTime"]:
+                        logs_list.append(session)
+                    # Otherwise, discard empty active sessions that were never properly closed
+                    elif not session["logoutTime"]:
+                        print(f"DEBUG: Discarding unclosed session for {username_to_update} at login")
+                
+                session = new_session_record(username_to_update, utc_ts)
+                
+            elif desc == "Logout" and session:
+                session["logoutTime"] = utc_ts
+                
+                # Always add session when logout is recorded, even if no tasks
+                logs_list.append(session)
+                session = None  # Clear the session after logout
+                
+            elif session and desc not in ["Login", "Logout"]:
+                # Add real task to current session, avoiding duplicates
+                if desc not in session["tasksDone"]:
+                    session["tasksDone"].append(desc)
+        
+        # Handle the last session if it wasn't closed (active session)
+        if session and not session["logoutTime"]:
+            # Check if this session has any real activities
+            hasRealActivities = any(task not in SESSION_PLACEHOLDER_TASKS for task in session["tasksDone"])
             
-        elif session and desc not in ["Login", "Logout"]:
-            # Add real task to current session, avoiding duplicates
-            if desc not in session["tasksDone"]:
-                session["tasksDone"].append(desc)
-    
-    # Handle the last session if it wasn't closed (active session)
-    if session and not session["logoutTimeIST"]:
-        # Check if this session has any real activities
-        hasRealActivities = any(task not in ["Session ended with no tasks", "Active session - no tasks recorded"] 
-                              for task in session["tasksDone"])
-        
-        if hasRealActivities:
-            # Only keep active sessions that have real activities
-            logs_list.append(session)
-            print(f"DEBUG: Keeping active session for {username_to_update} with real activities")
-        else:
-            print(f"DEBUG: Discarding inactive session for {username_to_update} with no real activities")
+            if hasRealActivities:
+                # Only keep active sessions that have real activities
+                logs_list.append(session)
+                print(f"DEBUG: Keeping active session for {username_to_update} with real activities")
+            else:
+                print(f"DEBUG: Discarding inactive session for {username_to_update} with no real activities")
 
-    # Sort sessions by login time (newest first)
-    sorted_sessions = sorted(logs_list, key=lambda s: datetime.strptime(s.get('loginTimeIST', '01/01/1970, 00:00:00'), '%d/%m/%Y, %H:%M:%S'), reverse=True)
-    
-    # Update the session history
-    user_session_history_collection.update_one(
-        {'username': username_to_update},
-        {'$set': {'sessions': sorted_sessions}},
+        # Sort sessions by login time (newest first)
+        sorted_sessions = sorted(logs_list, key=lambda s: s['loginTime'], reverse=True)
+        
+        # Update the session history
+        result = user_session_history_collection.update_one(
+            {'username': username_to_update, 'history_version': version},
+            {'$set': {
+                'sessions': sorted_sessions,
+                'current_session': session,
+                'folded_until': activities[-1]['timestamp'],
+                'history_version': (version or 0) + 1
+            }},
+            upsert=history is None
+        )
+        if history is None or result.matched_count:
+            sync_user_sessions(username_to_update, sorted_sessions)
+            print(f"User session history for '{username_to_update}' has been updated with {len(sorted_sessions)} sessions.")
+            return
+    print(f"Session history of '{username_to_update}' kept changing during {SESSION_HISTORY_REBUILD_ATTEMPTS} rebuilds, giving up.")
+
+
+def session_history_operations(username, session, events, version=None):
+    """
+    Folds new (description, timestamp) events into a user's session history, starting from the
+    stored current_session. Returns the UpdateOne operations to apply in order, and the final
+    state of every listed session the events touched (for user_sessions). A Login opens
+    current_session, a task is added to it, a Logout closes it. The open session is listed at the
+    front of sessions once it has a real task (or is closed), which keeps the list newest-first and
+    identical to what update_session_history_report would produce, without replaying the log.
+
+    version is the history_version the session was read at. Each operation only matches the
+    version the previous one left and bumps it, so operations folded from a stale read (another
+    worker wrote in between) do not match, and the caller can tell from the matched count.
+    """
+    def frozen(session):
+        # Operations are encoded when written, so they must not share the dict being folded
+        return {**session, "tasksDone": list(session["tasksDone"])}
+
+    operations = []
+    touched = {}
+
+    def history_update(update, **kwargs):
+        nonlocal version
+        next_version = (version or 0) + 1
+        update.setdefault('$set', {})['history_version'] = next_version
+        operations.append(UpdateOne({'username': username, 'history_version': version}, update, **kwargs))
+        version = next_version
+
+    for description, timestamp in events:
+        utc_ts = as_stored_utc(timestamp)
+        listed = bool(session) and any(task not in SESSION_PLACEHOLDER_TASKS for task in session["tasksDone"])
+
+        if description == "Login":
+            # An unclosed previous session stays listed if it had tasks, and is dropped otherwise
+            new_session = new_session_record(username, utc_ts)
+            update = {'$set': {'current_session': frozen(new_session)}}
+            if session and session["tasksDone"] and not listed:
+                update['$push'] = {'sessions': {'$each': [frozen(session)], '$position': 0}}
+                touched[session['id']] = frozen(session)
+            history_update(update)
+            session = new_session
+
+        elif description == "Logout":
+            if not session:
+                continue
+            session["logoutTime"] = utc_ts
+            touched[session['id']] = frozen(session)
+            if listed:
+                history_update(
+                    {'$set': {'sessions.$[open].logoutTime': session["logoutTime"], 'current_session': None}},
+                    array_filters=[{'open.id': session['id']}]
+                )
+            else:
+                history_update(
+                    {'$push': {'sessions': {'$each': [frozen(session)], '$position': 0}}, '$set': {'current_session': None}}
+                )
+            session = None
+
+        elif session and description not in session["tasksDone"]:
+            session["tasksDone"].append(description)
+            if listed or description not in SESSION_PLACEHOLDER_TASKS:
+                touched[session['id']] = frozen(session)
+            if listed:
+                history_update(
+                    {'$push': {'sessions.$[open].tasksDone': description, 'current_session.tasksDone': description}},
+                    array_filters=[{'open.id': session['id']}]
+                )
+            elif description not in SESSION_PLACEHOLDER_TASKS:
+                history_update(
+                    {'$push': {'sessions': {'$each': [frozen(session)], '$position': 0}}, '$set': {'current_session': frozen(session)}}
+                )
+            else:
+                history_update({'$set': {'current_session': frozen(session)}})
+
+    return operations, list(touched.values())
+
+
+ACTIVITY_BUCKET_MAX_EVENTS = 1000
+
+
+def activity_bucket_day(timestamp):
+    """Start of the IST calendar day a timestamp falls in; activity buckets are keyed by it"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=ZoneInfo("UTC"))
+    return timestamp.astimezone(ZoneInfo("Asia/Kolkata")).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def activity_bucket_append(username, description, timestamp):
+    """Operation appending an event to the user's bucket for that day; a full bucket makes the upsert open a new one"""
+    return UpdateOne(
+        {'username': username, 'day': activity_bucket_day(timestamp), 'count': {'$lt': ACTIVITY_BUCKET_MAX_EVENTS}},
+        {'$push': {'activities': {"timestamp": timestamp, "description": description}}, '$inc': {'count': 1}},
         upsert=True
     )
-    print(f"User session history for '{username_to_update}' has been updated with {len(sorted_sessions)} sessions.")
 
-def log_action_and_update_report(username, description):
-    """Logs a new raw event and triggers a rebuild of that user's session history report. (UNCHANGED)"""
-    user_activities_collection.update_one(
-        {'username': username},
-        {'$push': {'activities': {"timestamp": get_ist_time(), "description": description}}},
-        upsert=True
+
+def iter_user_activities(username, start=None, end=None):
+    """
+    Yields a user's activities in time order, optionally only those in [start, end).
+    Only the day buckets covering the range are read; activities still in the legacy
+    single-document format (not yet migrated) are included too.
+    """
+    query = {'username': username}
+    if start or end:
+        query['day'] = {}
+        if start:
+            query['day']['$gte'] = activity_bucket_day(start)
+        if end:
+            query['day']['$lte'] = activity_bucket_day(end)
+
+    activities = []
+    legacy_doc = user_activities_collection.find_one({'username': username}, {'activities': 1})
+    if legacy_doc:
+        activities.extend(legacy_doc.get('activities', []))
+    for bucket in user_activity_buckets_collection.find(query, {'activities': 1}).sort([('day', 1), ('_id', 1)]):
+        activities.extend(bucket.get('activities', []))
+    activities.sort(key=lambda x: x['timestamp'])
+
+    start = as_stored_utc(start) if start else None
+    end = as_stored_utc(end) if end else None
+    for activity in activities:
+        if (start is None or activity['timestamp'] >= start) and (end is None or activity['timestamp'] < end):
+            yield activity
+
+
+def write_activity_batch(events):
+    """
+    Writes a batch of (username, description, timestamp) events: all bucket appends in one
+    bulk_write, then every affected user's session history changes in another, and the
+    touched sessions' user_sessions documents in a third. The history operations are guarded
+    by history_version (see session_history_operations); when any of them did not match,
+    because another worker's writer folded events for the same user meanwhile, the batch's
+    users are rebuilt from their stored events, which already include this batch.
+    """
+    user_activity_buckets_collection.bulk_write(
+        [activity_bucket_append(username, description, timestamp) for username, description, timestamp in events],
+        ordered=True
     )
-    update_session_history_report(username)
+
+    events_by_user = {}
+    for username, description, timestamp in events:
+        events_by_user.setdefault(username, []).append((description, timestamp))
+    histories = {
+        history['username']: history
+        for history in user_session_history_collection.find(
+            {'username': {'$in': list(events_by_user)}},
+            {'username': 1, 'current_session': 1, 'history_version': 1, 'folded_until': 1}
+        )
+    }
+
+    operations = []
+    listed_sessions = []
+    folded_users = []
+    for username, user_events in events_by_user.items():
+        history = histories.get(username)
+        if history is None or 'current_session' not in history:
+            # History written before current_session was tracked: rebuild it once (the events are already stored)
+            update_session_history_report(username)
+            continue
+        folded_until = history.get('folded_until')
+        if folded_until:
+            # A rebuild that read the log after these events were stored has folded them already
+            user_events = [(description, timestamp) for description, timestamp in user_events if as_stored_utc(timestamp) > folded_until]
+        current_session = history.get('current_session')
+        if current_session:
+            current_session = native_session(current_session, username)
+        user_operations, user_sessions = session_history_operations(
+            username, current_session, user_events, history.get('history_version')
+        )
+        operations.extend(user_operations)
+        listed_sessions.extend(user_sessions)
+        folded_users.append(username)
+    if operations:
+        result = user_session_history_collection.bulk_write(operations, ordered=True)
+        if result.matched_count < len(operations):
+            print(f"Session history changed concurrently for some of {folded_users}, rebuilding them.")
+            for username in folded_users:
+                update_session_history_report(username)
+            return
+    if listed_sessions:
+        user_sessions_collection.bulk_write(
+            [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in map(user_session_document, listed_sessions)],
+            ordered=False
+        )
+
+
+class ActivityLogPipeline:
+    """
+    Background writer for activity events, so requests do not wait on audit-log writes.
+    Events go into a bounded in-process queue; a worker thread drains it in batches of up to
+    batch_size events, or whatever arrived within flush_seconds, and hands each batch to
+    write_activity_batch. Events that do not fit in the queue are dropped and counted.
+    stop() (registered with atexit) flushes what is still queued.
+    """
+
+    def __init__(self, max_queue_size, batch_size, flush_seconds):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error = None
+
+    def _ensure_worker(self):
+        # Started lazily so it also exists in processes forked after import
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+                    self._thread.start()
+
+    def log(self, entries):
+        """
+        Queues (username, description) entries as one item: they share a timestamp and are
+        always written in the same batch, so an event shown on several timelines is one write.
+        """
+        self._ensure_worker()
+        timestamp = get_ist_time()
+        try:
+            self._queue.put_nowait([(username, description, timestamp) for username, description in entries])
+            with self._lock:
+                self.enqueued += len(entries)
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(entries)
+            print(f"Activity log queue full, dropped events: {entries}")
+
+    def _next_batch(self, timeout):
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.extend(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            write_activity_batch(batch)
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+                self.last_error = str(e)
+            print(f"Error writing activity batch of {len(batch)} events: {e}")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch(self.flush_seconds)
+            if batch:
+                self._write(batch)
+        while True:
+            batch = self._next_batch(0)
+            if not batch:
+                break
+            self._write(batch)
+
+    def stop(self, timeout=10):
+        """Stops the worker after writing everything still queued"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "max_queue_size": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_error": self.last_error
+            }
+
+
+activity_log_pipeline = ActivityLogPipeline(
+    app.config['ACTIVITY_LOG_QUEUE_SIZE'],
+    app.config['ACTIVITY_LOG_BATCH_SIZE'],
+    app.config['ACTIVITY_LOG_FLUSH_SECONDS']
+)
+atexit.register(activity_log_pipeline.stop)
+
+
+def log_action_and_update_report(username, description):
+    """Queues a new raw event; the activity log writer stores it and folds it into the user's session history."""
+    activity_log_pipeline.log([(username, description)])
+
+
+def log_review_event(reviewer_username, reviewer_description, annotator_username, annotator_description):
+    """
+    Logs one review action on both timelines: the reviewer's wording and the annotator's
+    are queued together and written in a single batch.
+    """
+    entries = [(reviewer_username, reviewer_description)]
+    if annotator_username and annotator_username != reviewer_username:
+        entries.append((annotator_username, annotator_description))
+    activity_log_pipeline.log(entries)
 
 def clean_sentence_text(text):
     """
@@ -643,85 +1168,104 @@ def extract_text_from_file(file, file_extension):
 
 def log_reviewer_action(reviewer_username, action_description, annotator_username=None):
     """Enhanced logging for reviewer actions"""
-    # Log for reviewer
-    log_action_and_update_report(reviewer_username, action_description)
-    
-    # Also log for annotator if provided
-    if annotator_username and annotator_username != reviewer_username:
-        user_action = action_description.replace("reviewed", "had work reviewed")
-        log_action_and_update_report(annotator_username, user_action)
+    log_review_event(
+        reviewer_username, action_description,
+        annotator_username, action_description.replace("reviewed", "had work reviewed")
+    )
 
 
 
-def update_sentence_review_status(sentence_id):
-    """Update sentence review status based on its tags with enhanced mixed-status handling"""
-    try:
-        from bson.objectid import ObjectId
-        
-        # Count remaining staged tags for this sentence
-        remaining_staged_tags = staged_tags_collection.count_documents({
-            "source_sentence_id": sentence_id,
-            "review_status": "Pending"  # Only count pending ones
-        })
-        
-        # Count approved tags for this sentence
-        approved_tags_count = tags_collection.count_documents({
-            "source_sentence_id": sentence_id
-        })
-        
-        # Count rejected tags for this sentence
-        rejected_tags_count = staged_tags_collection.count_documents({
-            "source_sentence_id": sentence_id,
-            "review_status": "Rejected"
-        })
-        
-        # Get current sentence
-        sentence = sentences_collection.find_one({"_id": ObjectId(sentence_id)})
-        if not sentence:
-            return
-            
+def review_status_from_counts(pending_count, approved_count, rejected_count, is_annotated):
+    """Sentence review status implied by its tag tallies, with enhanced mixed-status handling"""
+    if pending_count > 0:
+        # Some tags still pending review
+        return "Pending"
+    elif approved_count > 0 and rejected_count == 0:
+        # All tags approved, none rejected
+        return "Approved"
+    elif approved_count == 0 and rejected_count > 0:
+        # All tags rejected, none approved
+        return "Rejected"
+    elif approved_count > 0 and rejected_count > 0:
+        # MIXED STATUS: Some approved, some rejected
+        return "Partially Approved"
+    # No tags at all
+    return "Rejected" if is_annotated else "Pending"
+
+
+def update_sentence_review_statuses(sentence_ids):
+    """
+    Recomputes review_status/is_annotated of many sentences from their tags in one pass:
+    a single aggregation tallies pending/rejected staged tags and approved final tags per
+    sentence ($unionWith + $group), one find loads the sentences, and one bulk_write stores
+    the statuses that changed. Returns {sentence_id: new_status}.
+    """
+    sentence_ids = list({str(sentence_id) for sentence_id in sentence_ids if sentence_id and ObjectId.is_valid(str(sentence_id))})
+    if not sentence_ids:
+        return {}
+
+    tallies = {
+        row['_id']: row
+        for row in staged_tags_collection.aggregate([
+            {"$match": {"source_sentence_id": {"$in": sentence_ids}, "review_status": {"$in": ["Pending", "Rejected"]}}},
+            {"$project": {"source_sentence_id": 1, "review_status": 1}},
+            {"$unionWith": {
+                "coll": tags_collection.name,
+                "pipeline": [
+                    {"$match": {"source_sentence_id": {"$in": sentence_ids}}},
+                    {"$project": {"source_sentence_id": 1, "review_status": {"$literal": "Approved"}}}
+                ]
+            }},
+            {"$group": {
+                "_id": "$source_sentence_id",
+                "pending": {"$sum": {"$cond": [{"$eq": ["$review_status", "Pending"]}, 1, 0]}},
+                "approved": {"$sum": {"$cond": [{"$eq": ["$review_status", "Approved"]}, 1, 0]}},
+                "rejected": {"$sum": {"$cond": [{"$eq": ["$review_status", "Rejected"]}, 1, 0]}}
+            }}
+        ])
+    }
+
+    updates = []
+    status_changes = []
+    new_statuses = {}
+    for sentence in sentences_collection.find(
+        {"_id": {"$in": [ObjectId(sentence_id) for sentence_id in sentence_ids]}},
+        {"review_status": 1, "is_annotated": 1, "username": 1}
+    ):
+        sentence_id = str(sentence['_id'])
+        tally = tallies.get(sentence_id, {})
+        pending_count = tally.get('pending', 0)
+        approved_count = tally.get('approved', 0)
+        rejected_count = tally.get('rejected', 0)
         current_status = sentence.get('review_status', 'Pending')
-        annotator_username = sentence.get('username')
-        
+
         # Determine is_annotated based on the existence of any tags
-        is_annotated = (remaining_staged_tags > 0) or (approved_tags_count > 0) or (rejected_tags_count > 0) or sentence.get('is_annotated', False)
-        
-        # ENHANCED: Determine the correct status for mixed scenarios
-        if remaining_staged_tags > 0:
-            # Some tags still pending review
-            new_status = "Pending"
-        elif approved_tags_count > 0 and rejected_tags_count == 0:
-            # All tags approved, none rejected
-            new_status = "Approved"
-        elif approved_tags_count == 0 and rejected_tags_count > 0:
-            # All tags rejected, none approved
-            new_status = "Rejected"
-        elif approved_tags_count > 0 and rejected_tags_count > 0:
-            # MIXED STATUS: Some approved, some rejected
-            new_status = "Partially Approved"
-        else:
-            # No tags at all
-            if is_annotated:
-                new_status = "Rejected"
-            else:
-                new_status = "Pending"
+        is_annotated = bool(pending_count or approved_count or rejected_count or sentence.get('is_annotated', False))
+        new_status = review_status_from_counts(pending_count, approved_count, rejected_count, is_annotated)
+        new_statuses[sentence_id] = new_status
+
+        if sentence.get('review_status') != new_status or sentence.get('is_annotated') != is_annotated:
+            updates.append(UpdateOne(
+                {"_id": sentence['_id']},
+                {"$set": {"review_status": new_status, "is_annotated": is_annotated}}
+            ))
+        if current_status != new_status and sentence.get('username'):
+            status_changes.append((sentence['username'], f"Sentence status changed from '{current_status}' to '{new_status}'"))
 
-        # Update the sentence
-        sentences_collection.update_one(
-            {"_id": ObjectId(sentence_id)},
-            {"$set": {
-                "review_status": new_status,
-                "is_annotated": is_annotated
-            }}
-        )
-        
-        # Log status change
-        if current_status != new_status and annotator_username:
-            status_change_msg = f"Sentence status changed from '{current_status}' to '{new_status}'"
-            log_action_and_update_report(annotator_username, status_change_msg)
-        
-        print(f"Updated sentence {sentence_id} status: {new_status} (approved: {approved_tags_count}, rejected: {rejected_tags_count}, pending: {remaining_staged_tags})")
-        
+        print(f"Updated sentence {sentence_id} status: {new_status} (approved: {approved_count}, rejected: {rejected_count}, pending: {pending_count})")
+
+    if updates:
+        sentences_collection.bulk_write(updates, ordered=False)
+    # Log status changes
+    for username, description in status_changes:
+        log_action_and_update_report(username, description)
+    return new_statuses
+
+
+def update_sentence_review_status(sentence_id):
+    """Update sentence review status based on its tags with enhanced mixed-status handling"""
+    try:
+        update_sentence_review_statuses([sentence_id])
     except Exception as e:
         print(f"Error updating sentence status: {e}")
         
@@ -789,8 +1333,7 @@ def register():
     
     users_collection.insert_one(user_data)
     
-    user_activities_collection.insert_one({"username": username, "activities": []})
-    user_session_history_collection.insert_one({"username": username, "sessions": []})
+    user_session_history_collection.insert_one({"username": username, "sessions": [], "current_session": None})
     
     # Collect data for the email notification
     user_data_for_email = {
@@ -1460,11 +2003,9 @@ def logout():
                 print(f"Token verification failed during logout: {e}")
                 # Continue with logout even if token is invalid
         
-        # Always log the logout action and force session update
+        # Always log the logout action; this also closes the open session
         if username:
             log_action_and_update_report(username, 'Logout')
-            # Force immediate session history update
-            update_session_history_report(username)
             
         return jsonify({"message": "Logout successful"})
         
@@ -1505,6 +2046,355 @@ def get_user_data(username):
 
 # --- Visualization & Analytics Endpoints (UNCHANGED) ---
 
+# Ids per $in query when batch-resolving references
+LOOKUP_BATCH_SIZE = 50000
+
+
+def find_by_ids(collection, ids, projection=None):
+    """
+    Fetches the documents with the given ids as {id: document}, keyed the way the ids were given,
+    with one $in query per LOOKUP_BATCH_SIZE ids. Valid ObjectId strings are looked up as
+    ObjectIds and anything else as-is, like the single-document lookups this replaces.
+    """
+    keys = {}
+    for key in ids:
+        if key is None:
+            continue
+        keys.setdefault(ObjectId(key) if ObjectId.is_valid(key) else key, []).append(key)
+
+    documents = {}
+    lookup_keys = list(keys)
+    for start in range(0, len(lookup_keys), LOOKUP_BATCH_SIZE):
+        for document in collection.find({"_id": {"$in": lookup_keys[start:start + LOOKUP_BATCH_SIZE]}}, projection):
+            for key in keys.get(document["_id"], []):
+                documents[key] = document
+    return documents
+
+
+def tag_scope(project_id, language):
+    """
+    Project fields stamped on every tags/staged_tags/search_tags document when it is written,
+    so project and language filters are indexed equality matches instead of sentence joins.
+    """
+    return {"project_id": project_id, "language": language}
+
+
+def sentence_tag_scope(sentence_id):
+    """tag_scope of the project a sentence belongs to"""
+    sentence = sentences_collection.find_one({"_id": ObjectId(sentence_id)}, {"project_id": 1}) if ObjectId.is_valid(sentence_id) else None
+    project_id = sentence.get("project_id") if sentence else None
+    project = find_by_ids(projects_collection, [project_id], {"language": 1}).get(project_id) if project_id else None
+    return tag_scope(project_id, project.get("language", "Unknown") if project else "Unknown")
+
+
+def resolve_tag_projects(tags, sentence_fields=()):
+    """
+    Joins tags to their sentence and project in two batched queries instead of two lookups per tag.
+    Returns {source_sentence_id: {"sentence": ..., "project": ... or None}} for the sentences that exist;
+    sentences carry project_id plus sentence_fields, projects their name and language.
+    """
+    sentence_projection = {"project_id": 1, **{field: 1 for field in sentence_fields}}
+    sentences = find_by_ids(
+        sentences_collection,
+        {tag.get("source_sentence_id") for tag in tags if tag.get("source_sentence_id")},
+        sentence_projection
+    )
+    projects = find_by_ids(
+        projects_collection,
+        {sentence.get("project_id") for sentence in sentences.values() if sentence.get("project_id")},
+        {"name": 1, "language": 1}
+    )
+    return {
+        sentence_id: {
+            "sentence": sentence,
+            "project": projects.get(sentence.get("project_id")) if sentence.get("project_id") else None
+        }
+        for sentence_id, sentence in sentences.items()
+    }
+
+
+# --- Analytics Rollups ---
+
+# One rollup row per combination; each row counts the approved tags having it
+ROLLUP_DIMENSIONS = ("day", "tag", "username", "project_id", "language")
+# Rollup rows carry a HyperLogLog sketch of their phrases with 2**precision registers (~0.8% error)
+PHRASE_SKETCH_PRECISION = 14
+
+
+def rollup_day(annotation_date):
+    """The "%Y-%m-%d" day an annotation date is rolled up under, as $dateToString reads the stored date"""
+    if not isinstance(annotation_date, datetime):
+        return None
+    return as_stored_utc(annotation_date).strftime("%Y-%m-%d")
+
+
+def phrase_register(text):
+    """
+    The HyperLogLog register a phrase sets, as (register index string, rank). Phrases are
+    compared lowercased and trimmed, like the analytics always have.
+    """
+    digest = int.from_bytes(hashlib.blake2b((text or "").lower().strip().encode("utf-8"), digest_size=8).digest(), "big")
+    rest_bits = 64 - PHRASE_SKETCH_PRECISION
+    rest = digest & ((1 << rest_bits) - 1)
+    return str(digest >> rest_bits), rest_bits - rest.bit_length() + 1
+
+
+def phrase_sketch(texts):
+    """Sparse HyperLogLog sketch {register: rank} of some phrases"""
+    sketch = {}
+    for text in texts:
+        register, rank = phrase_register(text)
+        if rank > sketch.get(register, 0):
+            sketch[register] = rank
+    return sketch
+
+
+def merge_phrase_sketch(sketch, other):
+    """Merges other into sketch (register-wise max); the result sketches the union of both phrase sets"""
+    for register, rank in other.items():
+        if rank > sketch.get(register, 0):
+            sketch[register] = rank
+    return sketch
+
+
+def estimate_distinct_phrases(sketch):
+    """HyperLogLog estimate of the distinct phrases a sketch has seen, linear counting while registers are empty"""
+    if not sketch:
+        return 0
+    registers = 1 << PHRASE_SKETCH_PRECISION
+    empty = registers - len(sketch)
+    estimate = 0.7213 / (1 + 1.079 / registers) * registers * registers / (empty + sum(2.0 ** -rank for rank in sketch.values()))
+    if estimate <= 2.5 * registers and empty:
+        estimate = registers * math.log(registers / empty)
+    return int(round(estimate))
+
+
+def rollup_key(tag):
+    return (
+        rollup_day(tag.get("annotation_date")),
+        tag.get("tag"),
+        tag.get("username"),
+        tag.get("project_id"),
+        tag.get("language")
+    )
+
+
+def apply_rollup_changes(tag_docs, delta):
+    """
+    $inc's the rollup rows of inserted (+1) or deleted (-1) approved tags, one upsert per
+    distinct row. Inserts also widen the row's first/last annotation dates and $max their
+    phrases into its sketch registers; deletes leave both for reconcile_analytics_rollups
+    to narrow, since a sketch cannot forget a phrase.
+    """
+    rows = {}
+    for tag in tag_docs:
+        key = rollup_key(tag)
+        annotation_date = tag.get("annotation_date")
+        annotation_date = as_stored_utc(annotation_date) if isinstance(annotation_date, datetime) else None
+        row = rows.setdefault(key, {"count": 0, "first_annotation": annotation_date, "last_annotation": annotation_date, "texts": []})
+        row["count"] += delta
+        row["texts"].append(tag.get("text"))
+        if annotation_date:
+            row["first_annotation"] = min(row["first_annotation"] or annotation_date, annotation_date)
+            row["last_annotation"] = max(row["last_annotation"] or annotation_date, annotation_date)
+
+    operations = []
+    for key, row in rows.items():
+        update = {"$inc": {"count": row["count"]}}
+        if delta > 0:
+            update["$max"] = {f"phrases.{register}": rank for register, rank in phrase_sketch(row["texts"]).items()}
+            if row["first_annotation"]:
+                update["$min"] = {"first_annotation": row["first_annotation"]}
+                update["$max"]["last_annotation"] = row["last_annotation"]
+        operations.append(UpdateOne(dict(zip(ROLLUP_DIMENSIONS, key)), update, upsert=True))
+    if operations:
+        analytics_rollups_collection.bulk_write(operations, ordered=False)
+    rollup_reconciler.ensure_started()
+
+
+def reconcile_analytics_rollups(batch_size=1000, project_id=None):
+    """
+    Recounts every rollup row and its phrase sketch from the tags with one aggregation,
+    rewrites the rows that drifted and deletes the rows no tag has any more. Safe to re-run;
+    also builds the rollups from scratch. Writes racing the recount are corrected by the next run.
+    With project_id, only that project's tags and rows are recounted (on the project_id indexes).
+    """
+    scope = {"project_id": project_id} if project_id else {}
+    recounted = {}
+    for row in tags_collection.aggregate([
+        {"$match": scope},
+        {"$group": {
+            "_id": {
+                "day": {"$cond": [
+                    {"$eq": [{"$type": "$annotation_date"}, "date"]},
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": "$annotation_date"}},
+                    None
+                ]},
+                "tag": "$tag",
+                "username": "$username",
+                "project_id": "$project_id",
+                "language": "$language"
+            },
+            "count": {"$sum": 1},
+            "first_annotation": {"$min": "$annotation_date"},
+            "last_annotation": {"$max": "$annotation_date"},
+            "texts": {"$addToSet": "$text"}
+        }}
+    ], allowDiskUse=True):
+        key = tuple(row["_id"].get(dimension) for dimension in ROLLUP_DIMENSIONS)
+        recounted[key] = {
+            "count": row["count"],
+            "first_annotation": row["first_annotation"] if isinstance(row["first_annotation"], datetime) else None,
+            "last_annotation": row["last_annotation"] if isinstance(row["last_annotation"], datetime) else None,
+            "phrases": phrase_sketch(row["texts"])
+        }
+
+    operations = []
+    rewritten = 0
+    deleted = 0
+
+    def flush():
+        if operations:
+            analytics_rollups_collection.bulk_write(operations, ordered=False)
+            operations.clear()
+
+    for existing in analytics_rollups_collection.find(scope):
+        key = tuple(existing.get(dimension) for dimension in ROLLUP_DIMENSIONS)
+        row = recounted.pop(key, None)
+        if row is None:
+            operations.append(DeleteOne({"_id": existing["_id"]}))
+            deleted += 1
+        elif any(existing.get(field) != value for field, value in row.items()):
+            operations.append(UpdateOne({"_id": existing["_id"]}, {"$set": row}))
+            rewritten += 1
+        if len(operations) >= batch_size:
+            flush()
+    for key, row in recounted.items():
+        operations.append(ReplaceOne(dict(zip(ROLLUP_DIMENSIONS, key)), {**dict(zip(ROLLUP_DIMENSIONS, key)), **row}, upsert=True))
+        if len(operations) >= batch_size:
+            flush()
+    flush()
+    return {"rewritten": rewritten, "created": len(recounted), "deleted": deleted}
+
+
+class RollupReconciler:
+    """
+    Runs reconcile_analytics_rollups every interval seconds on a daemon thread, correcting
+    counters that drifted (increments lost to a crash, tags changed outside record_tag_changes).
+    Started lazily by the rollup reads and writes, so it also runs in forked workers; a lease
+    document in index_versions lets only one worker per interval reconcile. The first pass
+    runs immediately when analytics_rollups is still empty.
+    """
+
+    LEASE_ID = "analytics-rollup-reconcile-lease"
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.owner = f"{os.getpid()}-{secrets.token_hex(8)}"
+        self._thread = None
+        self._lock = threading.Lock()
+        self.last_run = None
+        self.last_summary = None
+        self.last_error = None
+
+    def ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="analytics-rollup-reconciler", daemon=True)
+                    self._thread.start()
+
+    def _acquire_lease(self):
+        """Claims the reconcile lease for one interval unless another worker holds an unexpired one"""
+        now = get_ist_time()
+        try:
+            index_versions_collection.find_one_and_update(
+                {"_id": self.LEASE_ID, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.interval)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _run(self):
+        try:
+            wait = analytics_rollups_collection.find_one({}, {"_id": 1}) is not None
+        except Exception as e:
+            print(f"Error checking analytics rollups: {e}")
+            wait = True
+        while True:
+            if wait:
+                time.sleep(self.interval)
+            wait = True
+            try:
+                if not self._acquire_lease():
+                    continue
+                self.last_summary = reconcile_analytics_rollups()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error reconciling analytics rollups: {e}")
+            self.last_run = get_ist_time()
+
+
+rollup_reconciler = RollupReconciler(app.config['ANALYTICS_ROLLUP_RECONCILE_SECONDS'])
+
+
+def find_rollups(username=None, project_id=None, language=None, start_date=None, end_date=None):
+    """
+    Rollup rows matching the analytics filters. start_date/end_date are inclusive
+    YYYY-MM-DD days and, like the annotation_date filters, apply only together.
+    """
+    rollup_reconciler.ensure_started()
+    match = {"count": {"$gt": 0}}
+    if username:
+        match["username"] = username
+    if project_id:
+        match["project_id"] = project_id
+    if language:
+        match["language"] = language
+    if start_date and end_date:
+        match["day"] = {
+            "$gte": datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m-%d"),
+            "$lte": datetime.strptime(end_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        }
+    return list(analytics_rollups_collection.find(match, {"_id": 0}))
+
+
+def fold_rollups(rows, key):
+    """
+    Sums rollup rows by key(row), skipping rows it maps to None: {value: {"count",
+    "first_annotation", "last_annotation", the merged "phrases" sketch, and per dimension
+    the set of values seen}}
+    """
+    groups = {}
+    for row in rows:
+        value = key(row)
+        if value is None:
+            continue
+        group = groups.get(value)
+        if group is None:
+            group = groups[value] = {
+                "count": 0,
+                "first_annotation": None,
+                "last_annotation": None,
+                "phrases": {},
+                **{dimension: set() for dimension in ROLLUP_DIMENSIONS}
+            }
+        group["count"] += row["count"]
+        merge_phrase_sketch(group["phrases"], row.get("phrases") or {})
+        first, last = row.get("first_annotation"), row.get("last_annotation")
+        if first and (group["first_annotation"] is None or first < group["first_annotation"]):
+            group["first_annotation"] = first
+        if last and (group["last_annotation"] is None or last > group["last_annotation"]):
+            group["last_annotation"] = last
+        for dimension in ROLLUP_DIMENSIONS:
+            if row.get(dimension) is not None:
+                group[dimension].add(row[dimension])
+    return groups
+
+
 @app.route("/api/analytics/mwe-distribution", methods=["GET"])
 @admin_required
 def get_mwe_distribution():
@@ -1523,6 +2413,10 @@ def get_mwe_distribution():
         tag_filter = {}
         if username:
             tag_filter["username"] = username
+        if project_id:
+            tag_filter["project_id"] = project_id
+        if language:
+            tag_filter["language"] = language
         if start_date and end_date:
             try:
                 start_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -1531,110 +2425,55 @@ def get_mwe_distribution():
             except ValueError:
                 return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
         
-        # Get filtered tags with enhanced data
-        all_tags = list(tags_collection.find(tag_filter))
-        print(f"DEBUG: Found {len(all_tags)} tags with filter: {tag_filter}")
-        
-        # Enhanced statistics with more metrics
+        # Counted from the rollups; distinct phrases are estimated from their merged sketches
+        rows = find_rollups(username, project_id, language, start_date, end_date)
+        for row in rows:
+            if row.get("tag") is None:
+                row["tag"] = "Unknown"
+            if row.get("username") is None:
+                row["username"] = "Unknown"
+        total_annotations = sum(row["count"] for row in rows)
+        print(f"DEBUG: Found {total_annotations} tags in {len(rows)} rollup rows with filter: {tag_filter}")
+
+        mwe_type_stats = fold_rollups(rows, lambda row: row["tag"])
+        user_stats = fold_rollups(rows, lambda row: row["username"])
+        time_stats = fold_rollups(rows, lambda row: row["day"][:7] if row.get("day") else None)
+
+        # Enhanced project and language statistics
+        project_rollups = fold_rollups(rows, lambda row: row.get("project_id"))
+        projects = find_by_ids(projects_collection, project_rollups, {"name": 1, "language": 1})
         project_stats = {}
-        mwe_type_stats = {}
         language_stats = {}
-        user_stats = {}
-        time_stats = {}
-        
-        for tag in all_tags:
-            tag_type = tag.get("tag", "Unknown")
-            tag_user = tag.get("username", "Unknown")
-            tag_text = tag.get("text", "").lower().strip()
-            sentence_id = tag.get("source_sentence_id")
-            annotation_date = tag.get("annotation_date")
-            
-            # Enhanced MWE type statistics
-            if tag_type not in mwe_type_stats:
-                mwe_type_stats[tag_type] = {
-                    "count": 0, 
-                    "unique_words": set(),
-                    "unique_users": set(),
-                    "first_annotation": annotation_date,
-                    "last_annotation": annotation_date
+        for project_key, stats in project_rollups.items():
+            project = projects.get(project_key)
+            project_name = "Unassigned / Unknown Project"
+            project_language = "Unknown"
+            if project:
+                project_name = project.get("name", "Unknown Project")
+                project_language = project.get("language", "Unknown")
+
+            if project_name not in project_stats:
+                project_stats[project_name] = {
+                    "count": 0,
+                    "mwe_types": set(),
+                    "users": set(),
+                    "language": project_language
                 }
-            mwe_type_stats[tag_type]["count"] += 1
-            mwe_type_stats[tag_type]["unique_words"].add(tag_text)
-            mwe_type_stats[tag_type]["unique_users"].add(tag_user)
-            
-            # Update date range
-            if annotation_date:
-                if mwe_type_stats[tag_type]["first_annotation"] is None or annotation_date < mwe_type_stats[tag_type]["first_annotation"]:
-                    mwe_type_stats[tag_type]["first_annotation"] = annotation_date
-                if mwe_type_stats[tag_type]["last_annotation"] is None or annotation_date > mwe_type_stats[tag_type]["last_annotation"]:
-                    mwe_type_stats[tag_type]["last_annotation"] = annotation_date
-            
-            # Enhanced user statistics
-            if tag_user not in user_stats:
-                user_stats[tag_user] = {
-                    "count": 0, 
+            project_stats[project_name]["count"] += stats["count"]
+            project_stats[project_name]["mwe_types"] |= stats["tag"]
+            project_stats[project_name]["users"] |= stats["username"]
+
+            if project_language not in language_stats:
+                language_stats[project_language] = {
+                    "count": 0,
                     "mwe_types": set(),
-                    "unique_phrases": set(),
-                    "first_annotation": annotation_date,
-                    "last_annotation": annotation_date
+                    "projects": set(),
+                    "users": set()
                 }
-            user_stats[tag_user]["count"] += 1
-            user_stats[tag_user]["mwe_types"].add(tag_type)
-            user_stats[tag_user]["unique_phrases"].add(tag_text)
-            
-            # Time-based statistics (by month)
-            if annotation_date:
-                month_key = annotation_date.strftime("%Y-%m")
-                if month_key not in time_stats:
-                    time_stats[month_key] = {"count": 0, "users": set()}
-                time_stats[month_key]["count"] += 1
-                time_stats[month_key]["users"].add(tag_user)
-            
-            # Enhanced project and language statistics
-            if sentence_id:
-                sentence = sentences_collection.find_one({"_id": ObjectId(sentence_id)})
-                if sentence:
-                    project_id_from_sentence = sentence.get("project_id")
-                    
-                    project_name = "Unassigned / Unknown Project"
-                    project_language = "Unknown"
-                    
-                    if project_id_from_sentence:
-                        try:
-                            project = projects_collection.find_one({"_id": ObjectId(project_id_from_sentence)})
-                            if project:
-                                project_name = project.get("name", "Unknown Project")
-                                project_language = project.get("language", "Unknown")
-                        except:
-                            project = projects_collection.find_one({"_id": project_id_from_sentence})
-                            if project:
-                                project_name = project.get("name", "Unknown Project")
-                                project_language = project.get("language", "Unknown")
-                    
-                    # Enhanced project stats
-                    if project_name not in project_stats:
-                        project_stats[project_name] = {
-                            "count": 0,
-                            "mwe_types": set(),
-                            "users": set(),
-                            "language": project_language
-                        }
-                    project_stats[project_name]["count"] += 1
-                    project_stats[project_name]["mwe_types"].add(tag_type)
-                    project_stats[project_name]["users"].add(tag_user)
-                    
-                    # Enhanced language stats
-                    if project_language not in language_stats:
-                        language_stats[project_language] = {
-                            "count": 0, 
-                            "mwe_types": set(),
-                            "projects": set(),
-                            "users": set()
-                        }
-                    language_stats[project_language]["count"] += 1
-                    language_stats[project_language]["mwe_types"].add(tag_type)
-                    language_stats[project_language]["projects"].add(project_name)
-                    language_stats[project_language]["users"].add(tag_user)
+            language_stats[project_language]["count"] += stats["count"]
+            language_stats[project_language]["mwe_types"] |= stats["tag"]
+            language_stats[project_language]["projects"].add(project_name)
+            language_stats[project_language]["users"] |= stats["username"]
         
         # Convert to enhanced response format
         project_distribution = []
@@ -1653,11 +2492,11 @@ def get_mwe_distribution():
             mwe_types_distribution.append({
                 "mwe_type": mwe_type,
                 "count": stats["count"],
-                "unique_word_count": len(stats["unique_words"]),
-                "unique_user_count": len(stats["unique_users"]),
+                "unique_word_count": estimate_distinct_phrases(stats["phrases"]),
+                "unique_user_count": len(stats["username"]),
                 "first_annotation": stats["first_annotation"].isoformat() if stats["first_annotation"] else None,
                 "last_annotation": stats["last_annotation"].isoformat() if stats["last_annotation"] else None,
-                "avg_per_user": stats["count"] / max(len(stats["unique_users"]), 1)
+                "avg_per_user": stats["count"] / max(len(stats["username"]), 1)
             })
         
         language_distribution = []
@@ -1675,11 +2514,11 @@ def get_mwe_distribution():
             user_distribution.append({
                 "username": user,
                 "count": stats["count"],
-                "mwe_type_count": len(stats["mwe_types"]),
-                "unique_phrase_count": len(stats["unique_phrases"]),
+                "mwe_type_count": len(stats["tag"]),
+                "unique_phrase_count": estimate_distinct_phrases(stats["phrases"]),
                 "first_annotation": stats["first_annotation"].isoformat() if stats["first_annotation"] else None,
                 "last_annotation": stats["last_annotation"].isoformat() if stats["last_annotation"] else None,
-                "productivity_score": stats["count"] / max(len(stats["mwe_types"]), 1)
+                "productivity_score": stats["count"] / max(len(stats["tag"]), 1)
             })
         
         # Time distribution
@@ -1688,7 +2527,7 @@ def get_mwe_distribution():
             time_distribution.append({
                 "month": month,
                 "count": stats["count"],
-                "active_users": len(stats["users"])
+                "active_users": len(stats["username"])
             })
         
         # Overall summary statistics
@@ -1697,14 +2536,14 @@ def get_mwe_distribution():
         total_languages = len(language_stats)
         total_mwe_types = len(mwe_type_stats)
         
-        avg_annotations_per_user = len(all_tags) / max(total_users, 1)
-        avg_mwe_types_per_user = sum(len(stats["mwe_types"]) for stats in user_stats.values()) / max(total_users, 1)
+        avg_annotations_per_user = total_annotations / max(total_users, 1)
+        avg_mwe_types_per_user = sum(len(stats["tag"]) for stats in user_stats.values()) / max(total_users, 1)
         
-        print(f"DEBUG: Enhanced analytics processed - Tags: {len(all_tags)}, Users: {total_users}, Projects: {total_projects}")
+        print(f"DEBUG: Enhanced analytics processed - Tags: {total_annotations}, Users: {total_users}, Projects: {total_projects}")
         
         return jsonify({
             "summary": {
-                "total_annotations": len(all_tags),
+                "total_annotations": total_annotations,
                 "total_users": total_users,
                 "total_projects": total_projects,
                 "total_languages": total_languages,
@@ -1848,16 +2687,10 @@ def get_annotation_timeline():
         match_filter = {}
         if username:
             match_filter["username"] = username
-        
-        # If project_id is provided, filter by project sentences
         if project_id:
-            project_sentences = list(sentences_collection.find(
-                {"project_id": project_id}, 
-                {"_id": 1}
-            ))
-            sentence_ids = [str(s["_id"]) for s in project_sentences]
-            if sentence_ids:
-                match_filter["source_sentence_id"] = {"$in": sentence_ids}
+            match_filter["project_id"] = project_id
+        if language:
+            match_filter["language"] = language
         
         # Calculate date range (last 30 days)
         end_date = get_ist_time()
@@ -1931,13 +2764,8 @@ def download_analytics_report():
         if language:
             tag_filter["language"] = language
         if project_id:
-            project_sentences = list(sentences_collection.find(
-                {"project_id": project_id}, 
-                {"_id": 1}
-            ))
-            sentence_ids = [str(s["_id"]) for s in project_sentences]
-            if sentence_ids:
-                tag_filter["source_sentence_id"] = {"$in": sentence_ids}
+            tag_filter["project_id"] = project_id
+        start_dt = end_dt = None
         if start_date and end_date:
             try:
                 start_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -1948,9 +2776,11 @@ def download_analytics_report():
         
         print(f"DEBUG: Enhanced filter for report: {tag_filter}")
         
-        # Get comprehensive data
-        all_tags = list(tags_collection.find(tag_filter))
-        print(f"DEBUG: Found {len(all_tags)} tags for enhanced report")
+        # Tag statistics come from the columnar snapshot of the tags
+        columns = tag_columns.snapshot()
+        report_mask = columns.select(project_id=project_id, language=language, start=start_dt, end=end_dt)
+        total_annotations = int(report_mask.sum())
+        print(f"DEBUG: Found {total_annotations} tags for enhanced report")
         
         # Enhanced sentence statistics
         pipeline = [
@@ -1994,6 +2824,9 @@ def download_analytics_report():
         # Enhanced user statistics
         user_stats = []
         all_users = list(users_collection.find({}))
+        all_tags_mask = columns.select()
+        user_tag_counts = columns.counts(all_tags_mask, "username")
+        user_type_counts = columns.distinct_counts(all_tags_mask, "username", "tag")
         
         for user in all_users:
             username = user["username"]
@@ -2024,16 +2857,13 @@ def download_analytics_report():
                 user_total_sentences = 0
                 user_annotated_sentences = 0
             
-            # User tag statistics
-            user_tags = list(tags_collection.find({"username": username}))
-            user_tags_count = len(user_tags)
-            
-            # User MWE type diversity
-            user_mwe_types = set(tag.get("tag", "Unknown") for tag in user_tags)
+            # User tag statistics and MWE type diversity
+            user_tags_count = user_tag_counts.get(username, 0)
+            user_mwe_type_count = user_type_counts.get(username, 0)
             
             # Calculate enhanced metrics
             approval_rate = (user_annotated_sentences / user_total_sentences * 100) if user_total_sentences > 0 else 0
-            productivity_score = user_tags_count / max(len(user_mwe_types), 1)
+            productivity_score = user_tags_count / max(user_mwe_type_count, 1)
             
             user_stats.append({
                 "username": username,
@@ -2043,7 +2873,7 @@ def download_analytics_report():
                 "total_sentences": user_total_sentences,
                 "annotated_sentences": user_annotated_sentences,
                 "total_annotations": user_tags_count,
-                "mwe_type_diversity": len(user_mwe_types),
+                "mwe_type_diversity": user_mwe_type_count,
                 "approval_rate": round(approval_rate, 1),
                 "productivity_score": round(productivity_score, 2),
                 "status": "Active" if user_tags_count > 0 else "Inactive"
@@ -2051,52 +2881,28 @@ def download_analytics_report():
 
         # Enhanced MWE type statistics
         mwe_stats = []
-        mwe_type_counts = {}
+        mwe_phrases = columns.distinct_counts(report_mask, "tag", "phrase")
+        mwe_annotators = columns.distinct_counts(report_mask, "tag", "username")
+        mwe_projects = columns.distinct_counts(report_mask, "tag", "project_id", skip_none=True)
+        mwe_dates = columns.date_ranges(report_mask, "tag")
         
-        for tag in all_tags:
-            mwe_type = tag.get("tag", "Unknown")
-            if mwe_type not in mwe_type_counts:
-                mwe_type_counts[mwe_type] = {
-                    "count": 0,
-                    "unique_phrases": set(),
-                    "unique_annotators": set(),
-                    "projects": set(),
-                    "first_annotation": tag.get("annotation_date"),
-                    "last_annotation": tag.get("annotation_date")
-                }
-            mwe_type_counts[mwe_type]["count"] += 1
-            mwe_type_counts[mwe_type]["unique_phrases"].add(tag.get("text", "").lower())
-            mwe_type_counts[mwe_type]["unique_annotators"].add(tag.get("username", ""))
-            
-            # Track projects
-            if tag.get("source_sentence_id"):
-                sentence = sentences_collection.find_one({"_id": ObjectId(tag["source_sentence_id"])})
-                if sentence and sentence.get("project_id"):
-                    mwe_type_counts[mwe_type]["projects"].add(sentence["project_id"])
-            
-            # Update date range
-            annotation_date = tag.get("annotation_date")
-            if annotation_date:
-                if mwe_type_counts[mwe_type]["first_annotation"] is None or annotation_date < mwe_type_counts[mwe_type]["first_annotation"]:
-                    mwe_type_counts[mwe_type]["first_annotation"] = annotation_date
-                if mwe_type_counts[mwe_type]["last_annotation"] is None or annotation_date > mwe_type_counts[mwe_type]["last_annotation"]:
-                    mwe_type_counts[mwe_type]["last_annotation"] = annotation_date
-        
-        for mwe_type, stats in mwe_type_counts.items():
+        for mwe_type, count in columns.counts(report_mask, "tag").items():
+            first_annotation, last_annotation = mwe_dates.get(mwe_type, (None, None))
             mwe_stats.append({
-                "mwe_type": mwe_type,
-                "count": stats["count"],
-                "unique_phrases_count": len(stats["unique_phrases"]),
-                "unique_annotators_count": len(stats["unique_annotators"]),
-                "project_count": len(stats["projects"]),
-                "first_annotation": stats["first_annotation"].strftime("%Y-%m-%d") if stats["first_annotation"] else "N/A",
-                "last_annotation": stats["last_annotation"].strftime("%Y-%m-%d") if stats["last_annotation"] else "N/A",
-                "popularity_rank": "High" if stats["count"] > 100 else "Medium" if stats["count"] > 50 else "Low"
+                "mwe_type": "Unknown" if mwe_type is None else mwe_type,
+                "count": count,
+                "unique_phrases_count": mwe_phrases.get(mwe_type, 0),
+                "unique_annotators_count": mwe_annotators.get(mwe_type, 0),
+                "project_count": mwe_projects.get(mwe_type, 0),
+                "first_annotation": first_annotation.strftime("%Y-%m-%d") if first_annotation else "N/A",
+                "last_annotation": last_annotation.strftime("%Y-%m-%d") if last_annotation else "N/A",
+                "popularity_rank": "High" if count > 100 else "Medium" if count > 50 else "Low"
             })
 
         # Enhanced project statistics
         project_stats = []
         all_projects = list(projects_collection.find({}))
+        project_tag_counts = columns.counts(all_tags_mask, "project_id")
         
         for project in all_projects:
             project_id_str = str(project["_id"])
@@ -2147,9 +2953,7 @@ def download_analytics_report():
                 project_annotators = 0
             
             # Project tag statistics
-            project_tags_count = tags_collection.count_documents({
-                "source_sentence_id": {"$in": [str(s["_id"]) for s in sentences_collection.find({"project_id": project_id_str}, {"_id": 1})]}
-            })
+            project_tags_count = project_tag_counts.get(project_id_str, 0)
             
             completion_rate = (project_annotated_sentences / project_total_sentences * 100) if project_total_sentences > 0 else 0
             annotation_density = (project_tags_count / project_total_sentences) if project_total_sentences > 0 else 0
@@ -2186,10 +2990,10 @@ def download_analytics_report():
             writer.writerow(["Total Sentences", total_sentences])
             writer.writerow(["Annotated Sentences", annotated_sentences])
             writer.writerow(["Annotation Rate", f"{(annotated_sentences/total_sentences*100):.1f}%" if total_sentences > 0 else "0%"])
-            writer.writerow(["Total Annotations", len(all_tags)])
+            writer.writerow(["Total Annotations", total_annotations])
             writer.writerow(["Total Annotators", total_annotators])
             writer.writerow(["Total Projects", len(project_stats)])
-            writer.writerow(["Average Annotations per User", f"{(len(all_tags)/max(total_annotators, 1)):.1f}"])
+            writer.writerow(["Average Annotations per User", f"{(total_annotations/max(total_annotators, 1)):.1f}"])
             writer.writerow([])
             
             if detail_level in ["detailed", "comprehensive"]:
@@ -2249,17 +3053,17 @@ def download_analytics_report():
                 writer.writerow([])
                 writer.writerow(["DETAILED ANNOTATION DATA"])
                 writer.writerow(["Annotation ID", "MWE Type", "Phrase", "Annotator", "Project", "Sentence Text Preview", "Annotation Date"])
-                for i, tag in enumerate(all_tags[:1000]):  # Limit to first 1000 for file size
+                detailed_tags = list(tags_collection.find(tag_filter).limit(1000))  # Limit to first 1000 for file size
+                detailed_projects = resolve_tag_projects(detailed_tags, sentence_fields=("textContent",))
+                for i, tag in enumerate(detailed_tags):
                     sentence_text = "N/A"
                     project_name = "N/A"
-                    if tag.get("source_sentence_id"):
-                        sentence = sentences_collection.find_one({"_id": ObjectId(tag["source_sentence_id"])})
-                        if sentence:
-                            sentence_text = sentence.get("textContent", "N/A")[:50] + "..." if len(sentence.get("textContent", "")) > 50 else sentence.get("textContent", "N/A")
-                            if sentence.get("project_id"):
-                                project = projects_collection.find_one({"_id": ObjectId(sentence["project_id"])})
-                                if project:
-                                    project_name = project.get("name", "N/A")
+                    sentence_project = detailed_projects.get(tag.get("source_sentence_id")) if tag.get("source_sentence_id") else None
+                    if sentence_project:
+                        sentence = sentence_project["sentence"]
+                        sentence_text = sentence.get("textContent", "N/A")[:50] + "..." if len(sentence.get("textContent", "")) > 50 else sentence.get("textContent", "N/A")
+                        if sentence_project["project"]:
+                            project_name = sentence_project["project"].get("name", "N/A")
                     
                     writer.writerow([
                         str(tag["_id"]),
@@ -2293,10 +3097,10 @@ def download_analytics_report():
                     "total_sentences": total_sentences,
                     "annotated_sentences": annotated_sentences,
                     "annotation_rate": round((annotated_sentences/total_sentences*100), 1) if total_sentences > 0 else 0,
-                    "total_annotations": len(all_tags),
+                    "total_annotations": total_annotations,
                     "total_annotators": total_annotators,
                     "total_projects": len(project_stats),
-                    "avg_annotations_per_user": round((len(all_tags)/max(total_annotators, 1)), 1)
+                    "avg_annotations_per_user": round((total_annotations/max(total_annotators, 1)), 1)
                 },
                 "user_performance": sorted(user_stats, key=lambda x: x["total_annotations"], reverse=True),
                 "mwe_statistics": sorted(mwe_stats, key=lambda x: x["count"], reverse=True),
@@ -2305,7 +3109,7 @@ def download_analytics_report():
                     "top_performer": max(user_stats, key=lambda x: x["total_annotations"]) if user_stats else None,
                     "most_common_mwe": max(mwe_stats, key=lambda x: x["count"]) if mwe_stats else None,
                     "most_complete_project": max(project_stats, key=lambda x: x["completion_rate"]) if project_stats else None,
-                    "annotation_trend": "Growing" if len(all_tags) > 1000 else "Stable" if len(all_tags) > 500 else "Developing"
+                    "annotation_trend": "Growing" if total_annotations > 1000 else "Stable" if total_annotations > 500 else "Developing"
                 }
             }), 200
             
@@ -2326,102 +3130,66 @@ def download_pdf_with_charts():
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
         
-        # Build filter for tags (same as existing analytics)
-        tag_filter = {}
-        if username:
-            tag_filter["username"] = username
+        # Date range for tags (same as existing analytics)
+        start_dt = end_dt = None
         if start_date and end_date:
             try:
                 start_dt = datetime.strptime(start_date, "%Y-%m-%d")
                 end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-                tag_filter["annotation_date"] = {"$gte": start_dt, "$lte": end_dt}
             except ValueError:
                 return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
         
-        # Get all the analytics data needed for charts
-        all_tags = list(tags_collection.find(tag_filter))
-        
-        # Calculate statistics (same as your existing analytics logic)
-        project_stats = {}
-        mwe_type_stats = {}
-        language_stats = {}
-        user_stats = {}
-        
-        for tag in all_tags:
-            tag_type = tag.get("tag", "Unknown")
-            tag_user = tag.get("username", "Unknown")
-            sentence_id = tag.get("source_sentence_id")
-            
-            # Count by MWE type
-            if tag_type not in mwe_type_stats:
-                mwe_type_stats[tag_type] = {"count": 0, "unique_words": set()}
-            mwe_type_stats[tag_type]["count"] += 1
-            mwe_type_stats[tag_type]["unique_words"].add(tag.get("text", "").lower())
-            
-            # Count by user
-            if tag_user not in user_stats:
-                user_stats[tag_user] = {"count": 0, "mwe_types": set()}
-            user_stats[tag_user]["count"] += 1
-            user_stats[tag_user]["mwe_types"].add(tag_type)
-            
-            # Count by project and language
-            if sentence_id:
-                sentence = sentences_collection.find_one({"_id": ObjectId(sentence_id)})
-                if sentence:
-                    project_id_from_sentence = sentence.get("project_id")
-                    
-                    project_name = "Unassigned / Unknown Project"
-                    project_language = "Unknown"
-                    
-                    if project_id_from_sentence:
-                        try:
-                            project = projects_collection.find_one({"_id": ObjectId(project_id_from_sentence)})
-                            if project:
-                                project_name = project.get("name", "Unknown Project")
-                                project_language = project.get("language", "Unknown")
-                        except:
-                            project = projects_collection.find_one({"_id": project_id_from_sentence})
-                            if project:
-                                project_name = project.get("name", "Unknown Project")
-                                project_language = project.get("language", "Unknown")
-                    
-                    # Update project stats
-                    if project_name not in project_stats:
-                        project_stats[project_name] = {
-                            "count": 0,
-                            "mwe_types": set()
-                        }
-                    project_stats[project_name]["count"] += 1
-                    project_stats[project_name]["mwe_types"].add(tag_type)
-                    
-                    # Update language stats
-                    if project_language not in language_stats:
-                        language_stats[project_language] = {"count": 0, "mwe_types": set()}
-                    language_stats[project_language]["count"] += 1
-                    language_stats[project_language]["mwe_types"].add(tag_type)
+        # Get all the analytics data needed for charts, from the columnar snapshot of the tags
+        columns = tag_columns.snapshot()
+        chart_mask = columns.select(username, project_id, language, start_dt, end_dt)
+        total_annotations = int(chart_mask.sum())
         
         # Convert to chart-ready formats
+        mwe_phrases = columns.distinct_counts(chart_mask, "tag", "phrase")
         mwe_chart_data = []
-        for mwe_type, stats in mwe_type_stats.items():
+        for mwe_type, count in columns.counts(chart_mask, "tag").items():
             mwe_chart_data.append({
-                "mwe_type": mwe_type,
-                "count": stats["count"],
-                "unique_word_count": len(stats["unique_words"])
+                "mwe_type": "Unknown" if mwe_type is None else mwe_type,
+                "count": count,
+                "unique_word_count": mwe_phrases.get(mwe_type, 0)
             })
         
+        user_types = columns.distinct_counts(chart_mask, "username", "tag")
+        user_chart_data = []
+        for user, count in columns.counts(chart_mask, "username").items():
+            user_chart_data.append({
+                "username": "Unknown" if user is None else user,
+                "count": count,
+                "mwe_type_count": user_types.get(user, 0)
+            })
+        
+        # Count by project and language
+        project_counts = columns.counts(chart_mask, "project_id")
+        project_types = columns.value_sets(chart_mask, "project_id", "tag")
+        projects = find_by_ids(projects_collection, project_counts, {"name": 1, "language": 1})
+        project_stats = {}
+        language_stats = {}
+        for project_key, count in project_counts.items():
+            if project_key is None:
+                continue
+            project = projects.get(project_key)
+            project_name = "Unassigned / Unknown Project"
+            project_language = "Unknown"
+            if project:
+                project_name = project.get("name", "Unknown Project")
+                project_language = project.get("language", "Unknown")
+            
+            if project_name not in project_stats:
+                project_stats[project_name] = {"count": 0, "mwe_types": set()}
+            project_stats[project_name]["count"] += count
+            project_stats[project_name]["mwe_types"] |= project_types.get(project_key, set())
+            language_stats[project_language] = language_stats.get(project_language, 0) + count
+        
         language_chart_data = []
-        for lang, stats in language_stats.items():
+        for lang, count in language_stats.items():
             language_chart_data.append({
                 "language": lang,
-                "count": stats["count"]
-            })
-        
-        user_chart_data = []
-        for user, stats in user_stats.items():
-            user_chart_data.append({
-                "username": user,
-                "count": stats["count"],
-                "mwe_type_count": len(stats["mwe_types"])
+                "count": count
             })
         
         project_chart_data = []
@@ -2439,58 +3207,19 @@ def download_pdf_with_charts():
             end_date_tl = get_ist_time()
             start_date_tl = end_date_tl - timedelta(days=30)
             
-            timeline_match_filter = {}
-            if username:
-                timeline_match_filter["username"] = username
-            
-            if project_id:
-                project_sentences = list(sentences_collection.find(
-                    {"project_id": project_id}, 
-                    {"_id": 1}
-                ))
-                sentence_ids = [str(s["_id"]) for s in project_sentences]
-                if sentence_ids:
-                    timeline_match_filter["source_sentence_id"] = {"$in": sentence_ids}
-            
-            timeline_match_filter["annotation_date"] = {"$gte": start_date_tl, "$lte": end_date_tl}
-            
-            pipeline = [
-                {"$match": timeline_match_filter},
-                {"$group": {
-                    "_id": {
-                        "$dateToString": {
-                            "format": "%Y-%m-%d",
-                            "date": "$annotation_date"
-                        }
-                    },
-                    "count": {"$sum": 1},
-                    "unique_annotators": {"$addToSet": "$username"}
-                }},
-                {"$project": {
-                    "date": "$_id",
-                    "count": 1,
-                    "unique_annotators_count": {"$size": "$unique_annotators"},
-                    "_id": 0
-                }},
-                {"$sort": {"date": 1}}
-            ]
-            
-            timeline_raw = list(tags_collection.aggregate(pipeline))
+            timeline_mask = columns.select(username, project_id, start=start_date_tl, end=end_date_tl)
+            timeline_days = columns.day_counts(timeline_mask, "username")
             
             # Fill in missing dates
             current_date = start_date_tl
             while current_date <= end_date_tl:
                 date_str = current_date.strftime("%Y-%m-%d")
-                existing_data = next((item for item in timeline_raw if item["date"] == date_str), None)
-                
-                if existing_data:
-                    timeline_data.append(existing_data)
-                else:
-                    timeline_data.append({
-                        "date": date_str,
-                        "count": 0,
-                        "unique_annotators_count": 0
-                    })
+                count, annotators = timeline_days.get(date_str, (0, 0))
+                timeline_data.append({
+                    "date": date_str,
+                    "count": count,
+                    "unique_annotators_count": annotators
+                })
                 
                 current_date += timedelta(days=1)
                 
@@ -2500,10 +3229,10 @@ def download_pdf_with_charts():
         # Return comprehensive data for PDF generation
         return jsonify({
             "summary": {
-                "total_annotations": len(all_tags),
-                "total_mwe_types": len(mwe_type_stats),
+                "total_annotations": total_annotations,
+                "total_mwe_types": len(mwe_chart_data),
                 "total_languages": len(language_stats),
-                "total_users": len(user_stats),
+                "total_users": len(user_chart_data),
                 "total_projects": len(project_stats),
                 "report_generated": get_ist_time().strftime("%Y-%m-%d %H:%M:%S UTC")
             },
@@ -2635,99 +3364,46 @@ def get_comprehensive_report():
         report_level = request.args.get("level", "standard")  # standard, detailed, executive
         
         # Build comprehensive analytics
-        tag_filter = {}
-        if username:
-            tag_filter["username"] = username
         if start_date and end_date:
             try:
-                start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-                end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-                tag_filter["annotation_date"] = {"$gte": start_dt, "$lte": end_dt}
+                datetime.strptime(start_date, "%Y-%m-%d")
+                datetime.strptime(end_date, "%Y-%m-%d")
             except ValueError:
                 return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
         
-        # Enhanced analytics queries
-        all_tags = list(tags_collection.find(tag_filter))
-        total_annotations = len(all_tags)
+        # Counted from the rollups; distinct phrases are estimated from their merged sketches
+        rows = find_rollups(username, project_id, language, start_date, end_date)
+        total_annotations = sum(row["count"] for row in rows)
         
         # Comprehensive user performance analytics
-        user_performance = list(tags_collection.aggregate([
-            {"$match": tag_filter},
-            {"$group": {
-                "_id": "$username",
-                "total_annotations": {"$sum": 1},
-                "unique_mwe_types": {"$addToSet": "$tag"},
-                "unique_phrases": {"$addToSet": "$text"},
-                "projects": {"$addToSet": "$source_sentence_id"},
-                "first_annotation": {"$min": "$annotation_date"},
-                "last_annotation": {"$max": "$annotation_date"},
-                "daily_average": {
-                    "$avg": {
-                        "$cond": [
-                            {"$ne": ["$annotation_date", None]},
-                            {"$divide": [
-                                {"$subtract": [{"$max": "$annotation_date"}, {"$min": "$annotation_date"}]},
-                                1000 * 60 * 60 * 24  # Convert to days
-                            ]},
-                            0
-                        ]
-                    }
-                }
-            }},
-            {"$lookup": {
-                "from": "users",
-                "localField": "_id",
-                "foreignField": "username",
-                "as": "user_info"
-            }},
-            {"$project": {
-                "username": "$_id",
-                "total_annotations": 1,
-                "unique_mwe_count": {"$size": "$unique_mwe_types"},
-                "unique_phrases_count": {"$size": "$unique_phrases"},
-                "project_count": {"$size": {
-                    "$setUnion": [
-                        {"$map": {
-                            "input": "$projects",
-                            "as": "project",
-                            "in": {
-                                "$arrayElemAt": [
-                                    {"$split": ["$$project", "_"]},
-                                    0
-                                ]
-                            }
-                        }}
-                    ]
-                }},
-                "first_annotation": 1,
-                "last_annotation": 1,
-                "activity_days": {
-                    "$cond": [
-                        {"$and": ["$first_annotation", "$last_annotation"]},
-                        {"$divide": [
-                            {"$subtract": ["$last_annotation", "$first_annotation"]},
-                            1000 * 60 * 60 * 24
-                        ]},
-                        0
-                    ]
-                },
-                "annotations_per_day": {
-                    "$cond": [
-                        {"$gt": ["$total_annotations", 0]},
-                        {"$divide": [
-                            "$total_annotations",
-                            {"$max": [{"$add": ["$daily_verage", 1]}, 1]}
-                        ]},
-                        0
-                    ]
-                },
-                "full_name": {"$arrayElemAt": ["$user_info.full_name", 0]},
-                "organization": {"$arrayElemAt": ["$user_info.organization", 0]},
-                "role": {"$arrayElemAt": ["$user_info.role", 0]},
-                "_id": 0
-            }},
-            {"$sort": {"total_annotations": -1}}
-        ]))
+        user_rollups = fold_rollups(rows, lambda row: row.get("username"))
+        user_info = {
+            user["username"]: user
+            for user in users_collection.find(
+                {"username": {"$in": list(user_rollups)}},
+                {"username": 1, "full_name": 1, "organization": 1, "role": 1}
+            )
+        }
+        user_performance = []
+        for user, stats in user_rollups.items():
+            first_annotation, last_annotation = stats["first_annotation"], stats["last_annotation"]
+            activity_days = (last_annotation - first_annotation).total_seconds() / (60 * 60 * 24) if first_annotation and last_annotation else 0
+            info = user_info.get(user, {})
+            user_performance.append({
+                "username": user,
+                "total_annotations": stats["count"],
+                "unique_mwe_count": len(stats["tag"]),
+                "unique_phrases_count": estimate_distinct_phrases(stats["phrases"]),
+                "project_count": len(stats["project_id"]),
+                "first_annotation": first_annotation,
+                "last_annotation": last_annotation,
+                "activity_days": activity_days,
+                "annotations_per_day": stats["count"] / max(activity_days + 1, 1),
+                "full_name": info.get("full_name"),
+                "organization": info.get("organization"),
+                "role": info.get("role")
+            })
+        user_performance.sort(key=lambda x: x["total_annotations"], reverse=True)
         
         # Enhanced project progress analytics
         project_progress = list(projects_collection.aggregate([
@@ -2755,28 +3431,6 @@ def get_comprehensive_report():
                     }
                 }
             }},
-            {"$lookup": {
-                "from": "tags",
-                "let": {"project_id": "$_id.project_id"},
-                "pipeline": [
-                    {"$match": {
-                        "$expr": {
-                            "$in": ["$source_sentence_id", {
-                                "$map": {
-                                    "input": "$project_sentences",
-                                    "as": "sentence",
-                                    "in": {"$toString": "$$sentence._id"}
-                                }
-                            }]
-                        }
-                    }},
-                    {"$group": {
-                        "_id": None,
-                        "project_tags": {"$sum": 1}
-                    }}
-                ],
-                "as": "tag_info"
-            }},
             {"$project": {
                 "project_name": "$_id.project_name",
                 "language": "$_id.language",
@@ -2789,13 +3443,6 @@ def get_comprehensive_report():
                     ]
                 },
                 "assigned_users_count": {"$size": "$assigned_users"},
-                "total_annotations": {"$arrayElemAt": ["$tag_info.project_tags", 0]},
-                "annotation_density": {
-                    "$divide": [
-                        {"$arrayElemAt": ["$tag_info.project_tags", 0]},
-                        "$total_sentences"
-                    ]
-                },
                 "status": {
                     "$switch": {
                         "branches": [
@@ -2809,33 +3456,30 @@ def get_comprehensive_report():
             }},
             {"$sort": {"completion_rate": -1}}
         ]))
+
+        # Approved tags per project, from the rollups
+        project_tags = {
+            row["_id"]: row["count"]
+            for row in analytics_rollups_collection.aggregate([
+                {"$match": {"count": {"$gt": 0}}},
+                {"$group": {"_id": "$project_id", "count": {"$sum": "$count"}}}
+            ])
+        }
+        for project in project_progress:
+            tag_count = project_tags.get(str(project["_id"]["project_id"]), 0)
+            project["total_annotations"] = tag_count
+            project["annotation_density"] = tag_count / project["total_sentences"]
         
         # Enhanced timeline analytics with moving average and trends
-        timeline_data = list(tags_collection.aggregate([
-            {"$match": tag_filter},
-            {"$group": {
-                "_id": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%d",
-                        "date": "$annotation_date"
-                    }
-                },
-                "daily_annotations": {"$sum": 1},
-                "unique_annotators": {"$addToSet": "$username"},
-                "mwe_types_used": {"$addToSet": "$tag"}
-            }},
-            {"$sort": {"_id": 1}},
-            {"$project": {
-                "date": "$_id",
-                "daily_annotations": 1,
-                "unique_annotators_count": {"$size": "$unique_annotators"},
-                "mwe_types_count": {"$size": "$mwe_types_used"},
-                "avg_annotations_per_user": {
-                    "$divide": ["$daily_annotations", {"$max": [{"$size": "$unique_annotators"}, 1]}]
-                },
-                "_id": 0
-            }}
-        ]))
+        timeline_data = []
+        for day, stats in sorted(fold_rollups(rows, lambda row: row.get("day")).items()):
+            timeline_data.append({
+                "date": day,
+                "daily_annotations": stats["count"],
+                "unique_annotators_count": len(stats["username"]),
+                "mwe_types_count": len(stats["tag"]),
+                "avg_annotations_per_user": stats["count"] / max(len(stats["username"]), 1)
+            })
         
         # Calculate 7-day moving average and trends
         for i in range(6, len(timeline_data)):
@@ -2852,65 +3496,23 @@ def get_comprehensive_report():
             growth_rate = 0
         
         # Enhanced MWE type distribution with trends
-        mwe_distribution = list(tags_collection.aggregate([
-            {"$match": tag_filter},
-            {"$group": {
-                "_id": "$tag",
-                "count": {"$sum": 1},
-                "unique_phrases": {"$addToSet": "$text"},
-                "unique_users": {"$addToSet": "$username"},
-                "first_use": {"$min": "$annotation_date"},
-                "last_use": {"$max": "$annotation_date"},
-                "projects": {"$addToSet": "$source_sentence_id"}
-            }},
-            {"$project": {
-                "mwe_type": "$_id",
-                "count": 1,
-                "unique_phrases_count": {"$size": "$unique_phrases"},
-                "unique_users_count": {"$size": "$unique_users"},
-                "project_count": {"$size": {
-                    "$setUnion": [
-                        {"$map": {
-                            "input": "$projects",
-                            "as": "project",
-                            "in": {
-                                "$arrayElemAt": [
-                                    {"$split": ["$$project", "_"]},
-                                    0
-                                ]
-                            }
-                        }}
-                    ]
-                }},
-                "popularity_score": {
-                    "$multiply": [
-                        {"$divide": ["$count", total_annotations]},
-                        100
-                    ]
-                },
-                "adoption_rate": {
-                    "$divide": ["$unique_users_count", {"$size": {"$ifNull": [user_performance, []]}}]
-                },
-                "first_use": 1,
-                "last_use": 1,
-                "usage_trend": {
-                    "$cond": [
-                        {"$and": ["$first_use", "$last_use"]},
-                        {"$divide": [
-                            "$count",
-                            {"$max": [{
-                                "$divide": [
-                                    {"$subtract": ["$last_use", "$first_use"]},
-                                    1000 * 60 * 60 * 24
-                                ]
-                            }, 1]}
-                        ]},
-                        0
-                    ]
-                }
-            }},
-            {"$sort": {"count": -1}}
-        ]))
+        mwe_distribution = []
+        for mwe_type, stats in fold_rollups(rows, lambda row: row.get("tag")).items():
+            first_use, last_use = stats["first_annotation"], stats["last_annotation"]
+            usage_days = (last_use - first_use).total_seconds() / (60 * 60 * 24) if first_use and last_use else 0
+            mwe_distribution.append({
+                "mwe_type": mwe_type,
+                "count": stats["count"],
+                "unique_phrases_count": estimate_distinct_phrases(stats["phrases"]),
+                "unique_users_count": len(stats["username"]),
+                "project_count": len(stats["project_id"]),
+                "popularity_score": stats["count"] / total_annotations * 100,
+                "adoption_rate": len(stats["username"]) / max(len(user_performance), 1),
+                "first_use": first_use,
+                "last_use": last_use,
+                "usage_trend": stats["count"] / max(usage_days, 1) if first_use and last_use else 0
+            })
+        mwe_distribution.sort(key=lambda x: x["count"], reverse=True)
         
         # Enhanced quality metrics
         quality_metrics = {
@@ -2983,13 +3585,1404 @@ def get_comprehensive_report():
     except Exception as e:
         print(f"Error generating enhanced comprehensive report: {e}")
         return jsonify({"error": "Internal server error"}), 500
-    
+
+# --- Tag Recommendation Index ---
+
+# Zero-width (non-)joiners shape conjuncts in Indic scripts and belong to the surrounding word
+TOKEN_JOINERS = {'\u200c', '\u200d'}
+
+
+def tokenize_text(text):
+    """
+    Splits text into (token, start, end) word tokens. Letters, digits and combining marks
+    (Devanagari matras, viramas, nuktas) plus ZWJ/ZWNJ form words; everything else,
+    including whitespace, punctuation and the danda, is a boundary.
+    """
+    tokens = []
+    start = None
+    for position, ch in enumerate(text):
+        if ch.isalnum() or ch in TOKEN_JOINERS or unicodedata.category(ch)[0] == 'M':
+            if start is None:
+                start = position
+        elif start is not None:
+            tokens.append((text[start:position], start, position))
+            start = None
+    if start is not None:
+        tokens.append((text[start:], start, len(text)))
+    return tokens
+
+
+def normalize_phrase(text):
+    """Canonical form of a tagged phrase: its lowercased word tokens joined by single spaces"""
+    return ' '.join(token for token, _, _ in tokenize_text((text or '').lower()))
+
+
+# Fuzzy matching: edits tolerated per token, and the token prefix the deletion index is built over
+FUZZY_MAX_DISTANCE = 2
+FUZZY_PREFIX_LENGTH = 7
+# Deletion index hits considered per input token, nearest length first
+FUZZY_MAX_TOKEN_HITS = 32
+
+
+def fuzzy_token_distance_limit(token):
+    """Short tokens must match exactly, longer ones tolerate more edits"""
+    if len(token) <= 2:
+        return 0
+    if len(token) <= 5:
+        return 1
+    return FUZZY_MAX_DISTANCE
+
+
+def fuzzy_deletes(token, max_distance):
+    """The token prefix with every combination of up to max_distance characters deleted (SymSpell)"""
+    prefix = token[:FUZZY_PREFIX_LENGTH]
+    variants = {prefix}
+    frontier = {prefix}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier if len(word) > 1 for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def bounded_edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance between a and b, or max_distance + 1 once it is known to
+    exceed max_distance. Only the diagonal band of width 2 * max_distance + 1 is filled in;
+    cells outside it are already further than max_distance.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    exceeded = max_distance + 1
+    previous_row = None
+    row = [min(j, exceeded) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        lo, hi = max(1, i - max_distance), min(len(b), i + max_distance)
+        next_row = [exceeded] * (len(b) + 1)
+        next_row[0] = min(i, exceeded)
+        for j in range(lo, hi + 1):
+            distance = min(row[j] + 1, next_row[j - 1] + 1, row[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                distance = min(distance, previous_row[j - 2] + 1)
+            next_row[j] = min(distance, exceeded)
+        if min(next_row[lo - 1:hi + 1]) > max_distance:
+            return exceeded
+        previous_row, row = row, next_row
+    return row[-1]
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over a fixed list of symbol sequences.
+    Transitions are stored as flat sorted edge arrays per state, so a single
+    left-to-right pass over the input reports every occurrence of every phrase.
+    """
+
+    ARRAYS = ("edge_offsets", "edge_symbols", "edge_targets", "fail", "outputs", "output_link")
+
+    def __init__(self, sequences):
+        goto = [{}]
+        outputs = [-1]  # phrase id that ends exactly at this state, -1 if none
+
+        for phrase_id, sequence in enumerate(sequences):
+            state = 0
+            for symbol in sequence:
+                next_state = goto[state].get(symbol)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][symbol] = next_state
+                    goto.append({})
+                    outputs.append(-1)
+                state = next_state
+            if state:
+                outputs[state] = phrase_id
+
+        # Breadth-first pass to compute failure links and output (dictionary suffix) links
+        fail = [0] * len(goto)
+        output_link = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and symbol not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(symbol, 0)
+                fail[next_state] = target
+                output_link[next_state] = target if outputs[target] >= 0 else output_link[target]
+
+        # Flatten the per-state dicts into compact arrays
+        self.edge_offsets = array('q', [0])
+        self.edge_symbols = array('q')
+        self.edge_targets = array('q')
+        for edges in goto:
+            for symbol in sorted(edges):
+                self.edge_symbols.append(symbol)
+                self.edge_targets.append(edges[symbol])
+            self.edge_offsets.append(len(self.edge_symbols))
+        self.fail = array('q', fail)
+        self.outputs = array('q', outputs)
+        self.output_link = array('q', output_link)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Wraps already compiled arrays (e.g. views over a snapshot) without rebuilding the trie"""
+        automaton = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(automaton, name, arrays[name])
+        return automaton
+
+    def _step(self, state, symbol):
+        lo, hi = self.edge_offsets[state], self.edge_offsets[state + 1]
+        if lo == hi:
+            return -1
+        i = bisect_left(self.edge_symbols, symbol, lo, hi)
+        if i < hi and self.edge_symbols[i] == symbol:
+            return self.edge_targets[i]
+        return -1
+
+    def iter_matches(self, symbols):
+        """Yields (end_index, phrase_id) for every phrase occurrence, ordered by end_index."""
+        state = 0
+        for position, symbol in enumerate(symbols):
+            next_state = self._step(state, symbol)
+            while next_state < 0 and state:
+                state = self.fail[state]
+                next_state = self._step(state, symbol)
+            state = max(next_state, 0)
+
+            match_state = state if self.outputs[state] >= 0 else self.output_link[state]
+            while match_state:
+                yield position, self.outputs[match_state]
+                match_state = self.output_link[match_state]
+
+
+class PhraseSnapshot:
+    """
+    Read-only compiled phrase index stored as one flat file: an 8-byte magic, a uint32
+    header length, a JSON header describing the arrays, then the 8-byte aligned arrays
+    themselves (phrase table, token vocabulary and its fuzzy deletion index, automaton over
+    token ids, per-phrase tag and annotator counts, seen dates).
+    Opening a snapshot maps the file and casts memoryviews over it, so loading does not
+    depend on the number of phrases and all workers mapping the same file share its pages.
+    """
+
+    MAGIC = b"MWEPIDX4"
+    TOP_PHRASES = 200  # most annotated phrases kept in the header for recommendation stats
+    NO_DATE = -(1 << 63)
+    EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[:8]) != self.MAGIC:
+            raise ValueError("not a phrase index snapshot")
+        header_length = int.from_bytes(view[8:12], 'little')
+        header = json.loads(bytes(view[12:12 + header_length]).decode('utf-8'))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("snapshot was written on a machine with a different byte order")
+
+        data_start = self._align(12 + header_length)
+        arrays = {}
+        for name, (typecode, offset, count) in header["arrays"].items():
+            start = data_start + offset
+            arrays[name] = view[start:start + count * array(typecode).itemsize].cast(typecode)
+
+        self._buffer = buffer  # keeps the mapping alive for the views above
+        self.version = header["version"]
+        self.phrase_count = header["phrase_count"]
+        self.live_count = header["live_count"]
+        self.tag_totals = header["tag_totals"]          # tag -> [annotations, phrases carrying it]
+        self.top_phrase_ids = header["top_phrase_ids"]  # TOP_PHRASES most annotated phrase ids
+        self.top_threshold = header["top_threshold"]    # no phrase outside the top list has more annotations
+        self.automaton = PhraseAutomaton.from_arrays(arrays)
+        self.tag_names = self._decode_strings(arrays["tag_name_offsets"], arrays["tag_name_bytes"])
+        self.annotator_names = self._decode_strings(arrays["annotator_name_offsets"], arrays["annotator_name_bytes"])
+        self._arrays = arrays
+        self._token_ids = None
+        self._tokens = None
+
+    @classmethod
+    def open(cls, path):
+        """Maps a snapshot file, returns None if it does not exist or cannot be read"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable phrase index snapshot {path}: {e}")
+            return None
+
+    @staticmethod
+    def _align(offset):
+        return (offset + 7) & ~7
+
+    @staticmethod
+    def _encode_strings(values):
+        offsets = array('q', [0])
+        data = bytearray()
+        for value in values:
+            data += value.encode('utf-8')
+            offsets.append(len(data))
+        return offsets, array('B', data)
+
+    @staticmethod
+    def _decode_strings(offsets, data):
+        return [bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in range(len(offsets) - 1)]
+
+    @classmethod
+    def _encode_date(cls, value):
+        if value is None:
+            return cls.NO_DATE
+        delta = value - cls.EPOCH
+        return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+    @classmethod
+    def _decode_date(cls, value):
+        if value == cls.NO_DATE:
+            return None
+        return cls.EPOCH + timedelta(microseconds=value)
+
+    @classmethod
+    def serialize(cls, version, phrases, stats, automaton, tokens):
+        """Packs phrases, their stats entries, the compiled automaton and its token vocabulary into snapshot bytes"""
+        tag_vocab, annotator_vocab = {}, {}
+        tag_offsets, tag_ids, tag_counts = array('q', [0]), array('i'), array('i')
+        annotator_offsets, annotator_ids, annotator_counts = array('q', [0]), array('i'), array('i')
+        first_seen, last_seen = array('q'), array('q')
+        live_count = 0
+        tag_totals = {}
+        phrase_totals = []
+
+        for entry in stats:
+            # Dict order is kept so ties in tag counts resolve the same way after a reload
+            for tag_type, count in entry["tags"].items():
+                tag_ids.append(tag_vocab.setdefault(tag_type, len(tag_vocab)))
+                tag_counts.append(count)
+                totals = tag_totals.setdefault(tag_type, [0, 0])
+                totals[0] += count
+                totals[1] += 1
+            tag_offsets.append(len(tag_ids))
+            phrase_totals.append(sum(entry["tags"].values()))
+            for annotator, count in entry["annotators"].items():
+                annotator_ids.append(annotator_vocab.setdefault(annotator, len(annotator_vocab)))
+                annotator_counts.append(count)
+            annotator_offsets.append(len(annotator_ids))
+            first_seen.append(cls._encode_date(entry["first_seen"]))
+            last_seen.append(cls._encode_date(entry["last_seen"]))
+            if entry["tags"]:
+                live_count += 1
+
+        phrase_offsets, phrase_bytes = cls._encode_strings(phrases)
+        tag_name_offsets, tag_name_bytes = cls._encode_strings(tag_vocab)
+        annotator_name_offsets, annotator_name_bytes = cls._encode_strings(annotator_vocab)
+        token_offsets, token_bytes = cls._encode_strings(tokens)
+        # crc32 of every deletion variant -> token, sorted by hash; collisions are weeded out by verification
+        deletions = sorted({
+            (zlib.crc32(variant.encode('utf-8')), token_id)
+            for token_id, token in enumerate(tokens)
+            for variant in fuzzy_deletes(token, FUZZY_MAX_DISTANCE)
+        })
+
+        arrays = {
+            "phrase_offsets": phrase_offsets,
+            "phrase_bytes": phrase_bytes,
+            # Phrase ids in phrase order, for binary search by text
+            "phrase_order": array('i', sorted(range(len(phrases)), key=phrases.__getitem__)),
+            "tag_name_offsets": tag_name_offsets,
+            "tag_name_bytes": tag_name_bytes,
+            "annotator_name_offsets": annotator_name_offsets,
+            "annotator_name_bytes": annotator_name_bytes,
+            # Automaton symbol i is token i
+            "token_offsets": token_offsets,
+            "token_bytes": token_bytes,
+            "deletion_hashes": array('I', (deletion_hash for deletion_hash, _ in deletions)),
+            "deletion_tokens": array('i', (token_id for _, token_id in deletions)),
+            "tag_offsets": tag_offsets,
+            "tag_ids": tag_ids,
+            "tag_counts": tag_counts,
+            "annotator_offsets": annotator_offsets,
+            "annotator_ids": annotator_ids,
+            "annotator_counts": annotator_counts,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+        }
+        for name in PhraseAutomaton.ARRAYS:
+            arrays[name] = array('i', getattr(automaton, name))
+
+        ranked = heapq.nlargest(cls.TOP_PHRASES + 1, range(len(phrases)), key=phrase_totals.__getitem__)
+
+        table = {}
+        offset = 0
+        for name, values in arrays.items():
+            table[name] = [values.typecode, offset, len(values)]
+            offset = cls._align(offset + len(values) * values.itemsize)
+
+        header = json.dumps({
+            "version": version,
+            "byteorder": sys.byteorder,
+            "phrase_count": len(phrases),
+            "live_count": live_count,
+            "tag_totals": tag_totals,
+            "top_phrase_ids": ranked[:cls.TOP_PHRASES],
+            "top_threshold": phrase_totals[ranked[cls.TOP_PHRASES]] if len(ranked) > cls.TOP_PHRASES else 0,
+            "arrays": table
+        }).encode('utf-8')
+
+        out = io.BytesIO()
+        out.write(cls.MAGIC)
+        out.write(len(header).to_bytes(4, 'little'))
+        out.write(header)
+        out.write(b"\0" * (cls._align(out.tell()) - out.tell()))
+        for values in arrays.values():
+            out.write(values.tobytes())
+            out.write(b"\0" * (cls._align(out.tell()) - out.tell()))
+        return out.getvalue()
+
+    def token_ids(self):
+        """Token -> automaton symbol, decoded on first use rather than at load time"""
+        if self._token_ids is None:
+            tokens = self._decode_strings(self._arrays["token_offsets"], self._arrays["token_bytes"])
+            self._tokens = tokens
+            self._token_ids = {token: token_id for token_id, token in enumerate(tokens)}
+        return self._token_ids
+
+    def token(self, token_id):
+        self.token_ids()
+        return self._tokens[token_id]
+
+    def fuzzy_hits(self, token, max_distance):
+        """
+        Ids of vocabulary tokens sharing a deletion variant with token: every token within
+        max_distance edits, plus some further away that bounded_edit_distance weeds out.
+        """
+        hashes, token_ids = self._arrays["deletion_hashes"], self._arrays["deletion_tokens"]
+        hits = set()
+        for variant in fuzzy_deletes(token, max_distance):
+            deletion_hash = zlib.crc32(variant.encode('utf-8'))
+            i = bisect_left(hashes, deletion_hash)
+            while i < len(hashes) and hashes[i] == deletion_hash:
+                hits.add(token_ids[i])
+                i += 1
+        return hits
+
+    def phrase(self, phrase_id):
+        offsets = self._arrays["phrase_offsets"]
+        return bytes(self._arrays["phrase_bytes"][offsets[phrase_id]:offsets[phrase_id + 1]]).decode('utf-8')
+
+    def find(self, phrase):
+        """Returns the id of a phrase in the snapshot, or None"""
+        order = self._arrays["phrase_order"]
+        lo, hi = 0, self.phrase_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.phrase(order[mid]) < phrase:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.phrase_count and self.phrase(order[lo]) == phrase:
+            return order[lo]
+        return None
+
+    def stats(self, phrase_id):
+        """Materializes the stats entry of a phrase as a fresh dict"""
+        arrays = self._arrays
+        tag_start, tag_end = arrays["tag_offsets"][phrase_id], arrays["tag_offsets"][phrase_id + 1]
+        annotator_start, annotator_end = arrays["annotator_offsets"][phrase_id], arrays["annotator_offsets"][phrase_id + 1]
+        return {
+            "tags": {
+                self.tag_names[tag_id]: count
+                for tag_id, count in zip(arrays["tag_ids"][tag_start:tag_end], arrays["tag_counts"][tag_start:tag_end])
+            },
+            "annotators": {
+                self.annotator_names[annotator_id]: count
+                for annotator_id, count in zip(arrays["annotator_ids"][annotator_start:annotator_end],
+                                               arrays["annotator_counts"][annotator_start:annotator_end])
+            },
+            "first_seen": self._decode_date(arrays["first_seen"][phrase_id]),
+            "last_seen": self._decode_date(arrays["last_seen"][phrase_id])
+        }
+
+
+class PhraseIndexState:
+    """A loaded snapshot plus the tag changes applied on top of it since"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.base_count = snapshot.phrase_count
+        self.live_count = snapshot.live_count
+        self.tag_totals = {tag_type: list(totals) for tag_type, totals in snapshot.tag_totals.items()}
+        self.extra_phrases = []  # phrase id base_count + i -> phrases first seen after the snapshot
+        self.extra_ids = {}      # phrase text -> phrase id, for extra phrases
+        self.overrides = {}      # phrase id -> stats dict, replaced (never mutated) on every delta
+        self.extra_tokens = {}   # token -> symbol, for tokens first seen after the snapshot
+        self.extra_token_names = []  # symbol - snapshot vocabulary size -> token, for extra tokens
+        self.extra_deletions = {}    # fuzzy_deletes variant -> symbols, for extra tokens
+        self.recent = None       # (automaton over extra phrases, number of extra phrases it covers)
+
+    def phrase_count(self):
+        return self.base_count + len(self.extra_phrases)
+
+    def phrase(self, phrase_id):
+        if phrase_id < self.base_count:
+            return self.snapshot.phrase(phrase_id)
+        return self.extra_phrases[phrase_id - self.base_count]
+
+    def stats(self, phrase_id):
+        entry = self.overrides.get(phrase_id)
+        if entry is None:
+            entry = self.snapshot.stats(phrase_id) if phrase_id < self.base_count else PhraseIndex._new_stats()
+        return entry
+
+    def lookup(self, phrase):
+        phrase_id = self.extra_ids.get(phrase)
+        if phrase_id is None:
+            phrase_id = self.snapshot.find(phrase)
+        return phrase_id
+
+    def token_id(self, token):
+        """Automaton symbol of a token, -1 for tokens no indexed phrase contains"""
+        token_id = self.snapshot.token_ids().get(token)
+        if token_id is None:
+            token_id = self.extra_tokens.get(token, -1)
+        return token_id
+
+    def token(self, symbol):
+        vocabulary_size = len(self.snapshot.token_ids())
+        if symbol < vocabulary_size:
+            return self.snapshot.token(symbol)
+        return self.extra_token_names[symbol - vocabulary_size]
+
+    def fuzzy_hits(self, token, max_distance):
+        """
+        [(symbol, length difference)] of the indexed tokens that may be within max_distance edits
+        of token, unverified, the token itself and then nearest length first, capped at
+        FUZZY_MAX_TOKEN_HITS. The length difference is a lower bound on the edit distance.
+        """
+        if not max_distance:
+            token_id = self.token_id(token)
+            return [(token_id, 0)] if token_id >= 0 else []
+        symbols = self.snapshot.fuzzy_hits(token, max_distance)
+        for variant in fuzzy_deletes(token, max_distance):
+            symbols.update(self.extra_deletions.get(variant, ()))
+        exact = self.token_id(token)
+        hits = sorted(
+            (abs(len(self.token(symbol)) - len(token)), symbol != exact, symbol) for symbol in symbols
+        )
+        return [(symbol, length_difference) for length_difference, _, symbol in hits[:FUZZY_MAX_TOKEN_HITS]
+                if length_difference <= max_distance]
+
+    def encode(self, phrase):
+        """Symbols of a phrase, assigning new ones to tokens the snapshot vocabulary lacks"""
+        symbols = []
+        for token in phrase.split(' '):
+            token_id = self.token_id(token)
+            if token_id < 0:
+                token_id = self.extra_tokens[token] = len(self.snapshot.token_ids()) + len(self.extra_tokens)
+                self.extra_token_names.append(token)
+                for variant in fuzzy_deletes(token, FUZZY_MAX_DISTANCE):
+                    self.extra_deletions.setdefault(variant, []).append(token_id)
+            symbols.append(token_id)
+        return symbols
+
+
+class PhraseIndex:
+    """
+    Process-wide phrase -> tag statistics for tag recommendations.
+
+    The compiled index is kept in a PhraseSnapshot file that each worker maps read-only.
+    Tag writes are journaled under an increasing version number (index_versions holds the
+    counter), and every worker replays journal entries newer than the version it has applied
+    into a small in-memory overlay on top of the snapshot. A stale snapshot is therefore
+    caught up rather than rebuilt; the tags collection is only rescanned when there is no
+    usable snapshot or the journal no longer reaches back to it. Once the overlay holds more
+    than COMPACT_THRESHOLD new phrases or SNAPSHOT_LAG versions, the current state is written
+    out as the new snapshot.
+    """
+
+    COMPACT_THRESHOLD = 1000
+    SNAPSHOT_LAG = 10000
+    JOURNAL_CHUNK = 1000
+    JOURNAL_GAP_SECONDS = 60  # a missing version older than this was trimmed, not still being written
+    JOURNAL_TTL_SECONDS = 7 * 24 * 3600
+
+    def __init__(self, collection, versions_collection, journal_collection, snapshot_path, sync_seconds=2):
+        self.collection = collection
+        self.versions = versions_collection
+        self.journal = journal_collection
+        self.snapshot_path = snapshot_path
+        self.sync_seconds = sync_seconds
+        self._lock = threading.RLock()
+        self._built = False
+        self._state = None
+        self._last_sync = 0.0
+        self.version = 0  # last journal version applied to this worker's index
+
+    def ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._load()
+
+    @staticmethod
+    def _new_stats():
+        return {
+            "tags": {},
+            "annotators": {},
+            "first_seen": None,
+            "last_seen": None
+        }
+
+    @staticmethod
+    def _stored_date(value):
+        """Annotation dates as MongoDB hands them back: naive UTC datetimes"""
+        if not isinstance(value, datetime):
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+        return value
+
+    @classmethod
+    def _add_to_stats(cls, entry, tag_type, delta, annotator, annotation_date):
+        tag_count = entry["tags"].get(tag_type, 0) + delta
+        if tag_count > 0:
+            entry["tags"][tag_type] = tag_count
+        else:
+            entry["tags"].pop(tag_type, None)
+
+        annotator_count = entry["annotators"].get(annotator, 0) + delta
+        if annotator_count > 0:
+            entry["annotators"][annotator] = annotator_count
+        else:
+            entry["annotators"].pop(annotator, None)
+
+        # Removals cannot narrow the seen-range without the full history, so only additions move it
+        annotation_date = cls._stored_date(annotation_date)
+        if annotation_date and delta > 0:
+            if entry["first_seen"] is None or annotation_date < entry["first_seen"]:
+                entry["first_seen"] = annotation_date
+            if entry["last_seen"] is None or annotation_date > entry["last_seen"]:
+                entry["last_seen"] = annotation_date
+
+    @staticmethod
+    def _compile(phrases):
+        """Automaton over token ids of canonical phrases, plus its token vocabulary"""
+        vocabulary = {}
+        automaton = PhraseAutomaton([
+            [vocabulary.setdefault(token, len(vocabulary)) for token in phrase.split(' ')]
+            for phrase in phrases
+        ])
+        return automaton, list(vocabulary)
+
+    def _current_version(self):
+        counter = self.versions.find_one({"_id": "tags"})
+        return counter["version"] if counter else 0
+
+    def _use(self, snapshot):
+        self._state = PhraseIndexState(snapshot)
+        self.version = snapshot.version
+
+    def _write_snapshot(self, version, phrases, stats):
+        """Compiles and writes a snapshot, falling back to an in-memory copy if the file cannot be written"""
+        data = PhraseSnapshot.serialize(version, phrases, stats, *self._compile(phrases))
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.snapshot_path)
+            snapshot = PhraseSnapshot.open(self.snapshot_path)
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+        except OSError as e:
+            print(f"Could not write phrase index snapshot {self.snapshot_path}: {e}")
+        return PhraseSnapshot(data)
+
+    def _load(self):
+        """Maps the snapshot and replays newer journal entries, rebuilding only if that is not possible"""
+        self.journal.create_index("created_at", expireAfterSeconds=self.JOURNAL_TTL_SECONDS)
+        current_version = self._current_version()
+        snapshot = PhraseSnapshot.open(self.snapshot_path)
+        if snapshot is not None and snapshot.version <= current_version:
+            self._use(snapshot)
+            if self._replay_journal() and self.version >= current_version:
+                self._built = True
+                self._last_sync = time.monotonic()
+                print(f"Phrase index loaded from snapshot version {snapshot.version}, caught up to version {self.version}.")
+                return
+            print(f"Phrase index snapshot version {snapshot.version} cannot be caught up to {current_version}, rebuilding.")
+        self.rebuild()
+
+    def rebuild(self):
+        """Loads every approved tag, compiles a fresh automaton and writes it out as the snapshot"""
+        with self._lock:
+            version = self._current_version()
+            phrase_ids = {}
+            phrases = []
+            stats = []
+            scanned = set()
+
+            def add(text, tag_type, delta, annotator, annotation_date):
+                phrase = normalize_phrase(text)
+                if not phrase or not tag_type:
+                    return
+                phrase_id = phrase_ids.get(phrase)
+                if phrase_id is None:
+                    if delta < 0:
+                        return
+                    phrase_id = phrase_ids[phrase] = len(phrases)
+                    phrases.append(phrase)
+                    stats.append(self._new_stats())
+                self._add_to_stats(stats[phrase_id], tag_type, delta, annotator or 'unknown', annotation_date)
+
+            for tag in self.collection.find({}, {"text": 1, "tag": 1, "annotation_date": 1, "username": 1}):
+                scanned.add(str(tag["_id"]))
+                add(tag.get('text'), tag.get('tag', ''), 1, tag.get('username', 'unknown'), tag.get('annotation_date'))
+
+            # Folds in the writes journaled while the collection was being scanned, skipping those the
+            # scan already saw, so the snapshot other workers load is stamped with a version it fully reflects
+            for entry in self.journal.find({"_id": {"$gt": version}}).sort("_id", 1):
+                if entry["_id"] != version + 1:
+                    break
+                for change in entry["changes"]:
+                    if not self._covered_by_scan(change, scanned):
+                        add(change["text"], change["tag"], change["delta"], change.get("username"), change.get("annotation_date"))
+                version = entry["_id"]
+
+            live = [phrase_id for phrase_id, entry in enumerate(stats) if entry["tags"]]
+            phrases = [phrases[phrase_id] for phrase_id in live]
+            stats = [stats[phrase_id] for phrase_id in live]
+            self._use(self._write_snapshot(version, phrases, stats))
+            self._built = True
+            self._last_sync = time.monotonic()
+            print(f"Phrase index built with {len(phrases)} phrases at version {version}.")
+            # Versions still in flight when the scan ended are replayed with the same filter
+            self._replay_journal(scanned)
+
+    @staticmethod
+    def _covered_by_scan(change, scanned):
+        """
+        Whether a change journaled around a rebuild's scan is already reflected in it: an
+        insert of a tag the scan saw, or a delete of one it did not. Keeps scanned in step
+        with the replayed changes; changes journaled without a tag_id are always applied.
+        """
+        tag_id = change.get("tag_id")
+        if not tag_id:
+            return False
+        if change["delta"] > 0:
+            if tag_id in scanned:
+                return True
+            scanned.add(tag_id)
+        else:
+            if tag_id not in scanned:
+                return True
+            scanned.discard(tag_id)
+        return False
+
+    def _replay_journal(self, scanned=None):
+        """
+        Applies journal entries newer than self.version in order. Returns False when the
+        next version is missing for good (trimmed by the TTL index), in which case the
+        index has to be rebuilt from the collection. Right after a rebuild, scanned holds
+        the ids of the tags it read, so changes the scan already reflects are skipped.
+        """
+        now = datetime.now(ZoneInfo("UTC")).replace(tzinfo=None)
+        for entry in self.journal.find({"_id": {"$gt": self.version}}).sort("_id", 1):
+            if entry["_id"] != self.version + 1:
+                created_at = entry.get("created_at") or now
+                # Versions are reserved before their entry is inserted, so a fresh gap is usually still in flight
+                return (now - created_at).total_seconds() < self.JOURNAL_GAP_SECONDS
+            for change in entry["changes"]:
+                if scanned is not None and self._covered_by_scan(change, scanned):
+                    continue
+                self._apply_delta(change["text"], change["tag"], change["delta"],
+                                  change.get("username"), change.get("annotation_date"))
+            self.version = entry["_id"]
+        return True
+
+    def _apply_delta(self, text, tag_type, delta, annotator=None, annotation_date=None):
+        """Adds (delta > 0) or removes (delta < 0) occurrences of a phrase/tag pair in the overlay"""
+        phrase = normalize_phrase(text)
+        if not phrase or not tag_type or not delta:
+            return
+
+        state = self._state
+        phrase_id = state.lookup(phrase)
+        if phrase_id is None:
+            if delta < 0:
+                return
+            phrase_id = state.phrase_count()
+            state.extra_phrases.append(phrase)
+            state.extra_ids[phrase] = phrase_id
+
+        old_entry = state.stats(phrase_id)
+        entry = {
+            "tags": dict(old_entry["tags"]),
+            "annotators": dict(old_entry["annotators"]),
+            "first_seen": old_entry["first_seen"],
+            "last_seen": old_entry["last_seen"]
+        }
+        self._add_to_stats(entry, tag_type, delta, annotator or 'unknown', annotation_date)
+        state.overrides[phrase_id] = entry
+        state.live_count += bool(entry["tags"]) - bool(old_entry["tags"])
+
+        before, after = old_entry["tags"].get(tag_type, 0), entry["tags"].get(tag_type, 0)
+        totals = state.tag_totals.setdefault(tag_type, [0, 0])
+        totals[0] += after - before
+        totals[1] += (after > 0) - (before > 0)
+
+    def _compact(self):
+        """Switches to a newer snapshot written by another worker, or writes the current state as one"""
+        state = self._state
+        on_disk = PhraseSnapshot.open(self.snapshot_path)
+        if on_disk is not None and on_disk.version > state.snapshot.version:
+            self._use(on_disk)
+            if not self._replay_journal():
+                self.rebuild()
+            return
+
+        phrases, stats = [], []
+        for phrase_id in range(state.phrase_count()):
+            entry = state.stats(phrase_id)
+            if entry["tags"]:
+                phrases.append(state.phrase(phrase_id))
+                stats.append(entry)
+        self._use(self._write_snapshot(self.version, phrases, stats))
+        print(f"Phrase index compacted to {len(phrases)} phrases at version {self.version}.")
+
+    def publish(self, changes):
+        """Journals tag changes under new versions, then applies them to this worker's index"""
+        chunks = [changes[i:i + self.JOURNAL_CHUNK] for i in range(0, len(changes), self.JOURNAL_CHUNK)]
+        counter = self.versions.find_one_and_update(
+            {"_id": "tags"},
+            {"$inc": {"version": len(chunks)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        first_version = counter["version"] - len(chunks) + 1
+        created_at = datetime.now(ZoneInfo("UTC"))
+        self.journal.insert_many([
+            {"_id": first_version + i, "created_at": created_at, "changes": chunk}
+            for i, chunk in enumerate(chunks)
+        ])
+        self.sync(force=True)
+
+    def sync(self, force=False):
+        """Replays journal entries written by any worker; throttled to once per sync_seconds unless forced"""
+        if not self._built:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_seconds:
+            return
+        with self._lock:
+            self._last_sync = now
+            if not self._replay_journal():
+                self.rebuild()
+                return
+            state = self._state
+            if (len(state.extra_phrases) > self.COMPACT_THRESHOLD
+                    or self.version - state.snapshot.version > self.SNAPSHOT_LAG):
+                self._compact()
+
+    def _automata(self, state):
+        """The snapshot automaton, plus one over phrases added since the snapshot"""
+        extra_count = len(state.extra_phrases)
+        if not extra_count:
+            return ((state.snapshot.automaton, 0),)
+        recent = state.recent
+        if recent is None or recent[1] < extra_count:
+            with self._lock:
+                recent = state.recent
+                extra_count = len(state.extra_phrases)
+                if recent is None or recent[1] < extra_count:
+                    sequences = [state.encode(phrase) for phrase in state.extra_phrases[:extra_count]]
+                    recent = state.recent = (PhraseAutomaton(sequences), extra_count)
+        return ((state.snapshot.automaton, 0), (recent[0], state.base_count))
+
+    def current_version(self):
+        """The journal version the index reflects after catching up; changes whenever any tag changes"""
+        self.ensure_built()
+        self.sync()
+        return self.version
+
+    def size(self):
+        self.ensure_built()
+        self.sync()
+        return self._state.live_count
+
+    def match_fuzzy(self, text, max_distance=FUZZY_MAX_DISTANCE, state=None):
+        """
+        Returns (phrase, stats, (start, end), edit_distance) for known phrases that occur in the text
+        with at most max_distance character edits in total, summed over their tokens. Near tokens
+        come from the deletion index; phrases are then found by walking the phrase trie from every
+        token position over those candidates. A candidate is only followed where the trie has an
+        edge for it, and its edit distance is only computed (once per token) when the walk reaches
+        a phrase end, so the many deletion index hits no phrase continues with cost a lookup each.
+        Each phrase is reported at its closest occurrence, closest phrases first.
+        """
+        if state is None:
+            self.ensure_built()
+            self.sync()
+            state = self._state
+
+        # Compiling the overlay automaton assigns symbols to tokens first seen after the snapshot
+        automata = self._automata(state)
+        tokens = tokenize_text(text)
+        token_hits = {}
+        hits = []    # per position: [(symbol, lower bound of its edit distance)]
+        limits = []  # per position: edits tolerated in that token
+        for token, _, _ in tokens:
+            if token not in token_hits:
+                token_limit = min(max_distance, fuzzy_token_distance_limit(token))
+                token_hits[token] = (token_limit, state.fuzzy_hits(token, token_limit))
+            limits.append(token_hits[token][0])
+            hits.append(token_hits[token][1])
+
+        distances = {}  # (token, symbol) -> edit distance, capped at the token's limit + 1
+
+        def path_distance(path):
+            """Total edit distance of a walk's (position, symbol) steps, None past a limit"""
+            total = 0
+            for position, symbol in path:
+                token = tokens[position][0]
+                distance = distances.get((token, symbol))
+                if distance is None:
+                    distance = distances[(token, symbol)] = bounded_edit_distance(token, state.token(symbol), limits[position])
+                total += distance
+                if distance > limits[position] or total > max_distance:
+                    return None
+            return total
+
+        best = {}  # phrase id -> (edit distance, start token, end token)
+        for automaton, first_phrase_id in automata:
+            for start_index in range(len(tokens)):
+                stack = [(0, start_index, 0, ())]
+                while stack:
+                    trie_state, position, bound, path = stack.pop()
+                    if position >= len(tokens):
+                        continue
+                    for symbol, lower_bound in hits[position]:
+                        if bound + lower_bound > max_distance:
+                            break
+                        next_state = automaton._step(trie_state, symbol)
+                        if next_state < 0:
+                            continue
+                        next_path = path + ((position, symbol),)
+                        local_id = automaton.outputs[next_state]
+                        if local_id >= 0:
+                            total_distance = path_distance(next_path)
+                            if total_distance is None:
+                                # Longer phrases through this prefix are no closer
+                                continue
+                            phrase_id = first_phrase_id + local_id
+                            found = (total_distance, start_index, position)
+                            if phrase_id not in best or found < best[phrase_id]:
+                                best[phrase_id] = found
+                        stack.append((next_state, position + 1, bound + lower_bound, next_path))
+
+        results = []
+        for phrase_id, (distance, start_index, end_index) in sorted(best.items(), key=lambda item: (item[1][0], item[0])):
+            entry = state.stats(phrase_id)
+            if entry["tags"]:
+                results.append((state.phrase(phrase_id), entry, (tokens[start_index][1], tokens[end_index][2]), distance))
+        return results
+
+    def summary(self, top_n=20):
+        """
+        Tag and phrase statistics maintained alongside the index: per-tag totals are adjusted on
+        every delta, and the most annotated phrases are ranked from the snapshot's precomputed top
+        list plus the phrases changed since, falling back to a full scan only when that cannot be exact.
+        """
+        self.ensure_built()
+        self.sync()
+        with self._lock:
+            state = self._state
+            tag_statistics = [
+                {"tag_type": tag_type, "total_annotations": totals[0], "unique_phrases_count": totals[1]}
+                for tag_type, totals in state.tag_totals.items()
+                if totals[0] > 0
+            ]
+
+            def ranked(phrase_ids):
+                return sorted(
+                    ((sum(state.stats(phrase_id)["tags"].values()), phrase_id) for phrase_id in phrase_ids),
+                    key=lambda x: (-x[0], x[1])
+                )
+
+            candidates = ranked(set(state.snapshot.top_phrase_ids) | set(state.overrides))
+            # Phrases outside the candidates still have their snapshot totals, which are at most top_threshold
+            if sum(1 for total, _ in candidates if total >= state.snapshot.top_threshold) < top_n:
+                candidates = ranked(range(state.phrase_count()))
+
+            most_common_phrases = []
+            for total, phrase_id in candidates[:top_n]:
+                if total > 0:
+                    most_common_phrases.append({
+                        "phrase": state.phrase(phrase_id),
+                        "occurrence_count": total,
+                        "tag_variety_count": len(state.stats(phrase_id)["tags"])
+                    })
+
+            return {
+                "total_annotated_phrases": state.live_count,
+                "tag_statistics": tag_statistics,
+                "most_common_phrases": most_common_phrases
+            }
+
+    def pin(self):
+        """
+        Brings the index up to date and returns its current state with every automaton compiled,
+        so it can be matched against (e.g. from forked pool workers) without the lock or the database.
+        """
+        self.ensure_built()
+        self.sync()
+        state = self._state
+        self._automata(state)
+        state.snapshot.token_ids()
+        return state
+
+    def match(self, text, state=None):
+        """
+        Returns (phrase, stats, (start, end)) for every known phrase found in the text as a whole
+        run of word tokens, using the first occurrence of each phrase, ordered by when the phrase
+        entered the index. (start, end) are character offsets into text.
+        Pass a state from pin() to match against that state as-is.
+        """
+        if state is None:
+            self.ensure_built()
+            self.sync()
+            state = self._state
+
+        tokens = tokenize_text(text)
+        # Compiling the overlay automaton assigns symbols to tokens first seen after the snapshot
+        automata = self._automata(state)
+        symbols = [state.token_id(token) for token, _, _ in tokens]
+        first_occurrence = {}
+        for automaton, first_phrase_id in automata:
+            for end_index, local_id in automaton.iter_matches(symbols):
+                phrase_id = first_phrase_id + local_id
+                if phrase_id not in first_occurrence:
+                    first_occurrence[phrase_id] = end_index
+
+        results = []
+        for phrase_id in sorted(first_occurrence):
+            entry = state.stats(phrase_id)
+            if entry["tags"]:
+                phrase = state.phrase(phrase_id)
+                end_index = first_occurrence[phrase_id]
+                start_index = end_index - phrase.count(' ')
+                results.append((phrase, entry, (tokens[start_index][1], tokens[end_index][2])))
+        return results
+
+
+phrase_index = PhraseIndex(
+    tags_collection,
+    index_versions_collection,
+    tag_index_journal_collection,
+    app.config['PHRASE_INDEX_SNAPSHOT'],
+    app.config['PHRASE_INDEX_SYNC_SECONDS']
+)
+
+
+# --- Columnar Tag Analytics ---
+
+class TagColumnsSnapshot:
+    """
+    Immutable view of TagColumns: per dimension an int32 code array plus its dictionary,
+    annotation dates as datetime64[ms] (NaT when missing), tag ids and a live-row mask.
+    Group-bys are bincount/unique over the codes of the rows a select() mask keeps.
+    """
+
+    def __init__(self, codes, dictionaries, dates, ids, alive):
+        self.codes = codes
+        self.dictionaries = dictionaries
+        self.dates = dates
+        self.ids = ids
+        self.alive = alive
+
+    def select(self, username=None, project_id=None, language=None, start=None, end=None):
+        """Mask of the live rows matching the filters; start/end compare like annotation_date queries"""
+        mask = self.alive.copy()
+        for dimension, value in (("username", username), ("project_id", project_id), ("language", language)):
+            if value:
+                code = self.dictionaries[dimension][0].get(value)
+                if code is None:
+                    return np.zeros_like(mask)
+                mask &= self.codes[dimension] == code
+        if start is not None:
+            mask &= self.dates >= np.datetime64(as_stored_utc(start), "ms")
+        if end is not None:
+            mask &= self.dates <= np.datetime64(as_stored_utc(end), "ms")
+        return mask
+
+    def counts(self, mask, dimension):
+        """{value: rows} over the masked rows"""
+        values = self.dictionaries[dimension][1]
+        counts = np.bincount(self.codes[dimension][mask], minlength=len(values))
+        return {values[code]: int(counts[code]) for code in np.flatnonzero(counts)}
+
+    def distinct_counts(self, mask, dimension, of, skip_none=False):
+        """{value: number of distinct values of `of`} over the masked rows, optionally not counting None"""
+        keys = self.codes[dimension][mask].astype(np.int64)
+        others = self.codes[of][mask]
+        if skip_none and None in self.dictionaries[of][0]:
+            kept = others != self.dictionaries[of][0][None]
+            keys, others = keys[kept], others[kept]
+        width = len(self.dictionaries[of][1])
+        counts = np.bincount(np.unique(keys * width + others) // width)
+        values = self.dictionaries[dimension][1]
+        return {values[code]: int(counts[code]) for code in np.flatnonzero(counts)}
+
+    def value_sets(self, mask, dimension, of):
+        """{value: set of the `of` values seen with it} over the masked rows; for low-cardinality pairs"""
+        width = len(self.dictionaries[of][1])
+        pairs = np.unique(self.codes[dimension][mask].astype(np.int64) * width + self.codes[of][mask])
+        values, others = self.dictionaries[dimension][1], self.dictionaries[of][1]
+        sets = {}
+        for pair in pairs.tolist():
+            sets.setdefault(values[pair // width], set()).add(others[pair % width])
+        return sets
+
+    def date_ranges(self, mask, dimension):
+        """{value: (first, last annotation date)} over the masked rows that have a date"""
+        dates = self.dates[mask]
+        known = ~np.isnat(dates)
+        codes = self.codes[dimension][mask][known]
+        stamps = dates[known].astype(np.int64)
+        size = len(self.dictionaries[dimension][1])
+        first = np.full(size, np.iinfo(np.int64).max)
+        last = np.full(size, np.iinfo(np.int64).min)
+        np.minimum.at(first, codes, stamps)
+        np.maximum.at(last, codes, stamps)
+        first, last = first.astype("datetime64[ms]"), last.astype("datetime64[ms]")
+        values = self.dictionaries[dimension][1]
+        return {values[code]: (first[code].item(), last[code].item()) for code in np.unique(codes)}
+
+    def day_counts(self, mask, of):
+        """{"YYYY-MM-DD": (rows, distinct values of `of`)} over the masked rows that have a date"""
+        dates = self.dates[mask]
+        known = ~np.isnat(dates)
+        days, day_codes, counts = np.unique(dates[known].astype("datetime64[D]"), return_inverse=True, return_counts=True)
+        width = len(self.dictionaries[of][1])
+        pairs = np.unique(day_codes.astype(np.int64) * width + self.codes[of][mask][known])
+        distinct = np.bincount(pairs // width, minlength=len(days))
+        return {str(day): (int(counts[i]), int(distinct[i])) for i, day in enumerate(days)}
+
+
+class TagColumns:
+    """
+    Columnar in-memory copy of the approved tags for ad-hoc report filters. Tag type, user,
+    project, language and phrase (lowercased, trimmed) are dictionary-encoded into NumPy code
+    arrays next to datetime64 annotation dates, so group-bys run as vectorized bincount/unique
+    instead of per-tag Python dict building.
+
+    Built with one scan of the tags collection, then kept current like the phrase index by
+    replaying the tag journal record_tag_changes writes: inserted tags are appended, deleted
+    ones masked out by id. Once REBUILD_DEAD_FRACTION of the rows are masked, or the journal
+    no longer reaches back, the columns are rebuilt. Bulk rewrites of tags in place (project
+    language changes, backfills) bump an epoch with invalidate() that also forces a rebuild.
+    Readers get an immutable snapshot().
+    """
+
+    EPOCH_ID = "tag-columns-epoch"
+
+    DIMENSIONS = ("tag", "username", "project_id", "language", "phrase")
+    REBUILD_DEAD_FRACTION = 0.25
+    PROJECTION = {"tag": 1, "username": 1, "project_id": 1, "language": 1, "text": 1, "annotation_date": 1}
+
+    def __init__(self, collection, versions_collection, journal_collection, sync_seconds=2):
+        self.collection = collection
+        self.versions = versions_collection
+        self.journal = journal_collection
+        self.sync_seconds = sync_seconds
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._dictionaries = None
+        self._last_sync = 0
+        self.version = 0
+        self.epoch = 0
+
+    def _current_epoch(self):
+        counter = self.versions.find_one({"_id": self.EPOCH_ID})
+        return counter["epoch"] if counter else 0
+
+    def invalidate(self):
+        """Makes every worker rebuild its columns on the next sync, after tags were rewritten without journaling"""
+        self.versions.update_one({"_id": self.EPOCH_ID}, {"$inc": {"epoch": 1}}, upsert=True)
+
+    def snapshot(self):
+        """The current columns, built on first use and caught up at most every sync_seconds"""
+        if self._snapshot is None:
+            self.rebuild()
+        else:
+            self.sync()
+        return self._snapshot
+
+    @staticmethod
+    def _values(tag):
+        return (
+            tag.get("tag"),
+            tag.get("username"),
+            tag.get("project_id"),
+            tag.get("language"),
+            (tag.get("text") or "").lower().strip()
+        )
+
+    def _encode(self, tags, id_of):
+        """Code, date and id arrays of some tags, growing the dictionaries with unseen values"""
+        columns = [[] for _ in self.DIMENSIONS]
+        dates = []
+        ids = []
+        for tag in tags:
+            for column, dimension, value in zip(columns, self.DIMENSIONS, self._values(tag)):
+                codes, values = self._dictionaries[dimension]
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(values)
+                    values.append(value)
+                column.append(code)
+            annotation_date = tag.get("annotation_date")
+            dates.append(as_stored_utc(annotation_date) if isinstance(annotation_date, datetime) else None)
+            ids.append(id_of(tag))
+        return (
+            {dimension: np.array(column, dtype=np.int32) for dimension, column in zip(self.DIMENSIONS, columns)},
+            np.array(dates, dtype="datetime64[ms]"),
+            np.array(ids, dtype="S12")
+        )
+
+    def rebuild(self):
+        """Loads every approved tag into fresh columns, then replays what was journaled meanwhile"""
+        with self._lock:
+            counter = self.versions.find_one({"_id": "tags"})
+            version = counter["version"] if counter else 0
+            self.epoch = self._current_epoch()
+            self._dictionaries = {dimension: ({}, []) for dimension in self.DIMENSIONS}
+            codes, dates, ids = self._encode(
+                self.collection.find({}, self.PROJECTION),
+                lambda tag: tag["_id"].binary if isinstance(tag.get("_id"), ObjectId) else b""
+            )
+            self._snapshot = TagColumnsSnapshot(codes, self._dictionaries, dates, ids, np.ones(len(ids), dtype=bool))
+            self.version = version
+            self._last_sync = time.monotonic()
+            print(f"Tag columns built with {len(ids)} tags at version {version}.")
+            # Picks up writes journaled while the collection was being scanned
+            self._replay_journal()
+
+    def sync(self):
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_seconds:
+            return
+        with self._lock:
+            self._last_sync = now
+            if self._current_epoch() != self.epoch or not self._replay_journal():
+                self.rebuild()
+                return
+            alive = self._snapshot.alive
+            if (~alive).sum() > self.REBUILD_DEAD_FRACTION * len(alive):
+                self.rebuild()
+
+    def _replay_journal(self):
+        """Applies journal entries newer than self.version; False when the next version is gone for good"""
+        now = datetime.now(ZoneInfo("UTC")).replace(tzinfo=None)
+        for entry in self.journal.find({"_id": {"$gt": self.version}}).sort("_id", 1):
+            if entry["_id"] != self.version + 1:
+                created_at = entry.get("created_at") or now
+                return (now - created_at).total_seconds() < PhraseIndex.JOURNAL_GAP_SECONDS
+            self._apply(entry["changes"])
+            self.version = entry["_id"]
+        return True
+
+    def _apply(self, changes):
+        """Appends inserted tags and masks out deleted ones, one vectorized step per run of same-sign changes"""
+        run = []
+        for change in changes + [None]:
+            if run and (change is None or (change["delta"] > 0) != (run[0]["delta"] > 0)):
+                if run[0]["delta"] > 0:
+                    self._append(run)
+                else:
+                    self._remove(run)
+                run = []
+            if change is not None:
+                run.append(change)
+
+    @staticmethod
+    def _id_bytes(change):
+        tag_id = change.get("tag_id")
+        return ObjectId(tag_id).binary if tag_id and ObjectId.is_valid(tag_id) else b""
+
+    def _append(self, changes):
+        snapshot = self._snapshot
+        codes, dates, ids = self._encode(changes, self._id_bytes)
+        # Tags scanned by rebuild() may be journaled again right after it
+        new = ~np.isin(ids, snapshot.ids[snapshot.alive]) | (ids == b"")
+        self._snapshot = TagColumnsSnapshot(
+            {dimension: np.concatenate([snapshot.codes[dimension], codes[dimension][new]]) for dimension in self.DIMENSIONS},
+            self._dictionaries,
+            np.concatenate([snapshot.dates, dates[new]]),
+            np.concatenate([snapshot.ids, ids[new]]),
+            np.concatenate([snapshot.alive, np.ones(int(new.sum()), dtype=bool)])
+        )
+
+    def _remove(self, changes):
+        snapshot = self._snapshot
+        ids = np.array([self._id_bytes(change) for change in changes], dtype="S12")
+        ids = ids[ids != b""]
+        if not len(ids):
+            return
+        self._snapshot = TagColumnsSnapshot(
+            snapshot.codes, self._dictionaries, snapshot.dates, snapshot.ids,
+            snapshot.alive & ~np.isin(snapshot.ids, ids)
+        )
+
+
+tag_columns = TagColumns(
+    tags_collection,
+    index_versions_collection,
+    tag_index_journal_collection,
+    app.config['TAG_COLUMNS_SYNC_SECONDS']
+)
+
+
+def record_tag_changes(tag_docs, delta):
+    """
+    Journals +1 (inserted) or -1 (deleted) deltas for approved tag documents so every worker's
+    recommendation index and tag columns pick them up, and applies them to the analytics rollups
+    """
+    try:
+        apply_rollup_changes(tag_docs, delta)
+    except Exception as e:
+        print(f"Error updating analytics rollups: {e}")
+
+    # Every change is journaled; the phrase index skips the ones without a phrase and tag type
+    changes = [
+        {
+            "text": tag.get('text'),
+            "tag": tag.get('tag'),
+            "delta": delta,
+            "username": tag.get('username'),
+            "annotation_date": tag.get('annotation_date'),
+            "tag_id": str(tag['_id']) if tag.get('_id') else None,
+            "project_id": tag.get('project_id'),
+            "language": tag.get('language')
+        }
+        for tag in tag_docs
+    ]
+    if not changes:
+        return
+    try:
+        phrase_index.publish(changes)
+    except Exception as e:
+        print(f"Error journaling tag changes for the recommendation index: {e}")
+
 # --- Recommendation Endpoints  ---
+def build_sentence_recommendations(sentence_text, state=None):
+    """Top 5 recommendations for one normalized sentence of an uploaded file"""
+    sentence_recommendations = []
+
+    # Every known phrase occurring in the sentence, found in one pass
+    for phrase, phrase_stats, _ in phrase_index.match(sentence_text, state):
+        tag_counts = phrase_stats["tags"]
+        # Find the most frequent tag for this phrase
+        most_common_tag = max(tag_counts.items(), key=lambda x: x[1])
+
+        recommendation = {
+            "phrase": phrase,
+            "recommended_tag": most_common_tag[0],
+            "confidence": min(most_common_tag[1] / 10.0, 1.0),  # Normalize confidence (max 1.0)
+            "occurrence_count": most_common_tag[1],
+            "sentence_context": sentence_text
+        }
+        sentence_recommendations.append(recommendation)
+
+    # Sort recommendations by confidence (highest first)
+    sentence_recommendations.sort(key=lambda x: x['confidence'], reverse=True)
+    return sentence_recommendations[:5]  # Top 5 recommendations per sentence
+
+
+# Index state inherited by forked index workers
+_index_worker_state = None
+
+
+def _init_index_worker(state):
+    global _index_worker_state
+    _index_worker_state = state
+
+
+def _run_index_task(task_and_chunk):
+    task, chunk = task_and_chunk
+    return task(chunk, _index_worker_state)
+
+
+def imap_index_chunks(task, chunks, state, parallel):
+    """
+    Yields task(chunk, state) for every chunk, in input order. When parallel, the chunks run in a
+    fork-context process pool whose workers inherit the pinned index state (the snapshot pages are
+    shared, not copied). The pool is terminated when the generator is closed, e.g. on client disconnect.
+    """
+    if parallel and 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        pool = context.Pool(app.config['RECOMMEND_POOL_WORKERS'], _init_index_worker, (state,))
+        try:
+            yield from pool.imap(_run_index_task, ((task, chunk) for chunk in chunks))
+        finally:
+            pool.terminate()
+    else:
+        for chunk in chunks:
+            yield task(chunk, state)
+
+
+def _recommend_chunk(chunk, state):
+    """Index task: [(position, sentence, recommendations)] for a chunk of (position, sentence) pairs"""
+    return [
+        (position, sentence_text, build_sentence_recommendations(sentence_text, state))
+        for position, sentence_text in chunk
+    ]
+
+
+def stream_file_recommendations(sentence_texts):
+    """
+    Yields NDJSON lines: one per sentence with recommendations, in file order, then a summary line.
+    Inputs larger than one chunk are matched across the index process pool.
+    """
+    state = phrase_index.pin()
+    chunk_size = app.config['RECOMMEND_STREAM_CHUNK_SIZE']
+    chunks = (
+        [(position, sentence_texts[position]) for position in range(start, min(start + chunk_size, len(sentence_texts)))]
+        for start in range(0, len(sentence_texts), chunk_size)
+    )
+
+    with_recommendations = 0
+    results = imap_index_chunks(_recommend_chunk, chunks, state, parallel=len(sentence_texts) > chunk_size)
+    try:
+        for chunk_results in results:
+            for position, sentence_text, recommendations in chunk_results:
+                if recommendations:
+                    with_recommendations += 1
+                    yield json.dumps({
+                        "index": position,
+                        "sentence": sentence_text,
+                        "recommendations": recommendations
+                    }, ensure_ascii=False) + "\n"
+    finally:
+        results.close()
+
+    yield json.dumps({
+        "summary": {
+            "total_sentences_processed": len(sentence_texts),
+            "sentences_with_recommendations": with_recommendations,
+            "phrase_database_size": state.live_count
+        }
+    }) + "\n"
+
+
 @app.route("/api/recommend-tags", methods=["POST"])
 def recommend_tags():
     """
     Recommends tags for phrases in a file based on previously annotated data.
     Compares phrases in the uploaded file against existing annotations in the database.
+    With ?stream=true the results are streamed as NDJSON (application/x-ndjson), one line
+    per sentence with recommendations in file order, followed by a summary line.
     """
     try:
         if 'file' not in request.files:
@@ -3005,66 +4998,29 @@ def recommend_tags():
         
         if not sentences_data:
             return jsonify({"error": "No valid sentences found in the file"}), 400
-        
-        # Get all existing tags from the database to build recommendation database
-        all_tags = list(tags_collection.find({}, {
-            "text": 1, 
-            "tag": 1,
-            "annotation_date": 1
-        }))
-        
-        # Build a dictionary of phrase -> tag mappings with confidence scores
-        phrase_tag_mappings = {}
-        
-        for tag in all_tags:
-            phrase = tag.get('text', '').strip().lower()
-            tag_type = tag.get('tag', '')
-            
-            if phrase and tag_type:
-                if phrase not in phrase_tag_mappings:
-                    phrase_tag_mappings[phrase] = {}
-                
-                if tag_type not in phrase_tag_mappings[phrase]:
-                    phrase_tag_mappings[phrase][tag_type] = 0
-                
-                phrase_tag_mappings[phrase][tag_type] += 1
+
+        if request.args.get('stream', '').lower() in ('1', 'true'):
+            sentence_texts = [sentence_data.get('textContent', '').strip().lower() for sentence_data in sentences_data]
+            return Response(stream_file_recommendations(sentence_texts), mimetype='application/x-ndjson')
         
         # Process each sentence to find recommendations
         recommendations = []
         
         for sentence_data in sentences_data:
             sentence_text = sentence_data.get('textContent', '').strip().lower()
-            sentence_recommendations = []
-            
-            # Check each known phrase against the sentence
-            for phrase, tag_counts in phrase_tag_mappings.items():
-                if phrase and phrase in sentence_text:
-                    # Find the most frequent tag for this phrase
-                    most_common_tag = max(tag_counts.items(), key=lambda x: x[1])
-                    
-                    recommendation = {
-                        "phrase": phrase,
-                        "recommended_tag": most_common_tag[0],
-                        "confidence": min(most_common_tag[1] / 10.0, 1.0),  # Normalize confidence (max 1.0)
-                        "occurrence_count": most_common_tag[1],
-                        "sentence_context": sentence_text
-                    }
-                    sentence_recommendations.append(recommendation)
-            
-            # Sort recommendations by confidence (highest first)
-            sentence_recommendations.sort(key=lambda x: x['confidence'], reverse=True)
+            sentence_recommendations = build_sentence_recommendations(sentence_text)
             
             if sentence_recommendations:
                 recommendations.append({
                     "sentence": sentence_text,
-                    "recommendations": sentence_recommendations[:5]  # Top 5 recommendations per sentence
+                    "recommendations": sentence_recommendations
                 })
         
         return jsonify({
             "total_sentences_processed": len(sentences_data),
             "sentences_with_recommendations": len(recommendations),
             "recommendations": recommendations,
-            "phrase_database_size": len(phrase_tag_mappings)
+            "phrase_database_size": phrase_index.size()
         }), 200
         
     except Exception as e:
@@ -3072,6 +5028,40 @@ def recommend_tags():
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+def compute_reviewer_stats(reviewer_username):
+    """
+    Sentence review counters for the reviewer dashboard from one aggregation: sentences are
+    grouped by (review_status, is_annotated, reviewed by this reviewer), which scans only
+    REVIEW_STATS_INDEX, and the handful of groups are summed up here.
+    """
+    groups = sentences_collection.aggregate([
+        {"$group": {
+            "_id": {
+                "status": "$review_status",
+                "annotated": "$is_annotated",
+                "mine": {"$eq": ["$reviewed_by", reviewer_username]}
+            },
+            "count": {"$sum": 1}
+        }}
+    ], hint=REVIEW_STATS_INDEX)
+
+    stats = {"reviewed": 0, "pending": 0, "approved": 0, "rejected": 0}
+    for group in groups:
+        status = group['_id'].get('status')
+        count = group['count']
+        # Sentences reviewed by this reviewer, or reviewed at all
+        if group['_id'].get('mine') or status in ("Approved", "Rejected", "Partially Approved"):
+            stats["reviewed"] += count
+        # Pending reviews (annotated but not reviewed)
+        if group['_id'].get('annotated') is True and status in (None, "Pending"):
+            stats["pending"] += count
+        if status == "Approved":
+            stats["approved"] += count
+        elif status == "Rejected":
+            stats["rejected"] += count
+    return stats
+
+
 @app.route("/api/analytics/reviewer-stats", methods=["GET"])
 @token_required
 def get_reviewer_stats():
@@ -3081,47 +5071,35 @@ def get_reviewer_stats():
         reviewer_username = current_user.get('username')
         
         print(f"DEBUG: Fetching stats for reviewer: {reviewer_username}")
+
+        cached = reviewer_stats_cache.get(reviewer_username, 0)
+        if cached is not None:
+            return jsonify(cached), 200
         
         # Count total projects with annotated sentences
-        total_projects = projects_collection.count_documents({})
-        
-        # FIXED: Count sentences reviewed by this reviewer
-        total_sentences_reviewed = sentences_collection.count_documents({
-            "$or": [
-                {"reviewed_by": reviewer_username},
-                {"review_status": {"$in": ["Approved", "Rejected", "Partially Approved"]}}
-            ]
-        })
+        total_projects = projects_collection.estimated_document_count()
         
-        # FIXED: Count pending reviews (annotated but not reviewed)
-        pending_sentences = sentences_collection.count_documents({
-            "is_annotated": True,
-            "$or": [
-                {"review_status": {"$in": [None, "Pending"]}},
-                {"review_status": {"$exists": False}}
-            ]
-        })
+        stats = compute_reviewer_stats(reviewer_username)
+        total_sentences_reviewed = stats["reviewed"]
+        pending_sentences = stats["pending"]
         
         # FIXED: Calculate review accuracy
-        approved_count = sentences_collection.count_documents({
-            "review_status": "Approved"
-        })
-        
-        rejected_count = sentences_collection.count_documents({
-            "review_status": "Rejected"
-        })
+        approved_count = stats["approved"]
+        rejected_count = stats["rejected"]
         
         total_reviewed = approved_count + rejected_count
         review_accuracy = (approved_count / total_reviewed * 100) if total_reviewed > 0 else 0
         
         print(f"DEBUG: Stats - projects: {total_projects}, reviewed: {total_sentences_reviewed}, pending: {pending_sentences}, accuracy: {review_accuracy}%")
         
-        return jsonify({
+        response = {
             "totalProjects": total_projects,
             "totalSentencesReviewed": total_sentences_reviewed,
             "pendingReviews": pending_sentences,
             "reviewAccuracy": round(review_accuracy, 1)
-        }), 200
+        }
+        reviewer_stats_cache.put(reviewer_username, 0, response)
+        return jsonify(response), 200
         
     except Exception as e:
         print(f"Error fetching reviewer stats: {e}")
@@ -3132,10 +5110,135 @@ def get_reviewer_stats():
             "reviewAccuracy": 0
         }), 200
                    
+class VersionedLRUCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL. Every lookup carries the version of the data the
+    values were computed from; when it changes, all entries are dropped at once.
+    """
+
+    def __init__(self, max_size, ttl_seconds):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            if version != self._version:
+                # Computed against data that has changed since the lookup
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "invalidations": self.invalidations,
+                "index_version": self._version
+            }
+
+
+text_recommendation_cache = VersionedLRUCache(
+    app.config['RECOMMEND_CACHE_SIZE'],
+    app.config['RECOMMEND_CACHE_TTL_SECONDS']
+)
+
+# Per-reviewer dashboard stats; entries only expire by TTL (the version never changes)
+reviewer_stats_cache = VersionedLRUCache(1024, app.config['REVIEWER_STATS_CACHE_TTL_SECONDS'])
+
+
+def build_text_recommendations(text_content, fuzzy=False, max_distance=FUZZY_MAX_DISTANCE):
+    """
+    Matches normalized text against the phrase index and returns
+    (recommendations sorted by confidence, total number of matches).
+    With fuzzy=True near matches are included too; their confidence is scaled down
+    by the share of the phrase that had to be edited.
+    """
+    recommendations = []
+
+    if fuzzy:
+        matches = phrase_index.match_fuzzy(text_content, max_distance)
+    else:
+        matches = ((phrase, stats, span, 0) for phrase, stats, span in phrase_index.match(text_content))
+
+    for phrase, phrase_stats, (start_pos, end_pos), edit_distance in matches:
+        tag_counts = phrase_stats["tags"]
+
+        # Get the most common tag
+        most_common_tag = max(tag_counts.items(), key=lambda x: x[1])
+        total_occurrences = sum(tag_counts.values())
+
+        recommendation = {
+            "phrase": phrase,
+            "recommended_tag": most_common_tag[0],
+            "confidence": min(most_common_tag[1] / max(total_occurrences, 10), 1.0),
+            "occurrence_count": most_common_tag[1],
+            "total_occurrences": total_occurrences,
+            "position_in_text": {
+                "start": start_pos,
+                "end": end_pos
+            },
+            "coverage": {
+                "total_annotators": len(phrase_stats["annotators"]),
+                "first_seen": phrase_stats["first_seen"].isoformat() if phrase_stats["first_seen"] else None,
+                "last_seen": phrase_stats["last_seen"].isoformat() if phrase_stats["last_seen"] else None
+            },
+            "alternative_tags": [
+                {"tag": tag, "count": count} 
+                for tag, count in tag_counts.items() 
+                if tag != most_common_tag[0]
+            ]
+        }
+        if fuzzy:
+            recommendation["confidence"] *= 1 - edit_distance / max(len(phrase), 1)
+            recommendation["edit_distance"] = edit_distance
+            recommendation["matched_text"] = text_content[start_pos:end_pos]
+        recommendations.append(recommendation)
+
+    # Sort by confidence and then by occurrence count
+    recommendations.sort(key=lambda x: (x['confidence'], x['occurrence_count']), reverse=True)
+    return recommendations, len(recommendations)
+
+
 @app.route("/api/recommend-tags/text", methods=["POST"])
 def recommend_tags_from_text():
     """
     Recommends tags for a specific text input (for real-time suggestions during annotation).
+    Send "fuzzy": true (and optionally "max_distance", at most FUZZY_MAX_DISTANCE) to also get
+    near matches of inflected or misspelled phrases, with their edit_distance.
     """
     try:
         data = request.json
@@ -3143,152 +5246,322 @@ def recommend_tags_from_text():
         
         if not text_content:
             return jsonify({"error": "Text content is required"}), 400
+
+        fuzzy = bool(data.get('fuzzy', False))
+        try:
+            max_distance = max(0, min(int(data.get('max_distance', FUZZY_MAX_DISTANCE)), FUZZY_MAX_DISTANCE))
+        except (TypeError, ValueError):
+            return jsonify({"error": "max_distance must be an integer"}), 400
+        
+        # Reopened sentences are served from the cache until any tag changes
+        cache_key = (text_content, fuzzy, max_distance)
+        index_version = phrase_index.current_version()
+        response = text_recommendation_cache.get(cache_key, index_version)
+        if response is None:
+            # Find matching phrases in the input text
+            recommendations, total_matches = build_text_recommendations(text_content, fuzzy, max_distance)
+            response = {
+                "input_text": text_content,
+                "recommendations": recommendations[:10],  # Top 10 recommendations
+                "total_matches_found": total_matches
+            }
+            text_recommendation_cache.put(cache_key, index_version, response)
         
-        # Get all existing tags from the database
-        all_tags = list(tags_collection.find({}, {
-            "text": 1, 
-            "tag": 1,
-            "annotation_date": 1,
-            "username": 1
-        }))
-        
-        # Build phrase mappings
-        phrase_tag_mappings = {}
-        phrase_details = {}
+        return jsonify(response), 200
         
-        for tag in all_tags:
-            phrase = tag.get('text', '').strip().lower()
-            tag_type = tag.get('tag', '')
-            
-            if phrase and tag_type:
-                if phrase not in phrase_tag_mappings:
-                    phrase_tag_mappings[phrase] = {}
-                    phrase_details[phrase] = {
-                        "examples": [],
-                        "annotators": set(),
-                        "first_seen": tag.get('annotation_date'),
-                        "last_seen": tag.get('annotation_date')
+    except Exception as e:
+        print(f"Error generating text tag recommendations: {e}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+@app.route("/api/recommend-tags/cache-stats", methods=["GET"])
+@token_required
+def get_recommendation_cache_stats():
+    """Hit/miss counters of the /api/recommend-tags/text response cache"""
+    return jsonify(text_recommendation_cache.stats()), 200
+
+
+@app.route("/api/recommend-tags/batch", methods=["POST"])
+@token_required
+def recommend_tags_batch():
+    """
+    Recommends tags for many sentences in one request, e.g. a whole page of a project.
+    Accepts either {"sentence_ids": [...]} or {"texts": [...]}; results come back in request order.
+    """
+    try:
+        data = request.json or {}
+        sentence_ids = data.get('sentence_ids')
+        texts = data.get('texts')
+
+        if (sentence_ids is None) == (texts is None):
+            return jsonify({"error": "Provide either sentence_ids or texts"}), 400
+
+        items = sentence_ids if sentence_ids is not None else texts
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "sentence_ids/texts must be a non-empty list"}), 400
+
+        max_items = app.config['RECOMMEND_BATCH_MAX_ITEMS']
+        if len(items) > max_items:
+            return jsonify({"error": f"At most {max_items} sentences can be processed per request"}), 400
+
+        # (sentence_id, text or None, error or None) per requested item
+        batch = []
+        if sentence_ids is not None:
+            object_ids = [ObjectId(sid) for sid in sentence_ids if isinstance(sid, str) and ObjectId.is_valid(sid)]
+            sentence_texts = {
+                str(sentence["_id"]): sentence.get("textContent", "")
+                for sentence in sentences_collection.find({"_id": {"$in": object_ids}}, {"textContent": 1})
+            }
+            for sid in sentence_ids:
+                if not isinstance(sid, str) or not ObjectId.is_valid(sid):
+                    batch.append((sid, None, "Invalid sentence id"))
+                elif sid not in sentence_texts:
+                    batch.append((sid, None, "Sentence not found"))
+                elif isinstance(sentence_texts[sid], str) and sentence_texts[sid].strip():
+                    batch.append((sid, sentence_texts[sid], None))
+                else:
+                    batch.append((sid, None, "Text content is required"))
+        else:
+            for text in texts:
+                if isinstance(text, str) and text.strip():
+                    batch.append((None, text, None))
+                else:
+                    batch.append((None, None, "Text content is required"))
+
+        max_chars = app.config['RECOMMEND_BATCH_MAX_CHARS']
+        total_chars = sum(len(text) for _, text, _ in batch if text)
+        if total_chars > max_chars:
+            return jsonify({"error": f"Batch text exceeds {max_chars} characters"}), 400
+
+        results = []
+        for sentence_id, text, error in batch:
+            result = {"sentence_id": sentence_id} if sentence_ids is not None else {}
+            if error:
+                result["error"] = error
+            else:
+                text_content = text.strip().lower()
+                recommendations, total_matches = build_text_recommendations(text_content)
+                result.update({
+                    "input_text": text_content,
+                    "recommendations": recommendations[:10],
+                    "total_matches_found": total_matches
+                })
+            results.append(result)
+
+        return jsonify({
+            "results": results,
+            "total_items": len(results)
+        }), 200
+
+    except Exception as e:
+        print(f"Error generating batch tag recommendations: {e}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+
+
+
+# --- Auto Pre-Annotation Jobs ---
+AUTO_ANNOTATOR_USERNAME = "auto_annotator_system"
+AUTO_ANNOTATE_STALE_MINUTES = 15  # a running job without progress for this long is considered dead
+
+
+def _auto_annotate_chunk(chunk, state):
+    """Index task: [(sentence_id, [(phrase, tag, confidence, occurrence_count)])] for (sentence_id, text) pairs"""
+    results = []
+    for sentence_id, sentence_text in chunk:
+        proposals = []
+        for phrase, phrase_stats, _ in phrase_index.match(sentence_text, state):
+            tag, count = max(phrase_stats["tags"].items(), key=lambda x: x[1])
+            proposals.append((phrase, tag, min(count / 10.0, 1.0), count))
+        results.append((sentence_id, proposals))
+    return results
+
+
+def _project_sentence_chunks(project_id, chunk_size):
+    chunk = []
+    for sentence in sentences_collection.find({"project_id": project_id}, {"textContent": 1}):
+        chunk.append((str(sentence["_id"]), (sentence.get("textContent") or '').strip().lower()))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_auto_annotation_job(job_id, project_id):
+    """
+    Proposes tags for every sentence of a project from the phrase index and stages them as
+    AUTO_ANNOTATOR_USERNAME tags, one chunk of sentences at a time. Earlier auto tags that were
+    not rejected are replaced; phrases a user already tagged (or rejected) on a sentence are skipped.
+    """
+    try:
+        chunk_size = app.config['AUTO_ANNOTATE_CHUNK_SIZE']
+        total_sentences = sentences_collection.count_documents({"project_id": project_id})
+        auto_annotation_jobs_collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "running", "total_sentences": total_sentences, "updated_at": get_ist_time()}}
+        )
+
+        project = projects_collection.find_one({"_id": ObjectId(project_id)}, {"language": 1}) or {}
+        scope = tag_scope(project_id, project.get("language", "Unknown"))
+
+        state = phrase_index.pin()
+        chunks = _project_sentence_chunks(project_id, chunk_size)
+        for chunk_results in imap_index_chunks(_auto_annotate_chunk, chunks, state, parallel=total_sentences > chunk_size):
+            sentence_ids = [sentence_id for sentence_id, _ in chunk_results]
+
+            staged_tags_collection.delete_many({
+                "source_sentence_id": {"$in": sentence_ids},
+                "username": AUTO_ANNOTATOR_USERNAME,
+                "review_status": {"$ne": "Rejected"}
+            })
+            already_tagged = set()
+            for collection in (staged_tags_collection, tags_collection):
+                for tag in collection.find({"source_sentence_id": {"$in": sentence_ids}}, {"source_sentence_id": 1, "text": 1}):
+                    already_tagged.add((tag.get("source_sentence_id"), normalize_phrase(tag.get("text"))))
+
+            now = get_ist_time()
+            staged_tags = [
+                {
+                    'tag': tag,
+                    'source_sentence_id': sentence_id,
+                    'username': AUTO_ANNOTATOR_USERNAME,
+                    'text': phrase,
+                    'annotation_date': now,
+                    'status': 'Staged/Pending Review',
+                    'review_status': 'Pending',
+                    **scope,
+                    'auto_annotation': {
+                        'job_id': str(job_id),
+                        'confidence': confidence,
+                        'occurrence_count': occurrence_count
                     }
-                
-                if tag_type not in phrase_tag_mappings[phrase]:
-                    phrase_tag_mappings[phrase][tag_type] = 0
-                
-                phrase_tag_mappings[phrase][tag_type] += 1
-                phrase_details[phrase]["annotators"].add(tag.get('username', 'unknown'))
-                
-                # Update timestamps
-                if tag.get('annotation_date'):
-                    if (phrase_details[phrase]["first_seen"] is None or 
-                        tag['annotation_date'] < phrase_details[phrase]["first_seen"]):
-                        phrase_details[phrase]["first_seen"] = tag['annotation_date']
-                    
-                    if (phrase_details[phrase]["last_seen"] is None or 
-                        tag['annotation_date'] > phrase_details[phrase]["last_seen"]):
-                        phrase_details[phrase]["last_seen"] = tag['annotation_date']
-        
-        # Find matching phrases in the input text
-        recommendations = []
-        
-        for phrase, tag_counts in phrase_tag_mappings.items():
-            if phrase and phrase in text_content:
-                # Calculate position in text
-                start_pos = text_content.find(phrase)
-                end_pos = start_pos + len(phrase)
-                
-                # Get the most common tag
-                most_common_tag = max(tag_counts.items(), key=lambda x: x[1])
-                total_occurrences = sum(tag_counts.values())
-                
-                recommendation = {
-                    "phrase": phrase,
-                    "recommended_tag": most_common_tag[0],
-                    "confidence": min(most_common_tag[1] / max(total_occurrences, 10), 1.0),
-                    "occurrence_count": most_common_tag[1],
-                    "total_occurrences": total_occurrences,
-                    "position_in_text": {
-                        "start": start_pos,
-                        "end": end_pos
-                    },
-                    "coverage": {
-                        "total_annotators": len(phrase_details[phrase]["annotators"]),
-                        "first_seen": phrase_details[phrase]["first_seen"].isoformat() if phrase_details[phrase]["first_seen"] else None,
-                        "last_seen": phrase_details[phrase]["last_seen"].isoformat() if phrase_details[phrase]["last_seen"] else None
-                    },
-                    "alternative_tags": [
-                        {"tag": tag, "count": count} 
-                        for tag, count in tag_counts.items() 
-                        if tag != most_common_tag[0]
-                    ]
                 }
-                recommendations.append(recommendation)
-        
-        # Sort by confidence and then by occurrence count
-        recommendations.sort(key=lambda x: (x['confidence'], x['occurrence_count']), reverse=True)
-        
+                for sentence_id, proposals in chunk_results
+                for phrase, tag, confidence, occurrence_count in proposals
+                if (sentence_id, phrase) not in already_tagged
+            ]
+            if staged_tags:
+                staged_tags_collection.insert_many(staged_tags, ordered=False)
+
+            auto_annotation_jobs_collection.update_one(
+                {"_id": job_id},
+                {
+                    "$inc": {"processed_sentences": len(chunk_results), "tags_created": len(staged_tags)},
+                    "$set": {"updated_at": get_ist_time()}
+                }
+            )
+
+        auto_annotation_jobs_collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "completed", "finished_at": get_ist_time(), "updated_at": get_ist_time()}}
+        )
+        print(f"Auto-annotation job {job_id} for project {project_id} completed.")
+    except Exception as e:
+        print(f"Error in auto-annotation job {job_id}: {e}")
+        traceback.print_exc()
+        auto_annotation_jobs_collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "failed", "error": str(e), "finished_at": get_ist_time(), "updated_at": get_ist_time()}}
+        )
+
+
+def serialize_auto_annotation_job(job):
+    return {
+        "job_id": str(job["_id"]),
+        "project_id": job.get("project_id"),
+        "status": job.get("status"),
+        "total_sentences": job.get("total_sentences", 0),
+        "processed_sentences": job.get("processed_sentences", 0),
+        "tags_created": job.get("tags_created", 0),
+        "started_by": job.get("started_by"),
+        "started_at": job["started_at"].isoformat() if job.get("started_at") else None,
+        "finished_at": job["finished_at"].isoformat() if job.get("finished_at") else None,
+        "error": job.get("error")
+    }
+
+
+@app.route("/api/projects/<project_id>/auto-annotate", methods=["POST"])
+@admin_required
+def start_auto_annotation(project_id):
+    """Starts a background job that pre-annotates every sentence of the project from the phrase index"""
+    try:
+        project = projects_collection.find_one({"_id": ObjectId(project_id)})
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        active_job = auto_annotation_jobs_collection.find_one({
+            "project_id": project_id,
+            "status": {"$in": ["queued", "running"]}
+        })
+        if active_job:
+            last_progress = active_job.get("updated_at") or active_job.get("started_at")
+            if last_progress and last_progress > datetime.now(ZoneInfo("UTC")).replace(tzinfo=None) - timedelta(minutes=AUTO_ANNOTATE_STALE_MINUTES):
+                return jsonify({
+                    "error": "An auto-annotation job is already running for this project",
+                    "job": serialize_auto_annotation_job(active_job)
+                }), 409
+            auto_annotation_jobs_collection.update_one(
+                {"_id": active_job["_id"]},
+                {"$set": {"status": "failed", "error": "Job stopped making progress", "finished_at": get_ist_time()}}
+            )
+
+        started_by = request.current_user.get('username')
+        job = {
+            "project_id": project_id,
+            "status": "queued",
+            "total_sentences": 0,
+            "processed_sentences": 0,
+            "tags_created": 0,
+            "started_by": started_by,
+            "started_at": get_ist_time(),
+            "updated_at": get_ist_time()
+        }
+        job_id = auto_annotation_jobs_collection.insert_one(job).inserted_id
+
+        threading.Thread(target=run_auto_annotation_job, args=(job_id, project_id), daemon=True).start()
+        log_action_and_update_report(started_by, f"Started auto-annotation for project '{project.get('name')}'")
+
+        job["_id"] = job_id
         return jsonify({
-            "input_text": text_content,
-            "recommendations": recommendations[:10],  # Top 10 recommendations
-            "total_matches_found": len(recommendations)
-        }), 200
-        
+            "message": "Auto-annotation started",
+            "job": serialize_auto_annotation_job(job)
+        }), 202
+
     except Exception as e:
-        print(f"Error generating text tag recommendations: {e}")
+        print(f"Error starting auto-annotation: {e}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+@app.route("/api/projects/<project_id>/auto-annotate", methods=["GET"])
+@token_required
+def get_auto_annotation_status(project_id):
+    """Progress of the latest auto-annotation job of a project, or of ?job_id=..."""
+    try:
+        job_id = request.args.get('job_id')
+        if job_id:
+            job = auto_annotation_jobs_collection.find_one({"_id": ObjectId(job_id), "project_id": project_id})
+        else:
+            job = auto_annotation_jobs_collection.find_one({"project_id": project_id}, sort=[("started_at", -1)])
+        if not job:
+            return jsonify({"error": "No auto-annotation job found"}), 404
+
+        return jsonify(serialize_auto_annotation_job(job)), 200
 
+    except Exception as e:
+        print(f"Error fetching auto-annotation status: {e}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
 @app.route("/api/recommendation-stats", methods=["GET"])
 def get_recommendation_stats():
     """
     Get statistics about the tag recommendation database.
+    Served from counters kept in the phrase index rather than aggregating the tags collection.
     """
     try:
-        # Count total annotated phrases
-        total_phrases = tags_collection.distinct("text")
-        
-        # Count by tag type
-        pipeline = [
-            {"$group": {
-                "_id": "$tag",
-                "count": {"$sum": 1},
-                "unique_phrases": {"$addToSet": "$text"}
-            }},
-            {"$project": {
-                "tag_type": "$_id",
-                "total_annotations": "$count",
-                "unique_phrases_count": {"$size": "$unique_phrases"},
-                "_id": 0
-            }}
-        ]
-        
-        tag_stats = list(tags_collection.aggregate(pipeline))
-        
-        # Get most common phrases
-        common_phrases_pipeline = [
-            {"$group": {
-                "_id": "$text",
-                "occurrence_count": {"$sum": 1},
-                "different_tags": {"$addToSet": "$tag"}
-            }},
-            {"$project": {
-                "phrase": "$_id",
-                "occurrence_count": 1,
-                "tag_variety_count": {"$size": "$different_tags"},
-                "_id": 0
-            }},
-            {"$sort": {"occurrence_count": -1}},
-            {"$limit": 20}
-        ]
-        
-        common_phrases = list(tags_collection.aggregate(common_phrases_pipeline))
-        
-        return jsonify({
-            "total_annotated_phrases": len(total_phrases),
-            "tag_statistics": tag_stats,
-            "most_common_phrases": common_phrases
-        }), 200
+        return jsonify(phrase_index.summary(top_n=20)), 200
         
     except Exception as e:
         print(f"Error fetching recommendation stats: {e}")
@@ -3430,9 +5703,12 @@ def create_project():
 
         # Insert all tags directly into tags_collection (not staged_tags_collection)
         if tags_to_insert:
+            for tag_doc in tags_to_insert:
+                tag_doc.update(tag_scope(project_id, language or "Unknown"))
             tags_collection.insert_many(tags_to_insert)
             # Also insert into search_tags_collection for search functionality
             search_tags_collection.insert_many(tags_to_insert)
+            record_tag_changes(tags_to_insert, 1)
             print(f"DEBUG: Inserted {len(tags_to_insert)} pre-annotated tags directly into tags_collection")
 
         log_action_and_update_report(admin_username, f'Created project "{project_name}" and assigned {len(project_tasks_data)} sentences to {assigned_user}')
@@ -3619,8 +5895,11 @@ def create_project_standalone_flask():
     
     # Final steps (Bulk insert tags and update project count)
     if tags_to_insert:
+        for tag_doc in tags_to_insert:
+            tag_doc.update(tag_scope(new_project_id, data.get('language', 'Unknown')))
         tags_collection.insert_many(tags_to_insert)
         search_tags_collection.insert_many(tags_to_insert)
+        record_tag_changes(tags_to_insert, 1)
 
     projects_collection.update_one(
         {"_id": ObjectId(new_project_id)},
@@ -3824,6 +6103,7 @@ def assign_user_to_project(project_id):
                                 # Duplicate tag and link it to the new sentence ID and new username
                                 tags_to_insert.append({
                                     **tag_template,
+                                    **tag_scope(project_id, project.get("language", "Unknown")),
                                     'source_sentence_id': new_sentence_id,
                                     'username': user_to_assign, # Set the correct NEW username
                                     'annotation_date': get_ist_time()
@@ -3833,6 +6113,7 @@ def assign_user_to_project(project_id):
             # Perform bulk insertion of all new tags after sentence creation
             tags_collection.insert_many(tags_to_insert)
             search_tags_collection.insert_many(tags_to_insert)
+            record_tag_changes(tags_to_insert, 1)
 
         log_action_and_update_report(admin_username, f'Assigned project "{project["name"]}" to {len(new_users)} users. Reflected existing pool progress.')
         return jsonify({"message": f"Successfully assigned {len(new_users)} user(s) with {inserted_count} new tasks and tags."}), 201
@@ -4222,21 +6503,24 @@ def delete_project(project_id):
 
         project_string_id = str(project["_id"])
 
-        # 1️⃣ Find all sentence IDs for this project
-        sentences_to_delete = list(sentences_collection.find(
-            {"project_id": project_string_id}, {"_id": 1}
+        # 1️⃣ Delete associated tags (tags not yet backfilled with project_id are matched by sentence)
+        sentence_ids = [str(sentence["_id"]) for sentence in sentences_collection.find({"project_id": project_string_id}, {"_id": 1})]
+        project_tags_filter = {"$or": [
+            {"project_id": project_string_id},
+            {"project_id": {"$exists": False}, "source_sentence_id": {"$in": sentence_ids}}
+        ]}
+        deleted_tags = list(tags_collection.find(
+            project_tags_filter,
+            {"text": 1, "tag": 1, "username": 1, "annotation_date": 1, "project_id": 1, "language": 1}
         ))
-        sentence_ids = [str(s["_id"]) for s in sentences_to_delete]
-
-        # 2️⃣ Delete associated tags
-        if sentence_ids:
-            tags_collection.delete_many({"source_sentence_id": {"$in": sentence_ids}})
-            search_tags_collection.delete_many({"source_sentence_id": {"$in": sentence_ids}})
+        tags_collection.delete_many(project_tags_filter)
+        search_tags_collection.delete_many(project_tags_filter)
+        record_tag_changes(deleted_tags, -1)
 
-        # 3️⃣ Delete all sentences for this project
+        # 2️⃣ Delete all sentences for this project
         sentences_collection.delete_many({"project_id": project_string_id})
 
-        # 4️⃣ Delete the project itself
+        # 3️⃣ Delete the project itself
         projects_collection.delete_one({"_id": project_oid})
 
         return jsonify({"message": f"Project '{project['name']}' and related data deleted successfully."}), 200
@@ -4274,6 +6558,12 @@ def update_project(project_id):
                 {"_id": ObjectId(project_id)},
                 {"$set": update_fields}
             )
+        if "language" in update_fields and update_fields["language"] != project.get("language"):
+            # Tags carry their project's language; the project's rollup rows are keyed by it, so they are recounted
+            for collection in (tags_collection, staged_tags_collection, search_tags_collection):
+                collection.update_many({"project_id": project_id}, {"$set": {"language": update_fields["language"]}})
+            reconcile_analytics_rollups(project_id=project_id)
+            tag_columns.invalidate()
 
         # Handle user reassignment if provided
         new_users = data.get("assigned_users", [])
@@ -4333,8 +6623,13 @@ def update_project(project_id):
                 })
                 
                 if sentence_ids:
+                    deleted_tags = list(tags_collection.find(
+                        {"source_sentence_id": {"$in": sentence_ids}},
+                        {"text": 1, "tag": 1, "username": 1, "annotation_date": 1, "project_id": 1, "language": 1}
+                    ))
                     tags_collection.delete_many({"source_sentence_id": {"$in": sentence_ids}})
                     search_tags_collection.delete_many({"source_sentence_id": {"$in": sentence_ids}})
+                    record_tag_changes(deleted_tags, -1)
 
         # Log the action
         log_action_and_update_report(
@@ -4489,43 +6784,90 @@ def get_project_sentences(project_id):
         traceback.print_exc()
         return jsonify({"error": f"Internal server error while fetching sentences: {str(e)}"}), 500
           
+def parse_ist_date(value):
+    """A 'YYYY-MM-DD' query parameter as the stored (UTC) date its IST day starts at"""
+    return as_stored_utc(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=ZoneInfo("Asia/Kolkata")))
+
+
+def encode_activity_logs_cursor(session_doc):
+    position = json.dumps([session_doc['loginTime'].isoformat(), session_doc['_id']])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_activity_logs_cursor(cursor):
+    try:
+        login_time, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(login_time), session_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
 @app.route('/api/activity-logs/<username>', methods=["GET"])
 def get_activity_logs(username):
-    """Fetches activity history for the given username (admin required)."""
+    """
+    Fetches one page of session history, newest first (admin required).
+    Optional query parameters: target_user, start/end (YYYY-MM-DD, inclusive IST days),
+    limit, and cursor (the next_cursor of the previous page). Filtering, sorting and
+    paging all run in MongoDB on the user_sessions loginTime indexes. The first page
+    also carries total, the number of sessions matching the filters: always when
+    unfiltered, and with filters only for with_total=1 (null otherwise).
+    """
     try:
         # Authorization check - the requesting user must be admin
         requesting_user = users_collection.find_one({"username": username})
         if not requesting_user or requesting_user.get("role") != "admin":
             return jsonify({"message": "Unauthorized access"}), 403
 
-        # Get target username from query parameter (if provided)
+        query = {}
         target_username = request.args.get('target_user')
-        
-        all_history = []
-        
         if target_username:
-            # Fetch logs for specific user
-            user_doc = user_session_history_collection.find_one({"username": target_username})
-            if user_doc:
-                for session in user_doc.get('sessions', []):
-                    all_history.append({
-                        "id": f"{user_doc['username']}_{session.get('loginTimeIST', '')}",
-                        "username": user_doc['username'],
-                        **session
-                    })
-        else:
-            # Fetch logs for ALL users (current behavior)
-            for user_doc in user_session_history_collection.find():
-                for session in user_doc.get('sessions', []):
-                    all_history.append({
-                        "id": f"{user_doc['username']}_{session.get('loginTimeIST', '')}",
-                        "username": user_doc['username'],
-                        **session
-                    })
+            query['username'] = target_username
+
+        try:
+            start_date = request.args.get('start')
+            end_date = request.args.get('end')
+            if start_date or end_date:
+                query['loginTime'] = {}
+                if start_date:
+                    query['loginTime']['$gte'] = parse_ist_date(start_date)
+                if end_date:
+                    query['loginTime']['$lt'] = parse_ist_date(end_date) + timedelta(days=1)
+
+            limit = int(request.args.get('limit', app.config['ACTIVITY_LOGS_PAGE_SIZE']))
+            limit = max(1, min(limit, app.config['ACTIVITY_LOGS_MAX_PAGE_SIZE']))
+
+            # Sessions matching the filters across all pages, on the first page: the collection's
+            # metadata count when unfiltered, an index count only when asked for with with_total=1
+            cursor = request.args.get('cursor')
+            total = None
+            if not cursor:
+                if not query:
+                    total = user_sessions_collection.estimated_document_count()
+                elif request.args.get('with_total') == '1':
+                    total = user_sessions_collection.count_documents(query)
+            if cursor:
+                # Keyset pagination: continue strictly after the last (loginTime, _id) served
+                login_time, session_id = decode_activity_logs_cursor(cursor)
+                query['$or'] = [
+                    {'loginTime': {'$lt': login_time}},
+                    {'loginTime': login_time, '_id': {'$lt': session_id}}
+                ]
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        session_docs = list(
+            user_sessions_collection.find(query).sort([('loginTime', -1), ('_id', -1)]).limit(limit + 1)
+        )
+        has_more = len(session_docs) > limit
+        session_docs = session_docs[:limit]
+
+        sessions = [serialize_session(native_session({"id": doc["_id"], **doc})) for doc in session_docs]
 
-        # Sort by login time, descending
-        all_history.sort(key=lambda x: datetime.strptime(x['loginTimeIST'], '%d/%m/%Y, %H:%M:%S') if x['loginTimeIST'] else datetime.min, reverse=True)
-        return jsonify(all_history)
+        return jsonify({
+            "sessions": sessions,
+            "next_cursor": encode_activity_logs_cursor(session_docs[-1]) if has_more else None,
+            "total": total
+        })
         
     except Exception as e:
         print(f"Error fetching activity logs: {e}")
@@ -4535,9 +6877,10 @@ def get_activity_logs(username):
 @app.route('/sentences/<sentence_id>/tags/<tag_id>', methods=['DELETE'])
 def remove_tag_from_sentence(sentence_id, tag_id):
     try:
-        result = tags_collection.delete_one({"_id": ObjectId(tag_id)})
-        if result.deleted_count == 0:
+        deleted_tag = tags_collection.find_one_and_delete({"_id": ObjectId(tag_id)})
+        if not deleted_tag:
             return jsonify({"error": "Tag not found"}), 404
+        record_tag_changes([deleted_tag], -1)
 
         sentence = sentences_collection.find_one({"_id": ObjectId(sentence_id)})
         if sentence:
@@ -4571,10 +6914,11 @@ def remove_any_tag(tag_id):
             return jsonify({"message": "Staged tag removed successfully"}), 200
         
         # If not found in staged, try approved tags
-        approved_result = tags_collection.delete_one({"_id": ObjectId(tag_id)})
-        if approved_result.deleted_count > 0:
+        approved_tag = tags_collection.find_one_and_delete({"_id": ObjectId(tag_id)})
+        if approved_tag:
             # Also delete from search_tags
             search_tags_collection.delete_one({"_id": ObjectId(tag_id)})
+            record_tag_changes([approved_tag], -1)
             return jsonify({"message": "Approved tag removed successfully"}), 200
         
         return jsonify({"message": "Tag not found"}), 404
@@ -4615,7 +6959,8 @@ def add_or_update_tag():
             'username': username,
             'text': text,
             'annotation_date': datetime.now(IST),
-            'status': 'Staged/Pending Review' 
+            'status': 'Staged/Pending Review',
+            **sentence_tag_scope(sentence_id)
         }
 
         if existing_tag:
@@ -4677,6 +7022,72 @@ def get_staged_tags_for_review(sentence_id):
         print(f"Error fetching staged tags for review: {e}")
         return jsonify({"error": "Internal server error during tag retrieval."}), 500
 
+def promote_staged_tags(query, review_fields, session=None):
+    """
+    Moves the staged tags matching query into the final tags collection as approved tags,
+    with review_fields(staged_tag) giving their review_comments/reviewed_by/reviewed_at.
+    The final tag keeps the staged tag's _id, so the move is idempotent: a retried or
+    concurrent promotion upserts the same documents instead of duplicating them.
+    One find, one bulk_write and one delete_many; returns the final tags this call created,
+    so a promotion that only matched an existing final tag is not counted twice.
+    """
+    staged_tags = list(staged_tags_collection.find(query, session=session))
+    final_tags = [{
+        '_id': tag['_id'],
+        'tag': tag.get('tag'),
+        'source_sentence_id': tag.get('source_sentence_id'),
+        'username': tag.get('username'),
+        'text': tag.get('text'),
+        'annotation_date': tag.get('annotation_date'),
+        **tag_scope(tag.get('project_id'), tag.get('language')),
+        'review_status': 'Approved',
+        **review_fields(tag)
+    } for tag in staged_tags]
+    if not final_tags:
+        return []
+    result = tags_collection.bulk_write(
+        [ReplaceOne({'_id': tag['_id']}, tag, upsert=True) for tag in final_tags], ordered=False, session=session
+    )
+    staged_tags_collection.delete_many({'_id': {'$in': [tag['_id'] for tag in final_tags]}}, session=session)
+    return [final_tags[index] for index in sorted(result.upserted_ids)]
+
+
+def demote_final_tags(query, reviewer_username, staged_fields, session=None):
+    """
+    Moves the final tags matching query back to staging (undoing promote_staged_tags), keeping
+    their _ids and recording the undone review under previous_review; staged_fields are set on
+    every staged copy. One find, one bulk_write and one delete_many; returns the final tags
+    whose staged copy this call created, so a repeated demotion is not counted twice.
+    """
+    final_tags = list(tags_collection.find(query, session=session))
+    undone_at = get_ist_time()
+    staged_tags = [{
+        '_id': tag['_id'],
+        'tag': tag.get('tag'),
+        'source_sentence_id': tag.get('source_sentence_id'),
+        'username': tag.get('username'),
+        'text': tag.get('text'),
+        'annotation_date': tag.get('annotation_date'),
+        **tag_scope(tag.get('project_id'), tag.get('language')),
+        **staged_fields,
+        'previous_review': {
+            'was_approved': True,
+            'reviewed_by': tag.get('reviewed_by'),
+            'reviewed_at': tag.get('reviewed_at'),
+            'review_comments': tag.get('review_comments', ''),
+            'undone_by': reviewer_username,
+            'undone_at': undone_at
+        }
+    } for tag in final_tags]
+    if not staged_tags:
+        return []
+    result = staged_tags_collection.bulk_write(
+        [ReplaceOne({'_id': tag['_id']}, tag, upsert=True) for tag in staged_tags], ordered=False, session=session
+    )
+    tags_collection.delete_many({'_id': {'$in': [tag['_id'] for tag in final_tags]}}, session=session)
+    return [final_tags[index] for index in sorted(result.upserted_ids)]
+
+
 @app.route('/reviewer/tag/<tag_id>/approve', methods=['PUT'])
 def approve_tag(tag_id):
     try:
@@ -4690,33 +7101,30 @@ def approve_tag(tag_id):
         sentence_id = staged_tag.get('source_sentence_id')
         annotator_username = staged_tag.get('username')
         
-        # Create final tag with updated status
-        final_tag = {
-            'tag': staged_tag.get('tag'),
-            'source_sentence_id': staged_tag.get('source_sentence_id'),
-            'username': staged_tag.get('username'),
-            'text': staged_tag.get('text'),
-            'annotation_date': staged_tag.get('annotation_date'),
-            'review_status': 'Approved',  
-            'review_comments': data.get('comments', ''),
-            'reviewed_by': reviewer_username,
-            'reviewed_at': get_ist_time()
-        }
-        
-        # Insert into final collections
-        tags_collection.insert_one(final_tag)
-
-        # Remove from staged collection
-        staged_tags_collection.delete_one({"_id": ObjectId(tag_id)})
+        # Move to the final collection with the approval details
+        reviewed_at = get_ist_time()
+        final_tags = run_in_transaction(lambda session: promote_staged_tags(
+            {"_id": ObjectId(tag_id)},
+            lambda tag: {
+                'review_comments': data.get('comments', ''),
+                'reviewed_by': reviewer_username,
+                'reviewed_at': reviewed_at
+            },
+            session
+        ))
+        if not final_tags:
+            return jsonify({"message": "Staged tag not found or already reviewed."}), 404
+        final_tag = final_tags[0]
+        record_tag_changes(final_tags, 1)
         
         # Update sentence review status
         update_sentence_review_status(sentence_id)
         
         # Log the action for BOTH reviewer and annotator
-        log_action_and_update_report(reviewer_username, 
-                                   f"Approved tag '{final_tag.get('text')}' by {annotator_username}.")
-        log_action_and_update_report(annotator_username, 
-                                   f"Tag '{final_tag.get('text')}' was approved by reviewer {reviewer_username}.")
+        log_review_event(
+            reviewer_username, f"Approved tag '{final_tag.get('text')}' by {annotator_username}.",
+            annotator_username, f"Tag '{final_tag.get('text')}' was approved by reviewer {reviewer_username}."
+        )
 
         return jsonify({"message": "Tag approved and finalized successfully."}), 200
     except Exception as e:
@@ -4738,39 +7146,21 @@ def undo_tag_approval(tag_id):
         sentence_id = approved_tag.get('source_sentence_id')
         annotator_username = approved_tag.get('username')
         
-        # Create staged tag from the approved tag data
-        staged_tag = {
-            'tag': approved_tag.get('tag'),
-            'source_sentence_id': approved_tag.get('source_sentence_id'),
-            'username': approved_tag.get('username'),
-            'text': approved_tag.get('text'),
-            'annotation_date': approved_tag.get('annotation_date'),
-            'status': 'Staged/Pending Review',
-            'previous_review': {
-                'was_approved': True,
-                'reviewed_by': approved_tag.get('reviewed_by'),
-                'reviewed_at': approved_tag.get('reviewed_at'),
-                'review_comments': approved_tag.get('review_comments', ''),
-                'undone_by': reviewer_username,
-                'undone_at': get_ist_time()
-            }
-        }
-        
-        # Insert back to staged collection
-        staged_tags_collection.insert_one(staged_tag)
-        
-        # Remove from final collections
-        tags_collection.delete_one({"_id": ObjectId(tag_id)})
+        # Move back to the staged collection
+        demoted_tags = run_in_transaction(lambda session: demote_final_tags(
+            {"_id": ObjectId(tag_id)}, reviewer_username, {'status': 'Staged/Pending Review'}, session
+        ))
+        record_tag_changes(demoted_tags, -1)
         search_tags_collection.delete_one({"_id": ObjectId(tag_id)})
         
         # Update sentence review status
         update_sentence_review_status(sentence_id)
         
         # Log the action for BOTH reviewer and annotator
-        log_action_and_update_report(reviewer_username, 
-                                   f"Undid approval of tag '{approved_tag.get('text')}' by {annotator_username}.")
-        log_action_and_update_report(annotator_username, 
-                                   f"Tag '{approved_tag.get('text')}' approval was undone by reviewer {reviewer_username}.")
+        log_review_event(
+            reviewer_username, f"Undid approval of tag '{approved_tag.get('text')}' by {annotator_username}.",
+            annotator_username, f"Tag '{approved_tag.get('text')}' approval was undone by reviewer {reviewer_username}."
+        )
 
         return jsonify({"message": "Tag approval undone successfully. Tag moved back to staging."}), 200
         
@@ -4808,10 +7198,10 @@ def undo_tag_rejection(tag_id):
         update_sentence_review_status(sentence_id)
         
         # Log the action for BOTH reviewer and annotator
-        log_action_and_update_report(reviewer_username, 
-                                   f"Undid rejection of tag '{rejected_tag.get('text')}' by {annotator_username}.")
-        log_action_and_update_report(annotator_username, 
-                                   f"Tag '{rejected_tag.get('text')}' rejection was undone by reviewer {reviewer_username}.")
+        log_review_event(
+            reviewer_username, f"Undid rejection of tag '{rejected_tag.get('text')}' by {annotator_username}.",
+            annotator_username, f"Tag '{rejected_tag.get('text')}' rejection was undone by reviewer {reviewer_username}."
+        )
 
         return jsonify({"message": "Tag rejection undone successfully. Tag moved back to pending."}), 200
         
@@ -4857,16 +7247,17 @@ def reject_tag(tag_id):
         }
         
         # Insert into final collections
-        tags_collection.delete_one(final_tag)
+        if tags_collection.delete_one(final_tag).deleted_count:
+            record_tag_changes([final_tag], -1)
         
         # Update sentence status
         update_sentence_review_status(sentence_id)
         
         # Log the action for BOTH reviewer and annotator
-        log_action_and_update_report(reviewer_username, 
-                                   f"Rejected tag '{staged_tag.get('text')}' by {annotator_username}.")
-        log_action_and_update_report(annotator_username, 
-                                   f"Tag '{staged_tag.get('text')}' was rejected by reviewer {reviewer_username}.")
+        log_review_event(
+            reviewer_username, f"Rejected tag '{staged_tag.get('text')}' by {annotator_username}.",
+            annotator_username, f"Tag '{staged_tag.get('text')}' was rejected by reviewer {reviewer_username}."
+        )
 
         return jsonify({"message": "Tag rejected successfully."}), 200
     except Exception as e:
@@ -4895,57 +7286,41 @@ def approve_sentence(sentence_id):
         
         print(f"DEBUG: Approving sentence {sentence_id} by reviewer {reviewer_username}")
         
-        # Get all pending tags for this sentence
-        pending_tags = list(staged_tags_collection.find({
-            "source_sentence_id": sentence_id,
-            "review_status": "Pending"
-        }))
-        
-        # Auto-approve all pending tags
-        approved_count = 0
-        for tag in pending_tags:
-            # Create final tag
-            final_tag = {
-                'tag': tag.get('tag'),
-                'source_sentence_id': tag.get('source_sentence_id'),
-                'username': tag.get('username'),
-                'text': tag.get('text'),
-                'annotation_date': tag.get('annotation_date'),
-                'review_status': 'Approved',
-                'review_comments': f"Auto-approved with sentence approval: {comments}",
-                'reviewed_by': reviewer_username,
-                'reviewed_at': get_ist_time()
-            }
-            
-            # Insert into final collection
-            tags_collection.insert_one(final_tag)
-            
-            # Remove from staged collection
-            staged_tags_collection.delete_one({"_id": tag["_id"]})
-            approved_count += 1
-        
-        # CRITICAL: Update sentence with ALL required fields
-        update_result = sentences_collection.update_one(
-            {"_id": ObjectId(sentence_id)},
-            {"$set": {
-                "review_status": "Approved",
-                "review_comments": comments,
-                "reviewed_by": reviewer_username,  # This is essential
-                "reviewed_at": get_ist_time(),
-                "is_annotated": True
-            }}
-        )
-        
-        print(f"DEBUG: Sentence update result - matched: {update_result.matched_count}, modified: {update_result.modified_count}")
+        reviewed_at = get_ist_time()
+
+        def approve(session):
+            # Auto-approve all pending tags, then mark the sentence approved, atomically
+            final_tags = promote_staged_tags(
+                {"source_sentence_id": sentence_id, "review_status": "Pending"},
+                lambda tag: {
+                    'review_comments': f"Auto-approved with sentence approval: {comments}",
+                    'reviewed_by': reviewer_username,
+                    'reviewed_at': reviewed_at
+                },
+                session
+            )
+            # CRITICAL: Update sentence with ALL required fields
+            sentences_collection.update_one(
+                {"_id": ObjectId(sentence_id)},
+                {"$set": {
+                    "review_status": "Approved",
+                    "review_comments": comments,
+                    "reviewed_by": reviewer_username,  # This is essential
+                    "reviewed_at": reviewed_at,
+                    "is_annotated": True
+                }},
+                session=session
+            )
+            return final_tags
+
+        final_tags = run_in_transaction(approve)
+        record_tag_changes(final_tags, 1)
+        approved_count = len(final_tags)
         
-        # Log the action
-        log_action_and_update_report(
-            reviewer_username, 
-            f"Approved entire sentence and {approved_count} tags by {annotator_username}"
-        )
-        log_action_and_update_report(
-            annotator_username,
-            f"Sentence with {approved_count} tags was approved by reviewer {reviewer_username}"
+        # Log the action for BOTH reviewer and annotator
+        log_review_event(
+            reviewer_username, f"Approved entire sentence and {approved_count} tags by {annotator_username}",
+            annotator_username, f"Sentence with {approved_count} tags was approved by reviewer {reviewer_username}"
         )
         
         return jsonify({
@@ -5012,14 +7387,10 @@ def reject_sentence(sentence_id):
             }}
         )
         
-        # Log the action
-        log_action_and_update_report(
-            reviewer_username, 
-            f"Rejected entire sentence and {rejected_count} tags by {annotator_username}. Reason: {comments}"
-        )
-        log_action_and_update_report(
-            annotator_username,
-            f"Sentence with {rejected_count} tags was rejected by reviewer {reviewer_username}. Reason: {comments}"
+        # Log the action for BOTH reviewer and annotator
+        log_review_event(
+            reviewer_username, f"Rejected entire sentence and {rejected_count} tags by {annotator_username}. Reason: {comments}",
+            annotator_username, f"Sentence with {rejected_count} tags was rejected by reviewer {reviewer_username}. Reason: {comments}"
         )
         
         return jsonify({
@@ -5031,6 +7402,170 @@ def reject_sentence(sentence_id):
         print(f"Error rejecting sentence: {e}")
         return jsonify({"error": "Internal server error during sentence rejection"}), 500
 
+@app.route('/reviewer/sentences/bulk-review', methods=['POST'])
+def bulk_review_sentences():
+    """
+    Approves or rejects many sentences in one request, with the same effect per sentence as
+    the single-sentence approve/reject routes.
+    Body: {"reviewerUsername", "comments" (default for items), "items": [{"sentence_id", "action": "approve"|"reject", "comments"}]}
+    All reviews are applied with a few bulk writes in one transaction; the response has one
+    result per item, in request order.
+    """
+    try:
+        data = request.json or {}
+        reviewer_username = data.get('reviewerUsername')
+        default_comments = data.get('comments', '')
+        items = data.get('items')
+
+        if not reviewer_username:
+            return jsonify({"message": "Reviewer username is required"}), 400
+        if not isinstance(items, list) or not items:
+            return jsonify({"message": "items must be a non-empty list"}), 400
+        if len(items) > app.config['REVIEW_BULK_MAX_ITEMS']:
+            return jsonify({"message": f"At most {app.config['REVIEW_BULK_MAX_ITEMS']} sentences can be reviewed per request"}), 400
+
+        results = [None] * len(items)
+        reviews = {}  # sentence_id -> (index, action, comments)
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            sentence_id = str(item.get('sentence_id', ''))
+            action = item.get('action')
+            comments = item.get('comments', default_comments) or ''
+            if not ObjectId.is_valid(sentence_id):
+                message = "Invalid sentence id"
+            elif action not in ('approve', 'reject'):
+                message = "action must be 'approve' or 'reject'"
+            elif not isinstance(comments, str):
+                message = "comments must be a string"
+            elif action == 'reject' and not comments.strip():
+                message = "Comments are required to reject a sentence"
+            elif sentence_id in reviews:
+                message = "Sentence appears more than once in this request"
+            else:
+                reviews[sentence_id] = (index, action, comments)
+                continue
+            results[index] = {"sentence_id": sentence_id, "status": "error", "message": message}
+
+        sentences = {
+            str(sentence['_id']): sentence
+            for sentence in sentences_collection.find({"_id": {"$in": [ObjectId(i) for i in reviews]}}, {"username": 1})
+        }
+        for sentence_id in [i for i in reviews if i not in sentences]:
+            index = reviews.pop(sentence_id)[0]
+            results[index] = {"sentence_id": sentence_id, "status": "error", "message": "Sentence not found"}
+
+        reviewed_at = get_ist_time()
+        approval_comments = {}
+        rejection_comments = {}
+        sentence_updates = []
+        for sentence_id, (index, action, comments) in reviews.items():
+            if action == 'approve':
+                approval_comments[sentence_id] = comments
+                sentence_updates.append(UpdateOne(
+                    {"_id": ObjectId(sentence_id)},
+                    {"$set": {
+                        "review_status": "Approved",
+                        "review_comments": comments,
+                        "reviewed_by": reviewer_username,
+                        "reviewed_at": reviewed_at,
+                        "is_annotated": True
+                    }}
+                ))
+            else:
+                rejection_comments[sentence_id] = comments
+                sentence_updates.append(UpdateOne(
+                    {"_id": ObjectId(sentence_id)},
+                    {"$set": {
+                        "review_status": "Rejected",
+                        "review_comments": comments,
+                        "reviewed_by": reviewer_username,
+                        "reviewed_at": reviewed_at
+                    }}
+                ))
+
+        # Tags are selected inside the transaction, so the counts reflect what this request actually moved
+        def apply_reviews(session):
+            final_tags = []
+            if approval_comments:
+                final_tags = promote_staged_tags(
+                    {"source_sentence_id": {"$in": list(approval_comments)}, "review_status": "Pending"},
+                    lambda tag: {
+                        'review_comments': f"Auto-approved with sentence approval: {approval_comments[tag['source_sentence_id']]}",
+                        'reviewed_by': reviewer_username,
+                        'reviewed_at': reviewed_at
+                    },
+                    session
+                )
+            rejected_tag_ids = {}
+            if rejection_comments:
+                for tag in staged_tags_collection.find(
+                    {"source_sentence_id": {"$in": list(rejection_comments)}, "review_status": "Pending"},
+                    {"source_sentence_id": 1},
+                    session=session
+                ):
+                    rejected_tag_ids.setdefault(tag['source_sentence_id'], []).append(tag['_id'])
+            if rejected_tag_ids:
+                staged_tags_collection.bulk_write([
+                    UpdateMany(
+                        {"_id": {"$in": tag_ids}, "review_status": "Pending"},
+                        {"$set": {
+                            "review_status": "Rejected",
+                            "review_comments": f"Auto-rejected with sentence rejection: {rejection_comments[sentence_id]}",
+                            "reviewed_by": reviewer_username,
+                            "reviewed_at": reviewed_at
+                        }}
+                    )
+                    for sentence_id, tag_ids in rejected_tag_ids.items()
+                ], ordered=False, session=session)
+            sentences_collection.bulk_write(sentence_updates, ordered=False, session=session)
+            return final_tags, {sentence_id: len(tag_ids) for sentence_id, tag_ids in rejected_tag_ids.items()}
+
+        tags_counts = {}
+        if sentence_updates:
+            final_tags, tags_counts = run_in_transaction(apply_reviews)
+            record_tag_changes(final_tags, 1)
+            for tag in final_tags:
+                tags_counts[tag['source_sentence_id']] = tags_counts.get(tag['source_sentence_id'], 0) + 1
+            # Sentences whose tags the reviews moved get their status from the tag tallies, as per-tag reviews do
+            try:
+                update_sentence_review_statuses(tags_counts)
+            except Exception as e:
+                print(f"Error updating sentence statuses: {e}")
+
+        for sentence_id, (index, action, comments) in reviews.items():
+            results[index] = {
+                "sentence_id": sentence_id,
+                "status": "approved" if action == 'approve' else "rejected",
+                "tags_count": tags_counts.get(sentence_id, 0)
+            }
+
+        for sentence_id, (index, action, comments) in reviews.items():
+            annotator_username = sentences[sentence_id].get('username')
+            tags_count = results[index]["tags_count"]
+            if action == 'approve':
+                log_review_event(
+                    reviewer_username, f"Approved entire sentence and {tags_count} tags by {annotator_username}",
+                    annotator_username, f"Sentence with {tags_count} tags was approved by reviewer {reviewer_username}"
+                )
+            else:
+                log_review_event(
+                    reviewer_username, f"Rejected entire sentence and {tags_count} tags by {annotator_username}. Reason: {comments}",
+                    annotator_username, f"Sentence with {tags_count} tags was rejected by reviewer {reviewer_username}. Reason: {comments}"
+                )
+
+        return jsonify({
+            "results": results,
+            "approved_count": sum(1 for result in results if result["status"] == "approved"),
+            "rejected_count": sum(1 for result in results if result["status"] == "rejected"),
+            "error_count": sum(1 for result in results if result["status"] == "error")
+        }), 200
+
+    except Exception as e:
+        print(f"Error in bulk sentence review: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error during bulk sentence review"}), 500
+
 @app.route('/reviewer/sentence/<sentence_id>/undo-review', methods=['POST'])
 def undo_sentence_review(sentence_id):
     """Undo sentence approval/rejection and reset all tags to pending"""
@@ -5049,78 +7584,47 @@ def undo_sentence_review(sentence_id):
         annotator_username = sentence.get('username')
         previous_status = sentence.get('review_status')
         
-        # Get all tags that were approved/rejected for this sentence
-        affected_tags = list(staged_tags_collection.find({
-            "source_sentence_id": sentence_id,
-            "review_status": {"$in": ["Approved", "Rejected"]}
-        }))
-        
-        # Reset all tags to pending
-        reset_count = 0
-        for tag in affected_tags:
-            staged_tags_collection.update_one(
-                {"_id": tag["_id"]},
+        def undo(session):
+            # Reset all reviewed staged tags of this sentence to pending
+            reset_result = staged_tags_collection.update_many(
+                {"source_sentence_id": sentence_id, "review_status": {"$in": ["Approved", "Rejected"]}},
                 {"$set": {
                     "review_status": "Pending",
                     "review_comments": "",
                     "reviewed_by": "",
                     "reviewed_at": None
-                }}
+                }},
+                session=session
             )
-            reset_count += 1
-        
-        # Also need to handle tags that were moved to final collection (for approved sentences)
-        if previous_status == "Approved":
-            # Find final tags for this sentence and move them back to staged
-            final_tags = list(tags_collection.find({
-                "source_sentence_id": sentence_id
-            }))
             
-            for tag in final_tags:
-                # Create staged tag from final tag
-                staged_tag = {
-                    'tag': tag.get('tag'),
-                    'source_sentence_id': tag.get('source_sentence_id'),
-                    'username': tag.get('username'),
-                    'text': tag.get('text'),
-                    'annotation_date': tag.get('annotation_date'),
-                    'review_status': 'Pending',
-                    'previous_review': {
-                        'was_approved': True,
-                        'reviewed_by': tag.get('reviewed_by'),
-                        'reviewed_at': tag.get('reviewed_at'),
-                        'review_comments': tag.get('review_comments', ''),
-                        'undone_by': reviewer_username,
-                        'undone_at': get_ist_time()
-                    }
-                }
-                
-                # Insert back to staged collection
-                staged_tags_collection.insert_one(staged_tag)
-                
-                # Remove from final collections
-                tags_collection.delete_one({"_id": tag["_id"]})
-                reset_count += 1
-        
-        # Reset sentence status
-        sentences_collection.update_one(
-            {"_id": ObjectId(sentence_id)},
-            {"$set": {
-                "review_status": "Pending",
-                "review_comments": "",
-                "reviewed_by": "",
-                "reviewed_at": None
-            }}
-        )
+            # Also need to handle tags that were moved to final collection (for approved sentences)
+            demoted_tags = []
+            if previous_status == "Approved":
+                demoted_tags = demote_final_tags(
+                    {"source_sentence_id": sentence_id}, reviewer_username, {'review_status': 'Pending'}, session
+                )
+            
+            # Reset sentence status
+            sentences_collection.update_one(
+                {"_id": ObjectId(sentence_id)},
+                {"$set": {
+                    "review_status": "Pending",
+                    "review_comments": "",
+                    "reviewed_by": "",
+                    "reviewed_at": None
+                }},
+                session=session
+            )
+            return reset_result.matched_count, demoted_tags
+
+        reset_count, demoted_tags = run_in_transaction(undo)
+        record_tag_changes(demoted_tags, -1)
+        reset_count += len(demoted_tags)
         
-        # Log the action
-        log_action_and_update_report(
-            reviewer_username, 
-            f"Undid {previous_status} status for sentence by {annotator_username}. Reset {reset_count} tags."
-        )
-        log_action_and_update_report(
-            annotator_username,
-            f"Sentence review was undone by reviewer {reviewer_username}. {reset_count} tags reset to pending."
+        # Log the action for BOTH reviewer and annotator
+        log_review_event(
+            reviewer_username, f"Undid {previous_status} status for sentence by {annotator_username}. Reset {reset_count} tags.",
+            annotator_username, f"Sentence review was undone by reviewer {reviewer_username}. {reset_count} tags reset to pending."
         )
         
         return jsonify({
@@ -5307,5 +7811,216 @@ def get_stats():
         return jsonify({"error": "Internal server error"}), 500
 
 
+# --- Data Migrations ---
+
+def migrate_activity_buckets():
+    """
+    Moves activities out of the legacy one-document-per-user format into day buckets.
+    Safe to re-run: bucket ids are derived from user/day/chunk, and a legacy document is
+    only deleted after all of its buckets have been written.
+    """
+    migrated_users = 0
+    migrated_activities = 0
+    for legacy_doc in user_activities_collection.find({'activities.0': {'$exists': True}}):
+        username = legacy_doc['username']
+        by_day = {}
+        for activity in sorted(legacy_doc['activities'], key=lambda x: x['timestamp']):
+            by_day.setdefault(activity_bucket_day(activity['timestamp']), []).append(activity)
+
+        operations = []
+        for day, activities in by_day.items():
+            for chunk_start in range(0, len(activities), ACTIVITY_BUCKET_MAX_EVENTS):
+                chunk = activities[chunk_start:chunk_start + ACTIVITY_BUCKET_MAX_EVENTS]
+                bucket_id = f"legacy:{username}:{day.strftime('%Y%m%d')}:{chunk_start // ACTIVITY_BUCKET_MAX_EVENTS}"
+                operations.append(ReplaceOne(
+                    {'_id': bucket_id},
+                    {'username': username, 'day': day, 'count': len(chunk), 'activities': chunk},
+                    upsert=True
+                ))
+        user_activity_buckets_collection.bulk_write(operations, ordered=False)
+        user_activities_collection.delete_one({'_id': legacy_doc['_id']})
+
+        migrated_users += 1
+        migrated_activities += len(legacy_doc['activities'])
+        print(f"Migrated {len(legacy_doc['activities'])} activities of '{username}' into {len(operations)} buckets.")
+
+    # Empty legacy documents carry nothing worth keeping
+    user_activities_collection.delete_many({'activities.0': {'$exists': False}})
+    return {"migrated_users": migrated_users, "migrated_activities": migrated_activities}
+
+
+def migrate_user_sessions():
+    """
+    Backfills user_sessions from the sessions listed in every user_session_history document.
+    Safe to re-run: each user's user_sessions documents are replaced by their current sessions.
+    """
+    migrated_users = 0
+    migrated_sessions = 0
+    for history in user_session_history_collection.find({}, {'username': 1, 'sessions': 1}):
+        sessions = [native_session(session, history['username']) for session in history.get('sessions', [])]
+        sessions = [session for session in sessions if session['loginTime']]
+        sync_user_sessions(history['username'], sessions)
+        migrated_users += 1
+        migrated_sessions += len(sessions)
+    return {"migrated_users": migrated_users, "migrated_sessions": migrated_sessions}
+
+
+def migrate_session_datetimes(batch_size=500):
+    """
+    Rewrites session records still carrying loginTimeIST/logoutTimeIST strings (in sessions and
+    current_session) with native loginTime/logoutTime dates, in bulk_write batches, and refreshes
+    the user_sessions copies of the converted users. Safe to re-run: converted records are skipped.
+    """
+    legacy_query = {'$or': [
+        {'sessions.loginTimeIST': {'$exists': True}},
+        {'current_session.loginTimeIST': {'$exists': True}}
+    ]}
+    converted_users = 0
+    converted_sessions = 0
+    operations = []
+    usernames = []
+
+    def flush():
+        if operations:
+            user_session_history_collection.bulk_write(operations, ordered=False)
+            for username, sessions in usernames:
+                sync_user_sessions(username, sessions)
+            operations.clear()
+            usernames.clear()
+
+    for history in user_session_history_collection.find(legacy_query, {'username': 1, 'sessions': 1, 'current_session': 1, 'history_version': 1}):
+        username = history['username']
+        sessions = [native_session(session, username) for session in history.get('sessions', [])]
+        sessions = sorted((session for session in sessions if session['loginTime']), key=lambda s: s['loginTime'], reverse=True)
+        current_session = history.get('current_session')
+        if current_session:
+            current_session = native_session(current_session, username)
+        version = history.get('history_version')
+        # A history written to meanwhile keeps its legacy records for the next run
+        operations.append(UpdateOne(
+            {'_id': history['_id'], 'history_version': version},
+            {'$set': {'sessions': sessions, 'current_session': current_session, 'history_version': (version or 0) + 1}}
+        ))
+        usernames.append((username, sessions))
+        converted_users += 1
+        converted_sessions += len(sessions)
+        if len(operations) >= batch_size:
+            flush()
+    flush()
+    return {"converted_users": converted_users, "converted_sessions": converted_sessions}
+
+
+def migrate_tag_project_fields(batch_size=1000):
+    """
+    Stamps tag_scope (project_id, language) on tags, staged_tags and search_tags documents
+    written before tags carried it. Works through each collection in batches: the batch's
+    sentences and projects are resolved with resolve_tag_projects, then one bulk_write sets
+    the fields per sentence. Safe to re-run: only documents without project_id are touched.
+    """
+    summary = {}
+    for collection in (tags_collection, staged_tags_collection, search_tags_collection):
+        updated = 0
+        unresolved = 0
+        batch = []
+
+        def flush():
+            nonlocal updated, unresolved
+            sentence_projects = resolve_tag_projects(batch)
+            operations = []
+            for sentence_id in {tag.get("source_sentence_id") for tag in batch}:
+                sentence_project = sentence_projects.get(sentence_id)
+                if not sentence_project:
+                    continue
+                project = sentence_project["project"] or {}
+                operations.append(UpdateMany(
+                    {"source_sentence_id": sentence_id, "project_id": {"$exists": False}},
+                    {"$set": tag_scope(sentence_project["sentence"].get("project_id"), project.get("language", "Unknown"))}
+                ))
+            if operations:
+                updated += collection.bulk_write(operations, ordered=False).modified_count
+            unresolved += sum(1 for tag in batch if tag.get("source_sentence_id") not in sentence_projects)
+            batch.clear()
+
+        for tag in collection.find({"project_id": {"$exists": False}}, {"source_sentence_id": 1}):
+            batch.append(tag)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        summary[collection.name] = {"updated": updated, "without_sentence": unresolved}
+    if summary[tags_collection.name]["updated"]:
+        # Rollup rows and tag columns of the backfilled tags were built without their project
+        summary["analytics_rollups"] = reconcile_analytics_rollups()
+        tag_columns.invalidate()
+    return summary
+
+
+def backfill_tag_project_fields():
+    """
+    Runs migrate_tag_project_fields when any tag document still lacks project_id, so project
+    and language filters see data written before tags carried tag_scope without an admin
+    having to trigger the migration. Started in the background at import.
+    """
+    try:
+        if any(
+            collection.find_one({"project_id": {"$exists": False}}, {"_id": 1})
+            for collection in (tags_collection, staged_tags_collection, search_tags_collection)
+        ):
+            print(f"Backfilled tag project fields: {migrate_tag_project_fields()}")
+    except Exception as e:
+        print(f"Error backfilling tag project fields: {e}")
+        traceback.print_exc()
+
+
+# Name -> migration function; each returns a JSON-serializable summary and is safe to re-run
+MIGRATIONS = {
+    "activity-buckets": migrate_activity_buckets,
+    "user-sessions": migrate_user_sessions,
+    "session-datetimes": migrate_session_datetimes,
+    "tag-project-fields": migrate_tag_project_fields,
+    "analytics-rollups": reconcile_analytics_rollups,
+}
+
+
+@app.route("/admin/activity-log/stats", methods=["GET"])
+@admin_required
+def get_activity_log_stats():
+    """Queue depth and write/drop counters of the background activity log writer"""
+    return jsonify(activity_log_pipeline.stats()), 200
+
+
+@app.route("/admin/migrations", methods=["GET"])
+@admin_required
+def list_migrations():
+    """Lists the data migrations that can be run"""
+    return jsonify([
+        {"name": name, "description": (migration.__doc__ or "").strip().split("\n")[0]}
+        for name, migration in MIGRATIONS.items()
+    ]), 200
+
+
+@app.route("/admin/migrations/<name>", methods=["POST"])
+@admin_required
+def run_migration(name):
+    """Runs a registered data migration"""
+    try:
+        migration = MIGRATIONS.get(name)
+        if not migration:
+            return jsonify({"error": f"Unknown migration '{name}'"}), 404
+
+        result = migration()
+        log_action_and_update_report(request.current_user.get('username'), f"Ran data migration '{name}'")
+        return jsonify({"migration": name, **result}), 200
+
+    except Exception as e:
+        print(f"Error running migration {name}: {e}")
+        traceback.print_exc()
+        return jsonify({"error": f"Migration failed: {str(e)}"}), 500
+
+
+ensure_indexes()
+threading.Thread(target=backfill_tag_project_fields, name="tag-project-backfill", daemon=True).start()
+
+
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -30,16 +30,37 @@ export default function UserLogbook() {
     const [usersList, setUsersList] = useState([]);
     const [selectedSession, setSelectedSession] = useState(null);
     const [detailDialogOpen, setDetailDialogOpen] = useState(false);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
+    const [appliedFilters, setAppliedFilters] = useState({ user: '', start: '', end: '' });
+    const [totalSessions, setTotalSessions] = useState(null);
+    const [isExporting, setIsExporting] = useState(false);
+
+    const PAGE_SIZE = 50;
+    const EXPORT_PAGE_SIZE = 500;
+
+    // Fetch one page of sessions; filtering and paging are done by the server
+    const fetchSessionsPage = (filters, cursor, limit = PAGE_SIZE, withTotal = false) => {
+        const params = new URLSearchParams({ limit });
+        if (filters.user) params.append('target_user', filters.user);
+        if (filters.start) params.append('start', filters.start);
+        if (filters.end) params.append('end', filters.end);
+        if (cursor) params.append('cursor', cursor);
+        // Filtered totals cost a count query, so the server only computes them on request
+        if (withTotal) params.append('with_total', '1');
+        return fetch(`http://127.0.0.1:5001/api/activity-logs/${username}?${params}`, {
+            headers: getAuthHeaders()
+        });
+    };
 
     // Fetch user sessions and statistics
     // In UserLogBook.js - Update the fetchUserLogs function
-const fetchUserLogs = async () => {
+const fetchUserLogs = async (filters = appliedFilters) => {
     setIsLoading(true);
+    setAppliedFilters(filters);
     try {
         const [sessionsResponse, usersResponse] = await Promise.all([
-            fetch(`http://127.0.0.1:5001/api/activity-logs/${username}`, {
-                headers: getAuthHeaders()
-            }),
+            fetchSessionsPage(filters, null, PAGE_SIZE, true),
             // Include ALL users (including reviewers) in the filter
             fetch('http://127.0.0.1:5001/api/users-list', {
                 headers: getAuthHeaders()
@@ -48,11 +69,13 @@ const fetchUserLogs = async () => {
 
         if (sessionsResponse.ok) {
             const sessionsData = await sessionsResponse.json();
-            setUserSessions(sessionsData);
-            setFilteredSessions(sessionsData);
+            setUserSessions(sessionsData.sessions);
+            setFilteredSessions(sessionsData.sessions);
+            setNextCursor(sessionsData.next_cursor);
+            setTotalSessions(sessionsData.total);
             
-            // Calculate user statistics
-            calculateUserStats(sessionsData);
+            // Calculate user statistics (over the sessions loaded so far)
+            calculateUserStats(sessionsData.sessions);
         }
 
         if (usersResponse.ok) {
@@ -238,45 +261,70 @@ const calculateUserStats = (sessions) => {
         }
     };
 
-    // Filter sessions based on selected criteria
-    const applyFilters = () => {
-        let filtered = userSessions;
-
-        if (selectedUser) {
-            filtered = filtered.filter(session => session.username === selectedUser);
-        }
-
-        if (dateRange.start) {
-            const startDate = new Date(dateRange.start);
-            filtered = filtered.filter(session => {
-                const sessionDate = parseISTDate(session.loginTimeIST);
-                return sessionDate >= startDate;
-            });
-        }
-
-        if (dateRange.end) {
-            const endDate = new Date(dateRange.end);
-            endDate.setHours(23, 59, 59, 999);
-            filtered = filtered.filter(session => {
-                const sessionDate = parseISTDate(session.loginTimeIST);
-                return sessionDate <= endDate;
-            });
+    // Load the next page of sessions for the current filters
+    const loadMoreSessions = async () => {
+        if (!nextCursor) return;
+        setIsLoadingMore(true);
+        try {
+            const response = await fetchSessionsPage(appliedFilters, nextCursor);
+            if (response.ok) {
+                const sessionsData = await response.json();
+                const sessions = [...userSessions, ...sessionsData.sessions];
+                setUserSessions(sessions);
+                setFilteredSessions(sessions);
+                setNextCursor(sessionsData.next_cursor);
+                calculateUserStats(sessions);
+            }
+        } catch (error) {
+            console.error('Error loading more sessions:', error);
+        } finally {
+            setIsLoadingMore(false);
         }
+    };
 
-        setFilteredSessions(filtered);
+    // Filter sessions based on selected criteria
+    const applyFilters = () => {
+        fetchUserLogs({ user: selectedUser, ...dateRange });
     };
 
     // Reset filters
     const resetFilters = () => {
         setSelectedUser('');
         setDateRange({ start: '', end: '' });
-        setFilteredSessions(userSessions);
+        fetchUserLogs({ user: '', start: '', end: '' });
+    };
+
+    // Every session matching the current filters, following the cursor through all pages
+    const fetchAllSessions = async () => {
+        let sessions = [];
+        let cursor = null;
+        do {
+            const response = await fetchSessionsPage(appliedFilters, cursor, EXPORT_PAGE_SIZE);
+            if (!response.ok) {
+                throw new Error(`Failed to fetch sessions: ${response.status}`);
+            }
+            const sessionsData = await response.json();
+            sessions = sessions.concat(sessionsData.sessions);
+            cursor = sessionsData.next_cursor;
+        } while (cursor);
+        return sessions;
     };
 
     // Export to CSV
-    const exportToCSV = () => {
+    const exportToCSV = async () => {
+        setIsExporting(true);
+        let sessions;
+        try {
+            sessions = nextCursor ? await fetchAllSessions() : filteredSessions;
+        } catch (error) {
+            console.error('Error exporting sessions:', error);
+            return;
+        } finally {
+            setIsExporting(false);
+        }
+
         const headers = ['Username', 'Login Time', 'Logout Time', 'Session Duration', 'Tasks Completed', 'Annotations', 'Tags'];
-        const csvData = filteredSessions.map(session => {
+        const csvData = sessions.map(session => {
             const annotations = session.tasksDone?.filter(task => 
                 task.includes('annotated') || task.includes('Annotation')
             ).length || 0;
@@ -320,6 +368,9 @@ const calculateUserStats = (sessions) => {
         fetchUserLogs();
     }, [username]);
 
+    // Users, annotations, tags and the average are computed from the loaded pages only
+    const loadedOnlySubtitle = nextCursor ? `From ${userSessions.length} loaded sessions` : null;
+
     // Statistics Cards Component
     const StatCard = ({ icon, title, value, subtitle, color }) => (
         <Card sx={{ height: '100%', bgcolor: theme.palette.background.paper }}>
@@ -373,6 +424,7 @@ const calculateUserStats = (sessions) => {
                         icon={<Person />}
                         title="Total Users"
                         value={userStats.totalUsers || 0}
+                        subtitle={loadedOnlySubtitle}
                         color="primary"
                     />
                 </Grid>
@@ -380,8 +432,8 @@ const calculateUserStats = (sessions) => {
                     <StatCard
                         icon={<Schedule />}
                         title="Total Sessions"
-                        value={userStats.totalSessions || 0}
-                        subtitle={`Avg: ${Math.round(userStats.averageSessionTime || 0)} min`}
+                        value={totalSessions ?? (userStats.totalSessions || 0)}
+                        subtitle={`Avg: ${Math.round(userStats.averageSessionTime || 0)} min${nextCursor ? ' (loaded sessions)' : ''}`}
                         color="secondary"
                     />
                 </Grid>
@@ -390,6 +442,7 @@ const calculateUserStats = (sessions) => {
                         icon={<Assignment />}
                         title="Annotations"
                         value={userStats.totalAnnotations || 0}
+                        subtitle={loadedOnlySubtitle}
                         color="success"
                     />
                 </Grid>
@@ -398,6 +451,7 @@ const calculateUserStats = (sessions) => {
                         icon={<Label />}
                         title="Tags Created"
                         value={userStats.totalTags || 0}
+                        subtitle={loadedOnlySubtitle}
                         color="info"
                     />
                 </Grid>
@@ -471,20 +525,21 @@ const calculateUserStats = (sessions) => {
             {/* Actions Bar */}
             <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 2 }}>
                 <Typography variant="h6">
-                    User Sessions ({filteredSessions.length})
+                    User Sessions ({nextCursor && totalSessions != null ? `${filteredSessions.length} of ${totalSessions}` : `${filteredSessions.length}${nextCursor ? '+' : ''}`})
                 </Typography>
                 <Box sx={{ display: 'flex', gap: 1 }}>
                     <Button
                         variant="outlined"
                         startIcon={<Download />}
                         onClick={exportToCSV}
+                        disabled={isExporting}
                     >
-                        Export CSV
+                        {isExporting ? 'Exporting...' : 'Export CSV'}
                     </Button>
                     <Button
                         variant="outlined"
                         startIcon={<Refresh />}
-                        onClick={fetchUserLogs}
+                        onClick={() => fetchUserLogs()}
                     >
                         Refresh
                     </Button>
@@ -602,6 +657,18 @@ const calculateUserStats = (sessions) => {
                 </Table>
             </TableContainer>
 
+            {nextCursor && !isLoading && (
+                <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+                    <Button
+                        variant="outlined"
+                        onClick={loadMoreSessions}
+                        disabled={isLoadingMore}
+                    >
+                        {isLoadingMore ? 'Loading...' : 'Load More'}
+                    </Button>
+                </Box>
+            )}
+
             {/* Session Details Dialog */}
             <Dialog 
                 open={detailDialogOpen} 
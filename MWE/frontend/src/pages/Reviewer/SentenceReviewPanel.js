@@ -265,6 +265,53 @@ export default function SentenceReviewPanel() {
         }
     };
 
+    // Approve every sentence on the current page that still has pending tags, in one request
+    const handleBulkApprovePage = async () => {
+        const pageSentences = currentSentences.filter(s => s.tags?.some(t => t.review_status === 'Pending'));
+        if (pageSentences.length === 0) {
+            showSnackbar('No sentences with pending tags on this page.', 'info');
+            return;
+        }
+
+        setIsReviewSubmitting(true);
+
+        try {
+            const token = getToken();
+            const response = await fetch('http://127.0.0.1:5001/reviewer/sentences/bulk-review', {
+                method: 'POST',
+                headers: { 
+                    'Content-Type': 'application/json',
+                    'Authorization': `Bearer ${token}`
+                },
+                body: JSON.stringify({ 
+                    reviewerUsername: username,
+                    comments: reviewComments.trim(),
+                    items: pageSentences.map(s => ({ sentence_id: s._id, action: 'approve' }))
+                }), 
+            });
+
+            const data = await response.json();
+
+            if (!response.ok) {
+                throw new Error(data.message || 'Failed to approve sentences.');
+            }
+
+            const severity = data.error_count > 0 ? 'warning' : 'success';
+            showSnackbar(`${data.approved_count} sentences approved${data.error_count > 0 ? `, ${data.error_count} failed` : ''}.`, severity);
+            
+            // Refresh the data
+            setSelectedSentenceData(null);
+            setReviewComments('');
+            await fetchSentencesForReview(false);
+            
+        } catch (error) {
+            console.error('Bulk approval error:', error);
+            showSnackbar(`Bulk approval failed: ${error.message}.`, 'error');
+        } finally {
+            setIsReviewSubmitting(false);
+        }
+    };
+
     const handleSentenceApprove = async () => {
         if (!selectedSentenceData) return;
         
@@ -1051,7 +1098,10 @@ export default function SentenceReviewPanel() {
                         {/* Error Alert */}
                         {error && (<Alert severity="error" sx={{ mb: 2 }} action={<Button color="inherit" size="small" onClick={handleRefresh}>RETRY</Button>}>{error}</Alert>)}
 
-                        <Typography variant="h6" gutterBottom sx={{ mb: 2 }}>Sentences ({sentences.length})</Typography>
+                        <Box sx={{ mb: 2, display: 'flex', alignItems: 'center', justifyContent: 'space-between' }}>
+                            <Typography variant="h6">Sentences ({sentences.length})</Typography>
+                            <Button variant="outlined" size="small" color="success" onClick={handleBulkApprovePage} disabled={isReviewSubmitting || currentSentences.length === 0}>Approve Page</Button>
+                        </Box>
                         
                         {/* Sentence List */}
                         <Box sx={{ flexGrow: 1, overflowY: 'auto', pr: 1 }}>